@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+compare.py
+----------
+Diff two benchmark result files (benchmarks.run) and fail on regressions.
+
+python -m benchmarks.compare base.json new.json --threshold 0.10
+
+Every case present in both files is compared on its per-item median time; a case more than
+`threshold` slower (0.10 = 10%) is a regression and makes the exit status 1. Runs whose
+workloads were generated differently (digest mismatch) are not comparable: exit status 2.
+Cases in only one of the files are listed but never fail the comparison.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+if __package__ in (None, ""):  # python benchmarks/compare.py
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    __package__ = "benchmarks"
+
+from .harness import compare, read_results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare two benchmark runs; exit 1 on regressions.")
+    ap.add_argument("base")
+    ap.add_argument("new")
+    ap.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown per case (0.10 = 10%%)")
+    ap.add_argument("--metric", choices=["per_item_us", "min_s"], default="per_item_us",
+                    help="per_item_us: median per item; min_s: best sample per item (less noise)")
+    ap.add_argument("--only", default=None, help="Compare only cases whose name starts with this prefix")
+    args = ap.parse_args()
+
+    base, new = read_results(args.base), read_results(args.new)
+    rows, problems = compare(base, new, args.metric)
+    for p in problems:
+        sys.stderr.write(f"[error] {p}\n")
+    if problems:
+        sys.exit(2)
+    if args.only:
+        rows = [r for r in rows if r.case.startswith(args.only)]
+
+    print(f"base: {base['meta'].get('git_commit')} {base['meta'].get('timestamp')}")
+    print(f"new:  {new['meta'].get('git_commit')} {new['meta'].get('timestamp')}")
+    print(f"{'case':<38} {'base us':>12} {'new us':>12} {'change':>9}")
+    regressions = []
+    for r in rows:
+        flag = ""
+        if r.change > args.threshold:
+            flag = "  REGRESSION"
+            regressions.append(r)
+        elif r.change < -args.threshold:
+            flag = "  faster"
+        print(f"{r.case:<38} {r.base_us:>12.2f} {r.new_us:>12.2f} {r.change:>+8.1%}{flag}")
+    for name in sorted(set(base["results"]) ^ set(new["results"])):
+        side = "base" if name in base["results"] else "new"
+        print(f"{name:<38} (only in {side})")
+
+    if regressions:
+        sys.stderr.write(f"[fail] {len(regressions)} case(s) slower than +{args.threshold:.0%}: "
+                         f"{', '.join(r.case for r in regressions)}\n")
+        sys.exit(1)
+    sys.stderr.write(f"[done] No regressions beyond +{args.threshold:.0%} ({len(rows)} cases compared).\n")
+
+
+if __name__ == "__main__":
+    main()
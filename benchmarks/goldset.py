@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+"""
+goldset.py
+----------
+Accuracy next to speed: every parser configuration over the hand-annotated CoNLL goldsets,
+reported as one table per goldset.
+
+    data/goldset/goldset_1k_yegeb.conll, data/tugce_250.conll, data/baris_250.conll
+
+Configurations (--configs), "<parser>[:<backend>][:int8]":
+    static                  StaticAddressParser only (HybridAddressParser without NER)
+    hybrid[:direct|pipeline][:int8]   static first, NER below --min-confidence
+    ner[:direct|pipeline][:int8]      NER for every address, admin spans snapped to the gazetteer
+
+What is measured (texts are the gold tokens joined with single spaces):
+    addresses/s, p50/p99   HybridAddressParser.parse_batch over --batch-size slices after one
+                           warm-up batch; an address's latency is the wall time of its batch
+                           (what a caller waiting for it sees); model loading is reported apart
+    per tag P/R/F1         exact match of (tag, value) per address. IL / ILCE / MAHALLE are
+                           compared as gazetteer keys (gold spans go through resolve_admin, the
+                           record's province / district / neighbourhood are the prediction), so
+                           the static parser is scored on what it actually outputs; every other
+                           tag compares a canonical value of the predicted and the gold text:
+                           street names without indicator words (street_token), numbers as
+                           canonical_number, fold_text() otherwise. Predictions are the NER
+                           entities of routed rows and the rule-based `fields` of static rows
+    pairs P/R/F1           pairwise F1 of the matching stage (block -> score -> union-find, as in
+                           pipeline.py) on the parsed records, against a reference partition:
+                             fields     the same matching run on records built from the gold
+                                        spans: how much parse errors change the clusters
+                             annotated  the cluster id in the CoNLL headers (all ids in the
+                                        shipped goldsets are distinct, so every reference
+                                        cluster is a singleton there)
+
+Example (from the project root):
+python -m benchmarks.goldset --configs static hybrid ner:direct ner:direct:int8 \\
+  --model-dir models/BERTurk_stage1_out --out bench/goldset.json
+
+Tips:
+  - NER configurations are skipped with a warning when --model-dir has no weights;
+    --random-init runs them on a randomly initialised model instead (throughput only, the
+    accuracy columns are meaningless and the table says so).
+  - P/R/F1 of a set with no gold and no predicted items (e.g. no pairs at all) is 1.0.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+if __package__ in (None, ""):  # python benchmarks/goldset.py
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    __package__ = "benchmarks"
+
+from src.address_matching import instrumentation
+from src.address_matching.matching.blocking import STREET_TAGS, fold_text, street_token
+from src.address_matching.normalization import canonical_number, format_number
+from src.address_matching.parsing.conll import ConllSentence, bio_entities, first_entities, read_conll
+from src.address_matching.pipeline.pipeline import AddressPipeline, Batch, PipelineConfig
+from src.address_matching.profiling import add_profile_arguments, profile_from_args
+
+from .run import DEFAULT_MODEL, has_weights, load_ner_for_bench
+from .workloads import PROJECT_ROOT
+
+GOLDSETS = (
+    PROJECT_ROOT / "data" / "goldset" / "goldset_1k_yegeb.conll",
+    PROJECT_ROOT / "data" / "tugce_250.conll",
+    PROJECT_ROOT / "data" / "baris_250.conll",
+)
+PARSERS = ("static", "hybrid", "ner")
+NER_BACKENDS = ("direct", "pipeline")
+ADMIN_TAGS = {"IL": "province", "ILCE": "district", "MAHALLE": "neighbourhood"}
+NUMBER_TAGS = ("BINA_NO", "DAIRE_NO", "KAT")
+REFERENCES = ("fields", "annotated")
+
+
+@dataclass(frozen=True)
+class EvalConfig:
+    parser: str = "static"
+    backend: str = "direct"
+    quantize: Optional[str] = None
+
+    @classmethod
+    def from_spec(cls, spec: str) -> "EvalConfig":
+        """'ner:pipeline:int8' -> EvalConfig("ner", "pipeline", "int8")."""
+        parts = spec.lower().split(":")
+        if parts[0] not in PARSERS:
+            raise ValueError(f"Unknown parser '{parts[0]}' in '{spec}'. Choose one of {PARSERS}.")
+        config = {"parser": parts[0]}
+        for part in parts[1:]:
+            if part in NER_BACKENDS:
+                config["backend"] = part
+            elif part == "int8":
+                config["quantize"] = part
+            else:
+                raise ValueError(f"Unknown option '{part}' in '{spec}'. Use a backend {NER_BACKENDS} or 'int8'.")
+        if parts[0] == "static" and len(parts) > 1:
+            raise ValueError(f"'{spec}': the static parser takes no NER options")
+        return cls(**config)
+
+    @property
+    def name(self) -> str:
+        if self.parser == "static":
+            return "static"
+        return ":".join([self.parser, self.backend] + ([self.quantize] if self.quantize else []))
+
+
+def build_parser(config: EvalConfig, static, model_dir: str, ner_batch_size: int = 32,
+                 max_length: Optional[int] = None, min_confidence: float = 1.0,
+                 random_init: bool = False, seed: int = 13):
+    """(HybridAddressParser, random_init) for a configuration, or (None, False) when it cannot run."""
+    from src.address_matching.parsing.hybrid_parser import HybridAddressParser
+
+    if config.parser == "static":
+        return HybridAddressParser(ner_fn=None, static_parser=static), False
+    if not has_weights(model_dir) and not random_init:
+        sys.stderr.write(f"[warn] No weights in {model_dir}; skipping {config.name} (use --random-init to time it).\n")
+        return None, False
+    from src.address_matching.parsing import ner_address_parser as ner
+
+    pipe, used_random = load_ner_for_bench(model_dir, config.backend, seed, quantize=config.quantize)
+    ner_fn = lambda texts: ner.predict_texts(pipe, texts, ner_batch_size, max_length)
+    threshold = min_confidence if config.parser == "hybrid" else float("inf")  # "ner": route all
+    return HybridAddressParser(ner_fn=ner_fn, static_parser=static, min_confidence=threshold), used_random
+
+
+# ---------- scoring ----------
+
+def gold_record(static, sent: ConllSentence) -> Dict[str, Any]:
+    """The record a perfect parser would return: gold spans, admin levels snapped to the gazetteer."""
+    spans: Dict[str, List[str]] = {tag: [] for tag in ADMIN_TAGS}
+    for typ, start, end in bio_entities(sent.tags):
+        if typ in spans:
+            spans[typ].append(" ".join(sent.tokens[start:end]))
+    res = static.resolve_admin(spans["IL"], spans["ILCE"], spans["MAHALLE"])
+    return {"text": " ".join(sent.tokens), "province": res["province"], "district": res["district"],
+            "neighbourhood": res["neighbourhood"], "fields": first_entities(sent.tokens, sent.tags)}
+
+def item_value(tag: str, text: str) -> Optional[str]:
+    """Comparable value of a non-admin entity: '1004. Sokak' and '1004' -> '1004', 'No: 9/B' -> '9b'."""
+    if tag in STREET_TAGS:
+        return street_token(text)
+    if tag in NUMBER_TAGS:
+        number = format_number(canonical_number(text, tag))
+        if number is not None:
+            return number
+    return fold_text(text) or None
+
+def record_items(record: Dict[str, Any], entities: Sequence[tuple]) -> Counter:
+    """(tag, value) items of one address: admin keys from the record, item_value() of the other entities."""
+    items: Counter = Counter()
+    for tag, level in ADMIN_TAGS.items():
+        if record.get(level):
+            items[(tag, record[level])] += 1
+    for tag, text in entities:
+        value = item_value(tag, text) if tag not in ADMIN_TAGS else None
+        if value:
+            items[(tag, value)] += 1
+    return items
+
+def predicted_items(record: Dict[str, Any]) -> Counter:
+    """NER entities of routed rows; static rows only have the rule-based street / number `fields`."""
+    if record.get("route") == "static":
+        entities = list((record.get("fields") or {}).items())
+    else:
+        entities = [(e["type"], e["text"]) for e in json.loads(record.get("entities_json") or "[]")]
+    return record_items(record, entities)
+
+def gold_items(record: Dict[str, Any], sent: ConllSentence) -> Counter:
+    entities = [(typ, " ".join(sent.tokens[start:end])) for typ, start, end in bio_entities(sent.tags)]
+    return record_items(record, entities)
+
+def _prf(tp: int, n_gold: int, n_pred: int) -> Dict[str, float]:
+    prec = tp / n_pred if n_pred else float(n_gold == 0)
+    rec = tp / n_gold if n_gold else float(n_pred == 0)
+    f1 = 2 * prec * rec / (prec + rec) if prec + rec else 0.0
+    return {"precision": prec, "recall": rec, "f1": f1, "support": n_gold}
+
+def item_prf(gold: Sequence[Counter], pred: Sequence[Counter]) -> Dict[str, Dict[str, float]]:
+    """Per tag P/R/F1 over (tag, value) items plus the micro average under "ALL" (like conll.entity_prf)."""
+    tp: Counter = Counter()
+    n_gold: Counter = Counter()
+    n_pred: Counter = Counter()
+    for g, p in zip(gold, pred):
+        for (tag, _), n in g.items():
+            n_gold[tag] += n
+        for (tag, _), n in p.items():
+            n_pred[tag] += n
+        for (tag, _), n in (g & p).items():
+            tp[tag] += n
+    out = {tag: _prf(tp[tag], n_gold[tag], n_pred[tag]) for tag in sorted(set(n_gold) | set(n_pred))}
+    out["ALL"] = _prf(sum(tp.values()), sum(n_gold.values()), sum(n_pred.values()))
+    return out
+
+def _same_cluster_pairs(labels: np.ndarray) -> int:
+    counts = np.unique(labels, return_counts=True)[1].astype(np.int64)
+    return int((counts * (counts - 1) // 2).sum())
+
+def pairwise_prf(gold_labels: Sequence, pred_labels: Sequence) -> Dict[str, float]:
+    """Pairwise P/R/F1 of two partitions of the same rows (pairs placed in one cluster)."""
+    gold = np.unique(np.asarray(gold_labels), return_inverse=True)[1]
+    pred = np.unique(np.asarray(pred_labels), return_inverse=True)[1]
+    both = gold.astype(np.int64) * (int(pred.max()) + 1 if pred.size else 1) + pred
+    return _prf(_same_cluster_pairs(both), _same_cluster_pairs(gold), _same_cluster_pairs(pred))
+
+def match_labels(records: List[Dict[str, Any]], config: PipelineConfig) -> np.ndarray:
+    """Cluster labels of parsed records through the pipeline's block -> score -> union-find stages."""
+    from src.address_matching.matching.blocking import BlockIndex
+    from src.address_matching.scoring.field_scorer import AddressTableBuilder
+
+    pipeline = AddressPipeline(config)
+    index, table = BlockIndex(config.blocking), AddressTableBuilder()
+    texts = [r["text"] for r in records]
+    pipeline.collect(Batch(offset=0, texts=texts, norm=[fold_text(t) for t in texts], records=records), index, table)
+    return pipeline.cluster(index, table.build())
+
+
+# ---------- evaluation ----------
+
+def timed_parse(parser, texts: List[str], batch_size: int):
+    """(records, per-address latency in seconds, parse seconds) after one warm-up batch."""
+    parser.parse_batch(texts[:batch_size])
+    parser.stats = {"rows": 0, "routed": 0}  # routed_fraction of the timed batches only
+    records: List[Dict[str, Any]] = []
+    latency = np.empty(len(texts))
+    total = 0.0
+    for i in range(0, len(texts), batch_size):
+        t0 = time.perf_counter()
+        records.extend(parser.parse_batch(texts[i:i + batch_size]))
+        dt = time.perf_counter() - t0
+        latency[i:i + batch_size] = dt
+        total += dt
+    return records, latency, total
+
+def evaluate(parser, sents: List[ConllSentence], static, batch_size: int, match_config: PipelineConfig,
+             reference: str = "fields") -> Dict[str, Any]:
+    texts = [" ".join(s.tokens) for s in sents]
+    records, latency, seconds = timed_parse(parser, texts, batch_size)
+    golds = [gold_record(static, s) for s in sents]
+
+    if reference == "annotated":
+        ref_labels = [s.cluster if s.cluster is not None else f"row{i}" for i, s in enumerate(sents)]
+    else:
+        ref_labels = match_labels(golds, match_config)
+    return {
+        "addresses": len(texts),
+        "seconds": seconds,
+        "addresses_per_s": len(texts) / seconds if seconds > 0 else 0.0,
+        "latency_p50_ms": 1e3 * float(np.percentile(latency, 50)) if len(texts) else 0.0,
+        "latency_p99_ms": 1e3 * float(np.percentile(latency, 99)) if len(texts) else 0.0,
+        "routed_ner": parser.routed_fraction,
+        "pairs": pairwise_prf(ref_labels, match_labels(records, match_config)),
+        "entities": item_prf([gold_items(g, s) for g, s in zip(golds, sents)], [predicted_items(r) for r in records]),
+    }
+
+
+# ---------- report ----------
+
+def _prf_cell(scores: Optional[Dict[str, float]]) -> str:
+    if scores is None:
+        return "-"
+    return f"{scores['precision']:.2f}/{scores['recall']:.2f}/{scores['f1']:.2f}"
+
+def format_table(goldset: str, results: Dict[str, Dict[str, Any]], notes: Optional[Dict[str, str]] = None) -> str:
+    """One column per configuration; throughput rows, matching pairs, then entity P/R/F1 per tag."""
+    names = list(results)
+    n = next(iter(results.values()))["addresses"] if results else 0
+    tags: Dict[str, int] = {}
+    for res in results.values():
+        for tag, s in res["entities"].items():
+            if tag != "ALL":
+                tags[tag] = max(tags.get(tag, 0), int(s["support"]))
+    pairs_support = max((int(r["pairs"]["support"]) for r in results.values()), default=0)
+    all_support = max((int(r["entities"]["ALL"]["support"]) for r in results.values()), default=0)
+
+    rows = [
+        ("addresses/s", [f"{results[c]['addresses_per_s']:.1f}" for c in names]),
+        ("latency p50 (ms)", [f"{results[c]['latency_p50_ms']:.2f}" for c in names]),
+        ("latency p99 (ms)", [f"{results[c]['latency_p99_ms']:.2f}" for c in names]),
+        ("routed to NER", [f"{100 * results[c]['routed_ner']:.1f}%" for c in names]),
+        (f"pairs P/R/F1 ({pairs_support})", [_prf_cell(results[c]["pairs"]) for c in names]),
+        (f"ALL P/R/F1 ({all_support})", [_prf_cell(results[c]["entities"]["ALL"]) for c in names]),
+    ]
+    for tag in sorted(tags):
+        rows.append((f"{tag} ({tags[tag]})", [_prf_cell(results[c]["entities"].get(tag)) for c in names]))
+
+    label_w = max(len(r[0]) for r in rows)
+    col_w = max([14] + [len(c) for c in names])
+    lines = [f"{goldset}: {n} addresses", " " * label_w + "".join(f"  {c:>{col_w}}" for c in names)]
+    lines += [f"{label:<{label_w}}" + "".join(f"  {v:>{col_w}}" for v in values) for label, values in rows]
+    for name, note in (notes or {}).items():
+        lines.append(f"  * {name}: {note}")
+    return "\n".join(lines)
+
+
+# ---------- CLI ----------
+
+def main():
+    ap = argparse.ArgumentParser(description="Entity P/R/F1, matching pairwise F1 and throughput of parser "
+                                             "configurations on the CoNLL goldsets.")
+    ap.add_argument("--goldsets", nargs="+", default=[str(p) for p in GOLDSETS])
+    ap.add_argument("--configs", nargs="+", default=["static", "hybrid", "ner:direct"],
+                    help="static | hybrid[:direct|pipeline][:int8] | ner[:direct|pipeline][:int8]")
+    ap.add_argument("--model-dir", default=str(DEFAULT_MODEL))
+    ap.add_argument("--batch-size", type=int, default=32, help="Addresses per parse_batch call (latency unit)")
+    ap.add_argument("--ner-batch-size", type=int, default=32)
+    ap.add_argument("--max-length", type=int, default=None)
+    ap.add_argument("--min-confidence", type=float, default=1.0, help="Hybrid: static results below this go to NER")
+    ap.add_argument("--reference", choices=REFERENCES, default="fields",
+                    help="Reference clusters for the pairs row (see the module docstring)")
+    ap.add_argument("--threshold", type=float, default=0.5, help="Match probability to merge a pair")
+    ap.add_argument("--scorer", default=None, help="FieldScorer weights (JSON from FieldScorer.save)")
+    ap.add_argument("--random-init", action="store_true",
+                    help="Run NER configurations on a random model when --model-dir has no weights")
+    ap.add_argument("--seed", type=int, default=13)
+    ap.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    ap.add_argument("--out", default=None, help="Optional JSON with every score")
+    ap.add_argument("--metrics-json", default=None,
+                    help="Write per-stage timing / throughput / peak RSS as JSON here (instrumentation.py)")
+    ap.add_argument("--metrics-prom", default=None, help="Same metrics in Prometheus text format")
+    add_profile_arguments(ap)
+    args = ap.parse_args()
+    profile_from_args(args, args.out)
+
+    configs = [EvalConfig.from_spec(s) for s in args.configs]
+    if args.metrics_json or args.metrics_prom:
+        instrumentation.enable()
+    if args.threads:
+        from src.address_matching.parsing.ner_address_parser import set_torch_threads
+        set_torch_threads(args.threads)
+
+    from src.address_matching.parsing.static_parser import StaticAddressParser
+
+    static = StaticAddressParser()
+    goldsets = {Path(p).name: read_conll(p) for p in args.goldsets}
+    match_config = PipelineConfig(threshold=args.threshold, scorer_path=args.scorer)
+    results: Dict[str, Dict[str, Dict[str, Any]]] = {name: {} for name in goldsets}
+    notes: Dict[str, str] = {}
+    loads: Dict[str, float] = {}
+
+    for config in configs:
+        t0 = time.perf_counter()
+        parser, random_init = build_parser(config, static, args.model_dir, args.ner_batch_size, args.max_length,
+                                           args.min_confidence, args.random_init, args.seed)
+        if parser is None:
+            continue
+        loads[config.name] = time.perf_counter() - t0
+        notes[config.name] = f"loaded in {loads[config.name]:.1f}s"
+        if random_init:
+            notes[config.name] += "; RANDOM WEIGHTS, accuracy not meaningful"
+        for name, sents in goldsets.items():
+            sys.stderr.write(f"[info] {config.name} on {name} ({len(sents)} addresses)...\n")
+            results[name][config.name] = evaluate(parser, sents, static, args.batch_size, match_config,
+                                                  args.reference)
+            results[name][config.name]["random_init"] = random_init
+
+    for name in goldsets:
+        if results[name]:
+            print(format_table(name, results[name], notes))
+            print()
+
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        payload = {"meta": {"model_dir": args.model_dir, "batch_size": args.batch_size,
+                            "reference": args.reference, "threshold": args.threshold, "load_seconds": loads},
+                   "results": results}
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2, ensure_ascii=False)
+    instrumentation.export(args.metrics_json, args.metrics_prom)
+    sys.stderr.write(f"[done] {len(loads)} configuration(s) on {len(goldsets)} goldset(s)."
+                     + (f" Output: {args.out}\n" if args.out else "\n"))
+
+
+if __name__ == "__main__":
+    main()
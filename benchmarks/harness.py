@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+harness.py
+----------
+Timing, result files and run comparison for the benchmark suite.
+
+A case is a zero-argument callable that processes `items` inputs (texts, rows, loads). It is
+called once as warm-up, then `repeat` times with the garbage collector paused; every call is
+one sample. The per-item median is the headline number and the one regressions are judged on
+(the minimum is kept too: it is the least noisy estimate on a busy machine).
+
+Result file (JSON):
+    {"meta": {"timestamp", "git_commit", "python", "numpy", "torch", "platform", "cpu_count",
+              "seed", "workloads": {name: digest}},
+     "results": {case: {"items", "repeat", "samples_s", "min_s", "median_s", "mean_s", "stdev_s",
+                        "per_item_us", "items_per_s", "params"}}}
+"""
+
+from __future__ import annotations
+
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .workloads import PROJECT_ROOT
+
+FORMAT_VERSION = 1
+
+
+@dataclass
+class CaseResult:
+    items: int
+    repeat: int
+    samples_s: List[float]
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        median = statistics.median(self.samples_s)
+        return {
+            "items": self.items,
+            "repeat": self.repeat,
+            "samples_s": [round(s, 6) for s in self.samples_s],
+            "min_s": round(min(self.samples_s), 6),
+            "median_s": round(median, 6),
+            "mean_s": round(statistics.fmean(self.samples_s), 6),
+            "stdev_s": round(statistics.stdev(self.samples_s), 6) if len(self.samples_s) > 1 else 0.0,
+            "per_item_us": round(1e6 * median / max(self.items, 1), 3),
+            "items_per_s": round(self.items / median, 2) if median > 0 else 0.0,
+            "params": self.params,
+        }
+
+
+def measure(fn: Callable[[], Any], items: int, repeat: int = 5, warmup: int = 1,
+            params: Optional[Dict[str, Any]] = None) -> CaseResult:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    gc.collect()
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - t0)
+    finally:
+        if was_enabled:
+            gc.enable()
+    return CaseResult(items=items, repeat=repeat, samples_s=samples, params=dict(params or {}))
+
+
+# ---------- result files ----------
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def _version(module: str) -> Optional[str]:
+    mod = sys.modules.get(module)
+    return getattr(mod, "__version__", None) if mod is not None else None
+
+def environment(seed: int, workloads: Dict[str, str]) -> Dict[str, Any]:
+    return {
+        "format_version": FORMAT_VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": _version("numpy"),
+        "torch": _version("torch"),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": seed,
+        "workloads": workloads,
+    }
+
+def write_results(path: str, meta: Dict[str, Any], results: Dict[str, CaseResult]) -> None:
+    payload = {"meta": meta, "results": {name: r.to_dict() for name, r in results.items()}}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+
+def read_results(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    version = payload.get("meta", {}).get("format_version")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"{path}: benchmark format {version}, expected {FORMAT_VERSION}")
+    return payload
+
+
+# ---------- comparison ----------
+
+@dataclass
+class Comparison:
+    case: str
+    base_us: float
+    new_us: float
+
+    @property
+    def change(self) -> float:
+        """Relative change of the per-item median time (+0.10 = 10% slower)."""
+        return self.new_us / self.base_us - 1.0 if self.base_us > 0 else 0.0
+
+def compare(base: Dict[str, Any], new: Dict[str, Any], metric: str = "per_item_us"
+            ) -> Tuple[List[Comparison], List[str]]:
+    """
+    Per-case comparison of two result payloads (cases present in both), plus problems that
+    make the comparison meaningless: workloads generated differently for the same name.
+    """
+    problems = []
+    base_w, new_w = base["meta"].get("workloads", {}), new["meta"].get("workloads", {})
+    for name in sorted(set(base_w) & set(new_w)):
+        if base_w[name] != new_w[name]:
+            problems.append(f"workload '{name}' differs ({base_w[name]} vs {new_w[name]})")
+    rows = []
+    for case in sorted(set(base["results"]) & set(new["results"])):
+        b, n = base["results"][case], new["results"][case]
+        if metric == "per_item_us":
+            rows.append(Comparison(case, b["per_item_us"], n["per_item_us"]))
+        else:
+            rows.append(Comparison(case, 1e6 * b[metric] / max(b["items"], 1), 1e6 * n[metric] / max(n["items"], 1)))
+    return rows, problems
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+run.py
+------
+Benchmark suite: normalizer, gazetteer, static / hybrid parser and NER batches on fixed-seed
+synth workloads; results go to a JSON file that compare.py diffs against a baseline.
+
+Suites (--suites, default all):
+    normalizer   AddressNormalizer.normalize / normalize_static_parser / normalize_punctuation_only / fold
+    gazetteer    Turkey.load cold (XLSX -> tree, no cache) and cached (pickle), neighbourhood lookups
+    parser       StaticAddressParser.parse / match, HybridAddressParser.parse_batch (static only)
+    ner          predict_texts with the direct and pipeline backends at several batch sizes
+
+Example (from the project root):
+python -m benchmarks.run --out bench/base.json
+# ... change code ...
+python -m benchmarks.run --out bench/new.json
+python -m benchmarks.compare bench/base.json bench/new.json --threshold 0.10
+
+Tips:
+  - Without model weights in --ner-model (only config + tokenizer), the NER cases run a
+    randomly initialised model of the same architecture: timings are representative, the
+    predictions are not. Results record this as params.random_init.
+  - Pin threads (--threads) and keep the machine quiet; compare runs from the same host only.
+  - --quick shrinks workloads and repeats for a smoke run; its numbers are not comparable
+    to a full run (the cases carry their sizes in params).
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+if __package__ in (None, ""):  # python benchmarks/run.py
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    __package__ = "benchmarks"
+
+from src.address_matching.profiling import add_profile_arguments, profile_from_args
+
+from .harness import CaseResult, environment, measure, write_results
+from .workloads import PROJECT_ROOT, synth_texts, workload_digest
+
+SUITES = ("normalizer", "gazetteer", "parser", "ner")
+XLSX = PROJECT_ROOT / "data" / "ptt_data" / "turkiye_posta_kodlari.xlsx"
+DEFAULT_MODEL = PROJECT_ROOT / "models" / "BERTurk_stage1_out"
+WEIGHT_FILES = ("model.safetensors", "pytorch_model.bin")
+
+
+class Suite:
+    """Collects the cases of one run and reports each as it finishes."""
+
+    def __init__(self, repeat: int):
+        self.repeat = repeat
+        self.results: Dict[str, CaseResult] = {}
+
+    def case(self, name: str, fn: Callable[[], Any], items: int, repeat: int | None = None, warmup: int = 1,
+             **params) -> None:
+        res = measure(fn, items, repeat=repeat or self.repeat, warmup=warmup, params=params)
+        self.results[name] = res
+        d = res.to_dict()
+        sys.stderr.write(f"[bench] {name:<36} {d['per_item_us']:>12.2f} us/item "
+                         f"{d['items_per_s']:>12.1f} items/s  (median of {res.repeat})\n")
+
+
+# ---------- suites ----------
+
+def bench_normalizer(suite: Suite, texts: List[str]) -> None:
+    from src.address_matching import AddressNormalizer
+
+    norm = AddressNormalizer()
+    for variant in ("normalize", "normalize_static_parser", "normalize_punctuation_only", "fold"):
+        fn = getattr(norm, variant)
+        suite.case(f"normalizer.{variant}", lambda fn=fn: [fn(t) for t in texts], len(texts), n=len(texts))
+
+def bench_gazetteer(suite: Suite, texts: List[str], repeat_slow: int) -> None:
+    from data.ptt_data.map import Turkey
+
+    suite.case("gazetteer.load_cold", lambda: Turkey.load(str(XLSX), use_cache=False), 1, repeat=repeat_slow, warmup=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = os.path.join(tmp, "tree.pkl")
+        tr = Turkey.load(str(XLSX), cache_path=cache)  # writes the cache
+        suite.case("gazetteer.load_cached", lambda: Turkey.load(str(XLSX), cache_path=cache), 1)
+
+    pairs = [(p, d) for p in sorted(tr.provinces()) for d in sorted(tr.districts_of(p))]
+    suite.case("gazetteer.neighbourhoods_of", lambda: [tr.neighbourhoods_of(province=p, district=d) for p, d in pairs],
+               len(pairs), n=len(pairs))
+    districts = sorted({d for _, d in pairs})
+    suite.case("gazetteer.neighbourhoods_of_district", lambda: [tr.neighbourhoods_of(district=d) for d in districts],
+               len(districts), n=len(districts))
+
+def bench_parser(suite: Suite, texts: List[str], sizes: List[int]) -> None:
+    from src.address_matching.parsing.hybrid_parser import HybridAddressParser
+    from src.address_matching.parsing.static_parser import StaticAddressParser
+
+    static = StaticAddressParser()
+    hybrid = HybridAddressParser(static_parser=static)
+    for n in sizes:
+        sample = texts[:n]
+        suite.case(f"parser.static_parse.n{n}", lambda s=sample: [static.parse(t) for t in s], len(sample), n=len(sample))
+    sample = texts[:max(sizes)]
+    suite.case("parser.static_match", lambda: [static.match(t) for t in sample], len(sample), n=len(sample))
+    suite.case("parser.hybrid_static", lambda: hybrid.parse_batch(sample), len(sample), n=len(sample))
+
+def has_weights(model_dir: str) -> bool:
+    return any((Path(model_dir) / w).exists() for w in WEIGHT_FILES)
+
+def load_ner_for_bench(model_dir: str, backend: str, seed: int, quantize: str | None = None):
+    """(pipe, random_init): the real model when weights exist, else a random one of the same architecture."""
+    from src.address_matching.parsing import ner_address_parser as ner
+
+    if has_weights(model_dir):
+        return ner.load_ner(model_dir, device=-1, quantize=quantize, backend=backend), False
+    import torch
+    from transformers import AutoConfig, AutoModelForTokenClassification, AutoTokenizer
+
+    torch.manual_seed(seed)
+    model = AutoModelForTokenClassification.from_config(AutoConfig.from_pretrained(model_dir))
+    if quantize == "int8":
+        model = ner.quantize_dynamic_int8(model)
+    tok = AutoTokenizer.from_pretrained(model_dir)
+    if backend == "direct":
+        return ner.DirectNerRunner(model, tok, device=-1), True
+    return ner.TokenClassificationPipeline(model=model, tokenizer=tok, aggregation_strategy="simple", device=-1), True
+
+def bench_ner(suite: Suite, texts: List[str], model_dir: str, batch_sizes: List[int], n_texts: int,
+              max_length: int | None, seed: int) -> None:
+    import torch
+    from src.address_matching.parsing import ner_address_parser as ner
+
+    sample = texts[:n_texts]
+    for backend in ("direct", "pipeline"):
+        pipe, random_init = load_ner_for_bench(model_dir, backend, seed)
+        if random_init:
+            sys.stderr.write(f"[warn] No weights in {model_dir}; timing a randomly initialised model.\n")
+        for bs in batch_sizes:
+            suite.case(f"ner.{backend}.batch{bs}", lambda bs=bs: ner.predict_texts(pipe, sample, bs, max_length),
+                       len(sample), n=len(sample), batch_size=bs, max_length=max_length,
+                       threads=torch.get_num_threads(), random_init=random_init)
+
+
+# ---------- CLI ----------
+
+def main():
+    ap = argparse.ArgumentParser(description="Fixed-seed performance benchmarks; writes JSON for benchmarks.compare.")
+    ap.add_argument("--out", default="benchmark_results.json")
+    ap.add_argument("--suites", nargs="+", choices=SUITES, default=list(SUITES))
+    ap.add_argument("--seed", type=int, default=13, help="Synth workload seed")
+    ap.add_argument("--n", type=int, default=2000, help="Texts in the normalizer / parser workload")
+    ap.add_argument("--parser-sizes", type=int, nargs="+", default=[100, 2000])
+    ap.add_argument("--repeat", type=int, default=5, help="Timed calls per case (after one warm-up)")
+    ap.add_argument("--repeat-slow", type=int, default=2, help="Timed calls for the cold gazetteer load")
+    ap.add_argument("--ner-model", default=str(DEFAULT_MODEL))
+    ap.add_argument("--ner-texts", type=int, default=64, help="Texts per NER case")
+    ap.add_argument("--ner-batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    ap.add_argument("--max-length", type=int, default=128)
+    ap.add_argument("--threads", type=int, default=None, help="torch intra-op threads for the NER cases")
+    ap.add_argument("--quick", action="store_true", help="Small workloads, 2 repeats (smoke run)")
+    add_profile_arguments(ap)
+    args = ap.parse_args()
+    profile_from_args(args, args.out)
+
+    if args.quick:
+        args.n, args.parser_sizes, args.repeat, args.repeat_slow = 200, [50, 200], 2, 1
+        args.ner_texts, args.ner_batch_sizes = 16, [1, 8]
+
+    sys.stderr.write(f"[info] Generating workload: {args.n} synth texts (seed {args.seed})...\n")
+    texts = synth_texts(max(args.n, args.ner_texts, *args.parser_sizes), seed=args.seed)
+    workloads = {"synth": workload_digest(texts)}
+    suite = Suite(args.repeat)
+
+    if "normalizer" in args.suites:
+        bench_normalizer(suite, texts[:args.n])
+    if "gazetteer" in args.suites:
+        bench_gazetteer(suite, texts, args.repeat_slow)
+    if "parser" in args.suites:
+        bench_parser(suite, texts, args.parser_sizes)
+    if "ner" in args.suites:
+        if args.threads:
+            from src.address_matching.parsing.ner_address_parser import set_torch_threads
+            set_torch_threads(args.threads)
+        bench_ner(suite, texts, args.ner_model, args.ner_batch_sizes, args.ner_texts, args.max_length, args.seed)
+
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    write_results(args.out, environment(args.seed, workloads), suite.results)
+    sys.stderr.write(f"[done] {len(suite.results)} cases. Output: {args.out}\n")
+
+
+if __name__ == "__main__":
+    main()
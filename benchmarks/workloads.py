@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+workloads.py
+------------
+Fixed-seed benchmark inputs from the synth generators (data/synth/group_*_BIO_synth.py).
+
+    texts = synth_texts(2000, seed=13)     # same list on every run with the same seed
+    workload_digest(texts)                 # recorded with the results; compare.py refuses
+                                           # to compare runs whose workloads differ
+
+The generators draw from the global `random` module, so the state is saved and restored
+around generation: building a workload never changes the caller's random stream.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import random
+import sys
+from pathlib import Path
+from typing import List, Sequence
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SYNTH_DIR = PROJECT_ROOT / "data" / "synth"
+# the generators import both package-style and "synth.config..." (like generate_*_BIO_synth.py)
+for p in (SYNTH_DIR.parent, PROJECT_ROOT):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+GROUPS = ("A2E", "F2J")
+
+
+def _generator(group: str, seed: int):
+    if group == "A2E":
+        from data.synth.group_A2E_BIO_synth import GroupA2EGenerator
+        return GroupA2EGenerator(seed=seed)
+    if group == "F2J":
+        from data.synth.group_F2J_BIO_synth import GroupF2JGenerator
+        return GroupF2JGenerator(seed=seed)
+    raise ValueError(f"Unknown synth group '{group}'. Choose one of {GROUPS}.")
+
+def synth_texts(n: int, seed: int = 13, groups: Sequence[str] = GROUPS) -> List[str]:
+    """n raw address texts, alternating between the synth groups."""
+    state = random.getstate()
+    try:
+        per_group = [(n + len(groups) - 1 - i) // len(groups) for i in range(len(groups))]
+        samples = []
+        for k, (group, count) in enumerate(zip(groups, per_group)):
+            gen = _generator(group, seed + k)  # seeds the global random module
+            samples.append([gen.generate_one()[0] for _ in range(count)])
+    finally:
+        random.setstate(state)
+    # interleave so every prefix of the workload mixes both groups
+    out: List[str] = []
+    for i in range(max(per_group, default=0)):
+        out.extend(s[i] for s in samples if i < len(s))
+    return out
+
+def workload_digest(texts: Sequence[str]) -> str:
+    sha = hashlib.sha1()
+    for t in texts:
+        sha.update(t.encode("utf-8"))
+        sha.update(b"\n")
+    return sha.hexdigest()[:16]
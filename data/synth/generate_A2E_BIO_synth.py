@@ -44,6 +44,9 @@ except Exception:
         from data.synth.config.groupA2E_config import SynthesisConfigA2E
         from data.synth.config.general_config import KeywordVariants
 
+from src.address_matching.profiling import add_profile_arguments, profile_from_args
+
+
 def gen_samples(n: int, seed: int) -> "List[Tuple[str, list[str], list[str]]]":
     gen = GroupA2EGenerator(variants=KeywordVariants(), cfg=SynthesisConfigA2E(), seed=seed)
     return [gen.generate_one() for _ in range(n)]
@@ -283,7 +286,9 @@ def main():
     p.add_argument("--group", type=str, default="A2E", help="group label to write in headers")
     p.add_argument("--preview", type=int, default=0, help="print first K samples to stdout")
     p.add_argument("--stats", action="store_true", help="print simple distribution stats")
+    add_profile_arguments(p)
     args = p.parse_args()
+    profile_from_args(args, args.out)
 
     samples = gen_samples(args.n, args.seed)
 
@@ -57,6 +57,7 @@ except Exception:
         from synth.config.general_config import (
             BINA_BLOK_KEYWORDS, BINA_APARTMAN_KEYWORDS,
         )
+from src.address_matching.profiling import add_profile_arguments, profile_from_args
 
 Sample = Tuple[str, List[str], List[str]]  # (raw, tokens, tags)
 
@@ -178,6 +179,7 @@ def build_argparser():
     ap.add_argument("--seed",         type=int,   default=42,    help="Random seed.")
     ap.add_argument("--preview",      type=int,   default=0,     help="Print K sample previews to stdout.")
     ap.add_argument("--stats",        action="store_true",       help="Compute and print sanity stats.")
+    add_profile_arguments(ap)
     return ap
 
 def gen_samples(n: int, seed: int = 42) -> List[Sample]:
@@ -186,6 +188,7 @@ def gen_samples(n: int, seed: int = 42) -> List[Sample]:
 
 def main():
     args = build_argparser().parse_args()
+    profile_from_args(args, args.out)
 
     # Generate
     samples = gen_samples(args.n, args.seed)
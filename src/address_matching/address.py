@@ -1,11 +1,19 @@
 class Address:
-    def __init__(self, city, district, neighbourhood, label):
+    def __init__(self, city, district, neighbourhood, label=None, text=None, fields=None):
         self.city = city
         self.district = district
         self.neighbourhood = neighbourhood
         self.label = label
+        # raw address and NER fields (tag -> first entity text, e.g. "SOKAK": "1004 sokak")
+        self.text = text
+        self.fields = fields or {}
 
-
+    @classmethod
+    def from_record(cls, record, label=None):
+        """Build from a parser record (HybridAddressParser.parse_batch / --gazetteer CSV row)."""
+        return cls(record.get("province") or None, record.get("district") or None,
+                   record.get("neighbourhood") or None, label=label,
+                   text=record.get("text"), fields=record.get("fields"))
 
     def get_label(self):
         return self.label
@@ -18,3 +26,9 @@ class Address:
 
     def get_district(self):
         return self.district
+
+    def get_text(self):
+        return self.text
+
+    def get_field(self, tag):
+        return self.fields.get(tag)
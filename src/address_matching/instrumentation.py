@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+instrumentation.py
+------------------
+Per-stage counters, latency histograms and peak RSS for the whole package, exported as a JSON
+summary and a Prometheus text-format file.
+
+Components report into one process-wide registry (METRICS):
+
+    @timed("static.match")                      # every call is one observation
+    def match(self, text): ...
+
+    @timed("ner.postprocess", items=lambda pipe, texts, *a, **k: len(texts))
+    def process_batch(pipe, texts, ...): ...
+
+    with span("csv.write", items=len(rows)):    # a block of code
+        writer.writerows(rows)
+
+    for df in timed_iter("csv.read", reader):   # each next() of a (lazy) reader
+        ...
+
+Recording is off by default; enable() turns it on (the CLIs do so for --metrics-json /
+--metrics-prom, or set ADDRESS_MATCHING_METRICS=1). While disabled, a timed function costs
+one flag check on top of the call and span() returns a shared no-op context manager.
+
+Per stage: calls, items (rows / texts / tokens, whatever the stage counts), total seconds,
+a latency histogram (4 log-spaced buckets per decade, 1us .. 100s; p50/p90/p99 are estimated
+from it), the process peak RSS seen when a call finished and the growth of that peak during
+calls of the stage (which stage pushed the high-water mark). Stages nest: "static.match"
+includes its "static.best_match" and "gazetteer.lookup" calls.
+
+Only the current process is measured: stages running in ProcessPoolExecutor / NerWorkerPool
+workers report into the workers' own registries.
+
+Stage names used in the package:
+    normalize, normalize.static            AddressNormalizer
+    static.match, static.best_match        StaticAddressParser
+    gazetteer.lookup                       Turkey tree lookups of the static parser
+    ner.tokenize, ner.forward, ner.decode  DirectNerRunner (ner.forward is the whole HF pipeline
+                                           call with --backend pipeline)
+    ner.postprocess                        entities / BIO tags / JSON of process_batch
+    csv.read, csv.write, parquet.*         file I/O of the CLIs
+    pipeline.*                             AddressPipeline stages
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, RSS is reported as 0
+    resource = None
+
+ENV_FLAG = "ADDRESS_MATCHING_METRICS"
+PROM_PREFIX = "address_matching"
+
+# Histogram upper bounds in seconds: 1us .. 100s, 4 per decade (+Inf is implicit)
+BUCKETS = tuple(10 ** (e / 4) for e in range(-24, 9))
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process so far."""
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024  # bytes on macOS, KiB elsewhere
+
+
+class StageStats:
+    __slots__ = ("calls", "items", "seconds", "buckets", "peak_rss", "rss_growth")
+
+    def __init__(self):
+        self.calls = 0
+        self.items = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.peak_rss = 0
+        self.rss_growth = 0
+
+    def quantile(self, q: float) -> float:
+        """Linear interpolation inside the bucket holding the q-th observation (as histogram_quantile)."""
+        if not self.calls:
+            return 0.0
+        rank = q * self.calls
+        seen = 0
+        for i, c in enumerate(self.buckets):
+            if c and seen + c >= rank:
+                if i == len(BUCKETS):
+                    return BUCKETS[-1]
+                lo = BUCKETS[i - 1] if i else 0.0
+                return lo + (BUCKETS[i] - lo) * (rank - seen) / c
+            seen += c
+        return BUCKETS[-1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "items": self.items,
+            "seconds": round(self.seconds, 6),
+            "mean_ms": round(1e3 * self.seconds / self.calls, 4) if self.calls else 0.0,
+            "p50_ms": round(1e3 * self.quantile(0.50), 4),
+            "p90_ms": round(1e3 * self.quantile(0.90), 4),
+            "p99_ms": round(1e3 * self.quantile(0.99), 4),
+            "items_per_s": round(self.items / self.seconds, 2) if self.seconds > 0 else 0.0,
+            "peak_rss_mb": round(self.peak_rss / 2**20, 2),
+            "rss_growth_mb": round(self.rss_growth / 2**20, 2),
+        }
+
+
+class _Span:
+    __slots__ = ("metrics", "stage", "items", "t0", "rss0")
+
+    def __init__(self, metrics: "Metrics", stage: str, items: int):
+        self.metrics, self.stage, self.items = metrics, stage, items
+
+    def __enter__(self) -> "_Span":
+        self.rss0 = peak_rss_bytes()
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        seconds = time.perf_counter() - self.t0
+        self.metrics.observe(self.stage, seconds, self.items, self.rss0, peak_rss_bytes())
+
+class _NullSpan:
+    """Shared by every span() while recording is off; `items` may still be assigned."""
+    items = 0
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+_NULL_SPAN = _NullSpan()
+
+
+class Metrics:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stages: Dict[str, StageStats] = {}
+            self.counters: Dict[str, int] = {}
+            self.started = time.time()
+
+    def observe(self, stage: str, seconds: float, items: int = 1, rss_before: int = 0, rss_after: int = 0) -> None:
+        with self._lock:
+            st = self.stages.get(stage)
+            if st is None:
+                st = self.stages[stage] = StageStats()
+            st.calls += 1
+            st.items += items
+            st.seconds += seconds
+            st.buckets[bisect_left(BUCKETS, seconds)] += 1
+            st.peak_rss = max(st.peak_rss, rss_after)
+            st.rss_growth += max(rss_after - rss_before, 0)
+
+    def count(self, name: str, n: int = 1) -> None:
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def span(self, stage: str, items: int = 1):
+        return _Span(self, stage, items) if self.enabled else _NULL_SPAN
+
+    # ---------- export ----------
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "started": self.started,
+                "wall_seconds": round(time.time() - self.started, 3),
+                "peak_rss_mb": round(peak_rss_bytes() / 2**20, 2),
+                "stages": {name: st.to_dict() for name, st in sorted(self.stages.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def to_prometheus(self, prefix: str = PROM_PREFIX) -> str:
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> str:
+            full = f"{prefix}_{name}"
+            lines.append(f"# HELP {full} {help_text}")
+            lines.append(f"# TYPE {full} {kind}")
+            return full
+
+        with self._lock:
+            stages = sorted(self.stages.items())
+            counters = sorted(self.counters.items())
+        hist = family("stage_duration_seconds", "histogram", "Wall time per stage call.")
+        for name, st in stages:
+            label = f'stage="{_escape(name)}"'
+            cum = 0
+            for bound, c in zip(BUCKETS, st.buckets):
+                cum += c
+                lines.append(f'{hist}_bucket{{{label},le="{bound:.6g}"}} {cum}')
+            lines.append(f'{hist}_bucket{{{label},le="+Inf"}} {st.calls}')
+            lines.append(f"{hist}_sum{{{label}}} {st.seconds:.9g}")
+            lines.append(f"{hist}_count{{{label}}} {st.calls}")
+        for metric, kind, attr, help_text in (
+            ("stage_items_total", "counter", "items", "Items (rows, texts, chunks) processed per stage."),
+            ("stage_peak_rss_bytes", "gauge", "peak_rss", "Process peak RSS seen at the end of a stage call."),
+            ("stage_rss_growth_bytes_total", "counter", "rss_growth", "Growth of the process peak RSS during stage calls."),
+        ):
+            full = family(metric, kind, help_text)
+            for name, st in stages:
+                lines.append(f'{full}{{stage="{_escape(name)}"}} {getattr(st, attr)}')
+        full = family("events_total", "counter", "Event counters.")
+        for name, n in counters:
+            lines.append(f'{full}{{name="{_escape(name)}"}} {n}')
+        full = family("process_peak_rss_bytes", "gauge", "Peak RSS of the process.")
+        lines.append(f"{full} {peak_rss_bytes()}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: str) -> None:
+        _write_atomic(path, json.dumps(self.summary(), indent=2))
+
+    def write_prometheus(self, path: str) -> None:
+        """Atomic replace, so a node_exporter textfile collector never reads a partial file."""
+        _write_atomic(path, self.to_prometheus())
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _write_atomic(path: str, text: str) -> None:
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+# ---------- process-wide registry ----------
+
+METRICS = Metrics(enabled=os.environ.get(ENV_FLAG, "") not in ("", "0"))
+
+def enable() -> None:
+    METRICS.enabled = True
+
+def disable() -> None:
+    METRICS.enabled = False
+
+def span(stage: str, items: int = 1):
+    return METRICS.span(stage, items)
+
+def count(name: str, n: int = 1) -> None:
+    METRICS.count(name, n)
+
+def timed(stage: str, items: Optional[Callable[..., int]] = None):
+    """Decorator: each call is one `stage` observation; `items(*args, **kwargs)` sizes it."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return fn(*args, **kwargs)
+            with _Span(METRICS, stage, items(*args, **kwargs) if items is not None else 1):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def timed_iter(stage: str, iterable: Iterable, items: Optional[Callable[[Any], int]] = len) -> Iterator:
+    """Yields from `iterable`, timing each next() (lazy readers do their I/O there)."""
+    it = iter(iterable)
+    while True:
+        if not METRICS.enabled:
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+        else:
+            t0, rss0 = time.perf_counter(), peak_rss_bytes()
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            size = items(item) if items is not None else 1
+            METRICS.observe(stage, time.perf_counter() - t0, size, rss0, peak_rss_bytes())
+        yield item
+
+def export(json_path: Optional[str] = None, prom_path: Optional[str] = None) -> None:
+    """Write the JSON summary and/or the Prometheus file (CLIs: --metrics-json / --metrics-prom)."""
+    if json_path:
+        METRICS.write_json(json_path)
+        sys.stderr.write(f"[info] Metrics summary: {json_path}\n")
+    if prom_path:
+        METRICS.write_prometheus(prom_path)
+        sys.stderr.write(f"[info] Prometheus metrics: {prom_path}\n")
@@ -0,0 +1,4 @@
+from .blocking import BlockIndex, BlockingConfig
+from .minhash import MinHashLSH
+from .tfidf import TfidfIndex
+from .clustering import UnionFind, cluster_pairs
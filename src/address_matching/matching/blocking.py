@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+blocking.py
+-----------
+Candidate generation for address-to-address matching.
+
+Every address gets a few block keys built from its gazetteer ids (province, district,
+neighbourhood) plus one street or building-number token:
+
+    ("street", province, district, neighbourhood, "1004")
+    ("number", province, district, neighbourhood, 12)      bare building number (9, 9b, 9/B)
+    ("admin",  province, district, neighbourhood)          only when neither token exists
+
+Pairs are only generated inside a block, so the cost follows the block sizes instead of n^2.
+Blocks larger than `max_block_size` are not expanded all-pairs: with oversize="window" their
+members are sorted by normalized text and only neighbours within `max_block_size` positions are
+paired (sorted-neighbourhood); with oversize="skip" they produce nothing. Addresses without any
+admin id get no keys (see minhash.py for those).
+
+Example:
+    index = BlockIndex(BlockingConfig(max_block_size=50))
+    index.add(addresses)                      # Address objects (see address.py)
+    left, right = index.candidate_pairs()     # int64 row ids, left < right, deduplicated
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from ..address import Address
+from ..normalization import AddressNormalizer, number_key, number_part
+from ..normalization.numbers import MISSING_KEY
+
+STREET_TAGS = ("SOKAK", "CADDE", "BULVAR")
+NUMBER_TAG = "BINA_NO"
+
+# Indicator words dropped from street names after normalize() + folding
+_STREET_INDICATORS = {"mah", "cad", "sk", "bulvar", "bulvari", "blv", "bul", "bulv"}
+
+_normalizer = AddressNormalizer()
+
+
+def fold_text(text: Optional[str]) -> str:
+    """normalize() + normalize_static_parser(): lowercase, folded, indicators abbreviated."""
+    return _normalizer.normalize_static_parser(_normalizer.normalize(text)) if text else ""
+
+def street_token(text: Optional[str]) -> Optional[str]:
+    """'Atatürk Caddesi' -> 'ataturk', '1004. Sokak' -> '1004'; None if nothing is left."""
+    if not text:
+        return None
+    words = [w for w in fold_text(text).split() if w not in _STREET_INDICATORS and w.isalnum()]
+    return " ".join(words) or None
+
+
+@dataclass
+class BlockingConfig:
+    max_block_size: int = 100   # larger blocks fall back to `oversize`
+    oversize: str = "window"    # "window" (sorted-neighbourhood) | "skip"
+    use_street: bool = True
+    use_number: bool = True
+
+    def __post_init__(self):
+        if self.oversize not in ("window", "skip"):
+            raise ValueError(f"Unknown oversize mode '{self.oversize}'. Choose 'window' or 'skip'.")
+        if self.max_block_size < 2:
+            raise ValueError("max_block_size must be >= 2")
+
+
+def block_keys(address: Address, config: BlockingConfig) -> List[Tuple]:
+    """Block keys of one address (empty when no admin id is known)."""
+    admin = (address.city, address.district, address.neighbourhood)
+    if not any(admin):
+        return []
+    keys: List[Tuple] = []
+    if config.use_street:
+        street = next((street_token(address.get_field(t)) for t in STREET_TAGS if address.get_field(t)), None)
+        if street:
+            keys.append(("street",) + admin + (street,))
+    if config.use_number:
+        key = number_key(address.get_field(NUMBER_TAG), NUMBER_TAG)
+        if key != MISSING_KEY:  # suffixes are left to the scorer: 9 and 9b share a block
+            keys.append(("number",) + admin + (number_part(key),))
+    if not keys:
+        keys.append(("admin",) + admin)
+    return keys
+
+
+class BlockIndex:
+    """
+    Incremental block index: add() addresses (row ids are assigned in order), then stream
+    pairs with iter_pairs() or collect them with candidate_pairs().
+    """
+
+    def __init__(self, config: Optional[BlockingConfig] = None):
+        self.config = config or BlockingConfig()
+        self._key_ids: Dict[Tuple, int] = {}
+        self._entry_key: List[int] = []   # one entry per (row, key)
+        self._entry_row: List[int] = []
+        self._sort_text: List[str] = []   # per row, orders oversized blocks
+        self.n_rows = 0
+
+    def add(self, addresses: Iterable[Address], sort_texts: Optional[Iterable[str]] = None) -> None:
+        """`sort_texts`: folded texts (fold_text) when the caller already has them."""
+        addresses = list(addresses)
+        if sort_texts is None:
+            sort_texts = (fold_text(a.text) for a in addresses)
+        for addr, sort_text in zip(addresses, sort_texts):
+            row = self.n_rows
+            for key in block_keys(addr, self.config):
+                self._entry_key.append(self._key_ids.setdefault(key, len(self._key_ids)))
+                self._entry_row.append(row)
+            self._sort_text.append(sort_text)
+            self.n_rows += 1
+
+    def blocks(self) -> Iterator[np.ndarray]:
+        """Row ids of every block with at least two members."""
+        keys = np.asarray(self._entry_key, dtype=np.int64)
+        rows = np.asarray(self._entry_row, dtype=np.int64)
+        if keys.size == 0:
+            return
+        order = np.argsort(keys, kind="stable")
+        keys, rows = keys[order], rows[order]
+        bounds = np.flatnonzero(np.diff(keys)) + 1
+        starts = np.concatenate(([0], bounds))
+        ends = np.concatenate((bounds, [keys.size]))
+        for s, e in zip(starts[ends - starts > 1], ends[ends - starts > 1]):
+            yield rows[s:e]
+
+    def _block_pairs(self, members: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        k = members.size
+        cap = self.config.max_block_size
+        if k <= cap:
+            i, j = np.triu_indices(k, 1)
+            return members[i], members[j]
+        if self.config.oversize == "skip":
+            return members[:0], members[:0]
+        # sorted-neighbourhood: pair each member with the next cap-1 members in text order
+        ordered = members[np.argsort([self._sort_text[r] for r in members], kind="stable")]
+        left = [ordered[:-d] for d in range(1, cap)]
+        right = [ordered[d:] for d in range(1, cap)]
+        return np.concatenate(left), np.concatenate(right)
+
+    def iter_pairs(self, batch_size: int = 1_000_000) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        (left, right) arrays of roughly `batch_size` pairs, left < right, deduplicated within a
+        batch. A pair shared by two blocks may repeat across batches; candidate_pairs() removes
+        those, and union-find clustering is unaffected by them.
+        """
+        buf_l: List[np.ndarray] = []
+        buf_r: List[np.ndarray] = []
+        size = 0
+        for members in self.blocks():
+            l, r = self._block_pairs(members)
+            buf_l.append(l)
+            buf_r.append(r)
+            size += l.size
+            if size >= batch_size:
+                yield dedup_pairs(np.concatenate(buf_l), np.concatenate(buf_r))
+                buf_l, buf_r, size = [], [], 0
+        if size:
+            yield dedup_pairs(np.concatenate(buf_l), np.concatenate(buf_r))
+
+    def candidate_pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """All candidate pairs at once, deduplicated across blocks."""
+        parts = list(self.iter_pairs())
+        if not parts:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+        return dedup_pairs(np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts]))
+
+    def stats(self) -> Dict[str, int]:
+        sizes = [b.size for b in self.blocks()]
+        return {
+            "rows": self.n_rows,
+            "keys": len(self._key_ids),
+            "blocks": len(sizes),
+            "largest_block": max(sizes, default=0),
+            "oversize_blocks": sum(1 for s in sizes if s > self.config.max_block_size),
+        }
+
+
+def dedup_pairs(left: np.ndarray, right: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Orient pairs as (min, max) and drop duplicates; output is sorted."""
+    lo = np.minimum(left, right)
+    hi = np.maximum(left, right)
+    packed = np.unique((lo << 32) | hi)  # row ids < 2^32
+    return packed >> 32, packed & 0xFFFFFFFF
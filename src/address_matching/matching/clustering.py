@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+clustering.py
+-------------
+Turns candidate pairs + pairwise scores into one cluster label per address (the goldset's
+"cluster" column).
+
+Pairs scoring at least `threshold` are merged with an array-backed union-find:
+    * the forest is a single int32/int64 parent array (4 or 8 bytes per row, nothing per pair)
+    * a batch of pairs is merged at once: both ends are resolved to their roots, and the larger
+      root is hooked under the smaller one with np.minimum.at; this repeats until every pair of
+      the batch shares a root, so the root of a component is always its smallest row id
+    * find() compresses the paths it walks (pointer jumping on the queried rows); labels()
+      flattens the whole forest first
+
+Pair batches are consumed one at a time (BlockIndex.iter_pairs(), MinHashLSH.candidate_pairs(),
+a scorer over those), so memory stays at the parent array plus one batch.
+
+Example:
+    uf = UnionFind(len(addresses))
+    for left, right in index.iter_pairs():
+        uf.union(left, right, scores=scorer(left, right), threshold=0.5)
+    labels = uf.labels()                        # 0..k-1, numbered by smallest member
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+
+class UnionFind:
+    def __init__(self, n: int):
+        dtype = np.int32 if n < 2 ** 31 else np.int64
+        self.parent = np.arange(n, dtype=dtype)
+
+    def __len__(self) -> int:
+        return self.parent.size
+
+    def find(self, rows: np.ndarray) -> np.ndarray:
+        """Roots of `rows`; the walked rows are pointed straight at their roots."""
+        rows = np.asarray(rows, dtype=np.int64)
+        roots = self.parent[rows]
+        while True:
+            up = self.parent[roots]
+            if np.array_equal(up, roots):
+                break
+            roots = up
+        self.parent[rows] = roots
+        return roots
+
+    def union(self, left: np.ndarray, right: np.ndarray, scores: Optional[np.ndarray] = None,
+              threshold: float = 0.5) -> int:
+        """Merge every (left[i], right[i]) pair, only those with scores[i] >= threshold if given.
+        Returns the number of merges (components removed)."""
+        left = np.asarray(left, dtype=np.int64)
+        right = np.asarray(right, dtype=np.int64)
+        if scores is not None:
+            keep = np.asarray(scores) >= threshold
+            left, right = left[keep], right[keep]
+        merges = 0
+        while left.size:
+            a, b = self.find(left), self.find(right)
+            differ = a != b
+            left, right, a, b = left[differ], right[differ], a[differ], b[differ]
+            if not left.size:
+                break
+            lo, hi = np.minimum(a, b), np.maximum(a, b)
+            # hooks always point to a smaller id, so no cycles; each hooked root is one merge.
+            # Several pairs can hook the same root and only the smallest target wins: loop.
+            np.minimum.at(self.parent, hi, lo)
+            merges += np.unique(hi).size
+        return merges
+
+    def flatten(self) -> None:
+        """Point every row at its root (pointer jumping over the whole array)."""
+        p = self.parent
+        while True:
+            up = p[p]
+            if np.array_equal(up, p):
+                break
+            p = up
+        self.parent = p
+
+    def roots(self) -> np.ndarray:
+        """Root (smallest member) of every row."""
+        self.flatten()
+        return self.parent
+
+    def labels(self) -> np.ndarray:
+        """Dense cluster labels 0..k-1 per row, numbered in order of each cluster's smallest row."""
+        roots = self.roots()
+        is_root = roots == np.arange(roots.size)
+        return (np.cumsum(is_root, dtype=roots.dtype) - 1)[roots]  # no sort: roots are row ids
+
+    def n_clusters(self) -> int:
+        return int(np.count_nonzero(self.parent == np.arange(self.parent.size)))
+
+
+def cluster_pairs(n: int, batches: Iterable[Tuple[np.ndarray, ...]], threshold: float = 0.5) -> np.ndarray:
+    """
+    Cluster labels for `n` rows from streamed (left, right) or (left, right, score) batches,
+    e.g. cluster_pairs(len(addresses), index.iter_pairs()).
+    """
+    uf = UnionFind(n)
+    for batch in batches:
+        left, right = batch[0], batch[1]
+        scores = batch[2] if len(batch) > 2 else None
+        uf.union(left, right, scores=scores, threshold=threshold)
+    return uf.labels()
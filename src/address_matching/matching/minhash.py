@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+minhash.py
+----------
+MinHash / banded-LSH near-duplicate candidates over normalized address text.
+
+The block index needs gazetteer ids; addresses the parser could not resolve fall through it.
+This matcher needs only the text:
+    1) shingles: character n-grams and token n-grams of AddressNormalizer.normalize(text),
+       hashed to 32-bit ints (crc32, stable across runs/processes)
+    2) signatures: `num_perm` universal hashes h(x) = (a*x + b) mod (2^31 - 1); the minimum per
+       document is taken with one NumPy reduceat over all shingles of a batch of documents
+    3) LSH: the signature is cut into `bands` bands of `rows` values; documents sharing any
+       band land in the same bucket and become candidates; a bucket larger than max_bucket_size
+       is not expanded all-pairs: with oversize="window" (as in blocking.py) its members are
+       sorted by signature and each is paired with the next max_bucket_size - 1, so addresses
+       repeated thousands of times still link up; oversize="skip" drops it
+    4) candidates whose estimated Jaccard (share of equal signature values) is below
+       `threshold` are dropped
+
+Cost is linear in the number of shingles plus the bucket pairs.
+
+Example:
+    lsh = MinHashLSH(threshold=0.6)
+    left, right, jaccard = lsh.candidate_pairs(texts)
+"""
+
+from __future__ import annotations
+
+import sys
+import zlib
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..normalization import AddressNormalizer
+from .blocking import dedup_pairs
+
+_PRIME = np.uint64((1 << 31) - 1)
+_EMPTY = np.uint32((1 << 32) - 1)  # signature value of a document without shingles
+
+_normalizer = AddressNormalizer()
+
+
+def shingles(text: str, char_n: int = 3, token_n: int = 2) -> List[str]:
+    """Character n-grams of the padded normalized text plus token n-grams (namespaced with '|')."""
+    norm = _normalizer.normalize(text)
+    padded = f" {norm} "
+    out = {padded[i:i + char_n] for i in range(max(len(padded) - char_n + 1, 0))}
+    tokens = norm.split()
+    if token_n > 0:
+        out.update("|" + " ".join(tokens[i:i + token_n]) for i in range(max(len(tokens) - token_n + 1, 0)))
+    return list(out)
+
+def hash_shingles(items: Iterable[str]) -> np.ndarray:
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in items), dtype=np.uint64)
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    (bands, rows) with bands * rows == num_perm whose S-curve midpoint (1/bands)^(1/rows) is the
+    closest one at or below `threshold` (errs towards recall; the Jaccard check removes extras).
+    """
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        mid = (1.0 / bands) ** (1.0 / rows)
+        score = (threshold - mid) if mid <= threshold else 1.0 + (mid - threshold)
+        if best is None or score < best[0]:
+            best = (score, bands, rows)
+    return best[1], best[2]
+
+
+class MinHashLSH:
+    def __init__(self, num_perm: int = 64, threshold: float = 0.6, bands: Optional[int] = None,
+                 char_n: int = 3, token_n: int = 2, max_bucket_size: int = 200, oversize: str = "window",
+                 batch_shingles: int = 1 << 16, seed: int = 1):
+        if oversize not in ("window", "skip"):
+            raise ValueError(f"Unknown oversize mode '{oversize}'. Choose 'window' or 'skip'.")
+        if max_bucket_size < 2:
+            raise ValueError("max_bucket_size must be >= 2")
+        if bands is None:
+            bands, rows = choose_bands(num_perm, threshold)
+        elif num_perm % bands:
+            raise ValueError(f"bands ({bands}) must divide num_perm ({num_perm})")
+        else:
+            rows = num_perm // bands
+        self.num_perm = num_perm
+        self.threshold = threshold
+        self.bands, self.rows = bands, rows
+        self.char_n, self.token_n = char_n, token_n
+        self.max_bucket_size = max_bucket_size
+        self.oversize = oversize
+        self.stats = {"oversize_buckets": 0}
+        self.batch_shingles = batch_shingles
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, int(_PRIME), size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, int(_PRIME), size=num_perm).astype(np.uint64)
+        # odd multipliers that fold one band's values into a single bucket key
+        self._band_mix = (rng.randint(1, 1 << 62, size=rows).astype(np.uint64) << np.uint64(1)) | np.uint64(1)
+
+    # ---------- signatures ----------
+
+    def signatures(self, texts: Sequence[str]) -> np.ndarray:
+        """(len(texts), num_perm) uint32 MinHash signatures."""
+        hashed = [hash_shingles(shingles(t, self.char_n, self.token_n)) for t in texts]
+        return self.signatures_from_hashes(hashed)
+
+    def signatures_from_hashes(self, hashed: Sequence[np.ndarray]) -> np.ndarray:
+        n = len(hashed)
+        sig = np.full((n, self.num_perm), _EMPTY, dtype=np.uint32)
+        lengths = np.fromiter((h.size for h in hashed), dtype=np.int64, count=n)
+        doc = 0
+        while doc < n:
+            # a batch of documents holding about `batch_shingles` shingles
+            end = doc + 1
+            total = lengths[doc]
+            while end < n and total + lengths[end] <= self.batch_shingles:
+                total += lengths[end]
+                end += 1
+            docs = np.arange(doc, end)[lengths[doc:end] > 0]
+            if docs.size:
+                x = np.concatenate([hashed[d] for d in docs]) % _PRIME
+                vals = (self._a[:, None] * x[None, :] + self._b[:, None]) % _PRIME  # (num_perm, shingles)
+                starts = np.concatenate(([0], np.cumsum(lengths[docs])[:-1]))
+                sig[docs] = np.minimum.reduceat(vals, starts, axis=1).T.astype(np.uint32)
+            doc = end
+        return sig
+
+    # ---------- LSH ----------
+
+    def _band_pairs(self, band_keys: np.ndarray, rank: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Pairs sharing a bucket of one band; `rank` orders the members of oversized buckets."""
+        order = np.argsort(band_keys, kind="stable")
+        keys = band_keys[order]
+        bounds = np.flatnonzero(np.diff(keys)) + 1
+        starts = np.concatenate(([0], bounds))
+        ends = np.concatenate((bounds, [keys.size]))
+        sizes = ends - starts
+        cap = self.max_bucket_size
+        left, right = [], []
+        for s, e in zip(starts[sizes > 1], ends[sizes > 1]):
+            members = order[s:e]
+            if e - s <= cap:
+                i, j = np.triu_indices(e - s, 1)
+                left.append(members[i])
+                right.append(members[j])
+                continue
+            self.stats["oversize_buckets"] += 1
+            if self.oversize == "skip":
+                continue
+            # sorted-neighbourhood: equal / close signatures are adjacent
+            ordered = members[np.argsort(rank[members], kind="stable")]
+            left.extend(ordered[:-d] for d in range(1, cap))
+            right.extend(ordered[d:] for d in range(1, cap))
+        if not left:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+        return np.concatenate(left), np.concatenate(right)
+
+    def candidate_pairs(self, texts: Optional[Sequence[str]] = None,
+                        signatures: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (left, right, jaccard): row pairs (left < right) sharing an LSH bucket whose estimated
+        Jaccard similarity is at least `threshold`. Pass `texts` or precomputed `signatures`.
+        """
+        if signatures is None:
+            signatures = self.signatures(texts)
+        rows_with_shingles = np.flatnonzero((signatures != _EMPTY).any(axis=1))
+        sig = signatures[rows_with_shingles]
+        rank = np.empty(sig.shape[0], dtype=np.int64)
+        rank[np.lexsort(sig.T[::-1])] = np.arange(sig.shape[0])  # lexicographic signature order
+        self.stats["oversize_buckets"] = 0
+        left_parts, right_parts = [], []
+        for b in range(self.bands):
+            band = sig[:, b * self.rows:(b + 1) * self.rows].astype(np.uint64)
+            keys = (band * self._band_mix[None, :]).sum(axis=1, dtype=np.uint64)  # wraps mod 2^64
+            l, r = self._band_pairs(keys, rank)
+            left_parts.append(rows_with_shingles[l])
+            right_parts.append(rows_with_shingles[r])
+        if self.stats["oversize_buckets"]:
+            action = "windowed" if self.oversize == "window" else "skipped"
+            sys.stderr.write(f"[warn] MinHashLSH: {self.stats['oversize_buckets']} bucket(s) larger than "
+                             f"max_bucket_size={self.max_bucket_size} {action}.\n")
+        left, right = dedup_pairs(np.concatenate(left_parts), np.concatenate(right_parts))
+        jaccard = (signatures[left] == signatures[right]).mean(axis=1) if left.size else np.empty(0)
+        keep = jaccard >= self.threshold
+        return left[keep], right[keep], jaccard[keep]
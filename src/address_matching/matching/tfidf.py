@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+tfidf.py
+--------
+Top-k lookup of query addresses against a large reference set with char n-gram TF-IDF cosine.
+
+Build once, persist, then answer queries in batches:
+
+    index = TfidfIndex.build(reference_texts)          # normalize() -> char 3-grams -> hashed ids
+    index.save("models/ref_index")
+    index = TfidfIndex.load("models/ref_index")        # .npy files are memory-mapped
+    q, ref, score = index.query(query_texts, k=5)      # flat arrays, per query best first
+
+The matrix is stored column-wise (an inverted index: feature -> reference rows and weights), the
+CSC layout of the reference TF-IDF matrix, in plain NumPy arrays (no scipy dependency). A batch
+of queries is scored as a sparse product: the posting lists of the query features are gathered
+in one vectorized step, partial products are summed per (query, reference) key, and a per-query
+top-k is taken. Batches are cut so that at most `max_postings` partial products are alive at a
+time, which bounds memory regardless of the reference size.
+
+Speed on big reference sets comes from skipping features that carry little evidence:
+    * max_df: features present in more than this share of references ("mah", "sk ", city names)
+      are left out of the inverted index; their idf is near zero anyway. Only applied from
+      `max_df_min_rows` references on: in a small set every n-gram is "frequent" and pruning
+      would empty the index
+    * max_query_terms: only the highest-idf features of each query are looked up (rare features
+      have short posting lists); the query norm still counts every feature
+Scores are the cosine restricted to the looked-up features, so they never exceed the full cosine.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .minhash import hash_shingles, shingles
+
+FORMAT_VERSION = 1
+MAX_DF_MIN_ROWS = 1000
+_ARRAYS = ("indptr", "indices", "data", "idf")
+
+
+def featurize(texts: Iterable[str], char_n: int, n_features: int) -> Tuple[np.ndarray, np.ndarray, int]:
+    """(row, feature) arrays of the distinct hashed char n-grams of every text, plus the row count."""
+    hashed: List[np.ndarray] = []
+    for t in texts:
+        hashed.append(np.unique(hash_shingles(shingles(t or "", char_n, token_n=0)) % np.uint64(n_features)))
+    lengths = np.fromiter((h.size for h in hashed), dtype=np.int64, count=len(hashed))
+    rows = np.repeat(np.arange(len(hashed), dtype=np.int64), lengths)
+    feats = np.concatenate(hashed).astype(np.int64) if hashed else np.empty(0, dtype=np.int64)
+    return rows, feats, len(hashed)
+
+def _gather_ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Concatenation of arange(s, s + l) for every (s, l) without a Python loop."""
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(starts - offsets, lengths) + np.arange(total, dtype=np.int64)
+
+
+class TfidfIndex:
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, idf: np.ndarray,
+                 n_rows: int, char_n: int = 3, max_df: float = 0.05):
+        self.indptr = indptr      # (n_features + 1,) int64, posting list bounds per feature
+        self.indices = indices    # (nnz,) int32 reference rows
+        self.data = data          # (nnz,) float32 l2-normalized tf-idf weights
+        self.idf = idf            # (n_features,) float32, also for features dropped by max_df
+        self.n_rows = n_rows
+        self.char_n = char_n
+        self.max_df = max_df
+
+    @property
+    def n_features(self) -> int:
+        return self.idf.size
+
+    # ---------- build / persist ----------
+
+    @classmethod
+    def build(cls, texts: Sequence[str], char_n: int = 3, n_features: int = 1 << 20,
+              max_df: float = 0.05, max_df_min_rows: int = MAX_DF_MIN_ROWS) -> "TfidfIndex":
+        """
+        Binary tf (n-grams are deduplicated per address), smooth idf = ln((1 + N) / (1 + df)) + 1,
+        l2-normalized rows. Norms are taken before max_df pruning so pruned features still count.
+        Below `max_df_min_rows` references nothing is pruned (the index records max_df = 1.0).
+        """
+        rows, feats, n = featurize(texts, char_n, n_features)
+        if n < max_df_min_rows:
+            max_df = 1.0
+        df = np.bincount(feats, minlength=n_features)
+        idf = (np.log((1.0 + n) / (1.0 + df)) + 1.0).astype(np.float32)
+        weights = idf[feats]
+        norms = np.sqrt(np.bincount(rows, weights=weights.astype(np.float64) ** 2, minlength=n))
+        weights = (weights / np.maximum(norms[rows], 1e-12)).astype(np.float32)
+
+        keep = df[feats] <= max(max_df * n, 1.0)
+        rows, feats, weights = rows[keep], feats[keep], weights[keep]
+        order = np.argsort(feats, kind="stable")  # rows stay ascending inside a posting list
+        indptr = np.zeros(n_features + 1, dtype=np.int64)
+        np.cumsum(np.bincount(feats, minlength=n_features), out=indptr[1:])
+        return cls(indptr, rows[order].astype(np.int32), weights[order], idf, n, char_n, max_df)
+
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        meta = {"format": FORMAT_VERSION, "n_rows": self.n_rows, "char_n": self.char_n,
+                "max_df": self.max_df, "n_features": self.n_features}
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "TfidfIndex":
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported TF-IDF index format {meta.get('format')} in {path}")
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+                  for name in _ARRAYS}
+        return cls(n_rows=meta["n_rows"], char_n=meta["char_n"], max_df=meta["max_df"], **arrays)
+
+    # ---------- query ----------
+
+    def _query_terms(self, texts: Sequence[str], max_query_terms: Optional[int]):
+        rows, feats, n = featurize(texts, self.char_n, self.n_features)
+        weights = self.idf[feats].astype(np.float64)
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=n))
+        weights = weights / np.maximum(norms[rows], 1e-12)
+        lengths = self.indptr[feats + 1] - self.indptr[feats]
+        keep = lengths > 0
+        rows, feats, weights, lengths = rows[keep], feats[keep], weights[keep], lengths[keep]
+        if max_query_terms is not None:
+            # keep the highest-idf terms of each query (rows stay grouped and ascending)
+            order = np.lexsort((-weights, rows))
+            rows, feats, weights, lengths = rows[order], feats[order], weights[order], lengths[order]
+            keep = np.arange(rows.size) - np.searchsorted(rows, rows) < max_query_terms
+            rows, feats, weights, lengths = rows[keep], feats[keep], weights[keep], lengths[keep]
+        return rows, feats, weights, lengths, n
+
+    def _score_chunk(self, rows, feats, weights, lengths, k, min_score):
+        pos = _gather_ranges(self.indptr[feats], lengths)
+        partial = self.data[pos] * np.repeat(weights.astype(np.float32), lengths)
+        keys = (np.repeat(rows, lengths) << 32) | self.indices[pos]  # reference rows < 2^32
+        # posting lists are sorted runs of keys: a stable (merge) sort is far cheaper than unique()
+        order = np.argsort(keys, kind="stable")
+        keys, partial = keys[order], partial[order]
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        scores = np.add.reduceat(partial, starts)
+        q, ref = keys[starts] >> 32, keys[starts] & 0xFFFFFFFF
+        # one int64 sort by (query, score desc): bits of non-negative float32 sort like the values
+        score_bits = scores.astype(np.float32).view(np.uint32).astype(np.int64)
+        order = np.argsort((q << 32) | (0xFFFFFFFF - score_bits))
+        q, ref, scores = q[order], ref[order], scores[order]
+        rank = np.arange(q.size) - np.searchsorted(q, q)
+        keep = (rank < k) & (scores >= min_score)
+        return q[keep], ref[keep], scores[keep]
+
+    def query(self, texts: Sequence[str], k: int = 5, min_score: float = 0.0,
+              max_query_terms: Optional[int] = 16, max_postings: int = 1 << 22
+              ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (query_row, reference_row, score) for the top-k references of every query, grouped by
+        query and best first. Queries without a shared feature get no rows.
+        """
+        rows, feats, weights, lengths, n = self._query_terms(texts, max_query_terms)
+        cum = np.cumsum(np.bincount(rows, weights=lengths, minlength=n))
+        out_q: List[np.ndarray] = []
+        out_r: List[np.ndarray] = []
+        out_s: List[np.ndarray] = []
+        start = 0
+        while start < n:
+            # a chunk of queries with about `max_postings` partial products
+            done = cum[start - 1] if start else 0.0
+            end = max(int(np.searchsorted(cum, done + max_postings, side="right")), start + 1)
+            lo, hi = np.searchsorted(rows, [start, end])
+            if hi > lo:
+                q, r, s = self._score_chunk(rows[lo:hi], feats[lo:hi], weights[lo:hi], lengths[lo:hi], k, min_score)
+                out_q.append(q)
+                out_r.append(r)
+                out_s.append(s)
+            start = end
+        if not out_q:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return np.concatenate(out_q), np.concatenate(out_r), np.concatenate(out_s)
@@ -1 +1,2 @@
-from .normalize_address import AddressNormalizer   
\ No newline at end of file
+from .normalize_address import AddressNormalizer, TR_FOLD_TABLE
+from .numbers import canonical_number, format_number, number_key, number_keys, number_part
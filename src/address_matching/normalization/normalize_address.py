@@ -3,6 +3,11 @@ import unicodedata
 from dataclasses import dataclass, field
 from typing import Pattern, List, Tuple
 
+from ..instrumentation import timed
+
+# Letter folding for ASCII-ish matching (applied after Turkish-aware lowercase)
+TR_FOLD_TABLE = str.maketrans("ıöüğşç", "iougsc")
+
 @dataclass
 class AddressNormalizer:
     """
@@ -114,6 +119,11 @@ class AddressNormalizer:
         """Turkish-aware lowercase conversion (handles İ/i and I/ı)."""
         return s.replace("İ", "i").replace("I", "ı").lower()
 
+    @staticmethod
+    def fold(s: str) -> str:
+        """Turkish-aware lowercase + TR_FOLD_TABLE: 'Şişli Çarşı' -> 'sisli carsi'."""
+        return AddressNormalizer.tr_lower(s).translate(TR_FOLD_TABLE)
+
     @staticmethod
     def _space_punct_soften(text: str) -> str:
         """
@@ -209,6 +219,7 @@ class AddressNormalizer:
         return self.re_street.sub(self.canon_street, text)
 
     # -------------------- Main Pipeline -------------------------
+    @timed("normalize")
     def normalize(self, text: str, lowercase: bool = True) -> str:
         """
         Full normalization pipeline:
@@ -238,6 +249,7 @@ class AddressNormalizer:
         return s
     
     # -------------------- Static Parser Variant ------------------
+    @timed("normalize.static")
     def normalize_static_parser(self, text: str) -> str:
         """
         Static parser–oriented normalization.
@@ -258,12 +270,7 @@ class AddressNormalizer:
         s = self.normalize_punctuation(s)
         s = self.tr_lower(s)
         s = self.normalize_numbers(s)
-        s = (s.replace("ı", "i")
-            .replace("ö", "o")
-            .replace("ü", "u")
-            .replace("ğ", "g")
-            .replace("ş", "s")
-            .replace("ç", "c"))
+        s = s.translate(TR_FOLD_TABLE)
         s = re.sub(r"\s+", " ", s).strip()
         return s
 
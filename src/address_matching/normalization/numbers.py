@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+numbers.py
+----------
+Canonical building / flat / floor / street numbers, so that numbers can be compared by equality.
+
+    canonical_number("no:9b", "BINA_NO")      -> (9, "b")
+    canonical_number("9/B", "BINA_NO")        -> (9, "b")
+    canonical_number("No 9 B", "BINA_NO")     -> (9, "b")
+    canonical_number("d:5", "DAIRE_NO")       -> (5, "")
+    canonical_number("daire a14", "DAIRE_NO") -> (14, "a")
+    canonical_number("zemin kat", "KAT")      -> (0, "")
+    canonical_number("6518 / 6 sk.", "SOKAK") -> (6518, "6")
+    canonical_number("Açelya Sokak", "SOKAK") -> None      (named street, not a number)
+
+The text is folded with normalize_static_parser (letters and digits split apart, punctuation as
+separate tokens), the tag's indicator words ("no", "daire", "kat", "sk", ...) are dropped and
+what is left must be a number with at most one suffix: a single letter, or for streets a
+"/<number>" sub-street. Anything else yields None.
+
+number_key() packs the result into one int64, usable as a hash-blocking key and an equality
+feature: (number << 16) | suffix code, MISSING_KEY (the int64 minimum) when there is no number.
+number_part(key) recovers the bare number, e.g. to block 9 and 9b together and let the scorer
+tell them apart. Floors can be negative (bodrum = -1), so neither the packed nor the bare
+value of a real number can equal MISSING_KEY / number_part(MISSING_KEY).
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from .normalize_address import AddressNormalizer
+
+NUMBER_TAGS = ("BINA_NO", "DAIRE_NO", "KAT", "SOKAK")
+MISSING_KEY = -(1 << 63)  # int64 minimum: packed numbers stay far above it, even negative floors
+
+# Indicator words per tag (after normalize_static_parser: lowercase, folded, split)
+_INDICATORS: Dict[str, set] = {
+    "BINA_NO": {"no", "numara", "nolu", "numarali", "bina", "n", "nu", "num", "dis", "kapi"},
+    "DAIRE_NO": {"daire", "d", "no", "nolu", "numara", "dr", "da", "ic", "kapi", "oda"},
+    "KAT": {"kat", "k", "kati", "katta", "no"},
+    "SOKAK": {"sk", "so", "sok", "sokak", "sokagi", "no", "nolu", "nci", "inci", "uncu", "ncu"},
+}
+_FLOOR_WORDS = {"zemin": 0, "giris": 0, "bodrum": -1, "cati": 99}
+_NUMBER_WORDS = {"bir": "1", "iki": "2", "uc": "3", "dort": "4", "bes": "5",
+                 "alti": "6", "yedi": "7", "sekiz": "8", "dokuz": "9", "on": "10"}
+_SKIP = {":", ".", ",", "#", "(", ")", "_"}
+
+_normalizer = AddressNormalizer()
+
+Number = Tuple[int, str]
+
+
+def _number_with_suffix(tokens, letter_first: bool) -> Optional[Number]:
+    """['9'] / ['9', 'b'] / (letter_first) ['a', '14'] -> (number, suffix); None otherwise."""
+    if len(tokens) == 1 and tokens[0].isdigit():
+        return int(tokens[0]), ""
+    if len(tokens) == 2:
+        first, second = tokens
+        if first.isdigit() and len(second) == 1 and second.isalpha():
+            return int(first), second
+        if letter_first and second.isdigit() and len(first) == 1 and first.isalpha():
+            return int(second), first
+    return None
+
+@lru_cache(maxsize=65536)
+def canonical_number(text: Optional[str], tag: str = "BINA_NO") -> Optional[Number]:
+    """(number, suffix) of a BINA_NO / DAIRE_NO / KAT / SOKAK entity text, None if there is none."""
+    if tag not in _INDICATORS:
+        raise ValueError(f"Unknown number tag '{tag}'. Choose one of {NUMBER_TAGS}.")
+    if not text:
+        return None
+    words = [_NUMBER_WORDS.get(w, w) for w in _normalizer.normalize_static_parser(text).split()
+             if w not in _INDICATORS[tag] and w not in _SKIP]
+    if tag == "KAT":
+        for w in words:
+            if w in _FLOOR_WORDS:
+                return _FLOOR_WORDS[w], ""
+        if len(words) >= 2 and words[-2] == "-" and words[-1].isdigit():  # "kat -1"
+            return -int(words[-1]), ""
+    words = [w for w in words if w != "-"]  # "no - 1", "C-28"
+    segments = [s.split() for s in " ".join(words).split("/")]
+    segments = [s for s in segments if s]
+    if not segments:
+        return None
+
+    if tag == "DAIRE_NO":
+        # "b 1 / 8" -> 8: the flat is the last part; a lone letter ("/ a") is a lettered flat
+        last = segments[-1]
+        if len(last) == 1 and len(last[0]) == 1 and last[0].isalpha():
+            return 0, last[0]
+        return _number_with_suffix(last, letter_first=True)
+
+    if tag == "KAT":
+        return _number_with_suffix(segments[-1], letter_first=False) if len(segments) == 1 else None
+
+    head = _number_with_suffix(segments[0], letter_first=tag == "BINA_NO")  # "C2" -> 2c
+    if head is None or len(segments) > 2:
+        return None
+    if len(segments) == 1:
+        return head
+    rest = segments[1]
+    if tag == "SOKAK":
+        # "6518 / 6": numbered sub-street
+        if head[1] or len(rest) != 1 or not rest[0].isdigit():
+            return None
+        return head[0], rest[0].lstrip("0") or "0"
+    # BINA_NO "44 / b" -> 44b; "12 / 3" (building / flat) -> 12
+    if not head[1] and len(rest) == 1 and len(rest[0]) == 1 and rest[0].isalpha():
+        return head[0], rest[0]
+    return head
+
+def format_number(number: Optional[Number]) -> Optional[str]:
+    """(9, 'b') -> '9b', (6518, '6') -> '6518/6', None -> None."""
+    if number is None:
+        return None
+    value, suffix = number
+    if suffix.isdigit():
+        return f"{value}/{suffix}"
+    return f"{value}{suffix}"
+
+
+# ---------- packed keys ----------
+
+def _suffix_code(suffix: str) -> int:
+    if not suffix:
+        return 0
+    if suffix.isdigit():
+        return 32 + min(int(suffix), 0xFFFF - 32)   # sub-street numbers
+    return 1 + (ord(suffix) - ord("a")) % 31          # letters: 1..26 (folded ASCII)
+
+def pack_number(number: Optional[Number]) -> int:
+    if number is None:
+        return MISSING_KEY
+    value, suffix = number
+    return (value << 16) | _suffix_code(suffix)
+
+def number_key(text: Optional[str], tag: str = "BINA_NO") -> int:
+    """Packed int64 key of canonical_number(text, tag); MISSING_KEY if there is no number."""
+    return pack_number(canonical_number(text, tag))
+
+def number_keys(texts: Iterable[Optional[str]], tag: str = "BINA_NO") -> np.ndarray:
+    return np.fromiter((number_key(t, tag) for t in texts), dtype=np.int64)
+
+def number_part(keys):
+    """Bare number of packed keys (drops the suffix); works on ints and int64 arrays."""
+    return keys >> 16
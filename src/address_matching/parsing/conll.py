@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+conll.py
+--------
+Readers and entity-level scoring for the BIO-tagged CoNLL files in data/:
+    - data/goldset/goldset_1k_yegeb.conll   ("raw text, cluster, group" headers, TAB separated)
+    - data/tugce_250.conll                  ("raw text,cluster,group" headers, space separated)
+    - data/baris_250.conll                  ("cluster,raw text" headers, space separated)
+    - synth output of data/synth/generate_*_BIO_synth.py (same layout as the goldset)
+
+Each block is a header line followed by one "token TAG" line per token and a blank line.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+_TAG_RE = re.compile(r"^(O|[BI]-[A-Za-z_]+|[A-Z_]{2,})$")
+_HEADER_TAIL_RE = re.compile(r"^(?P<text>.*?),\s*(?P<cluster>\d+)\s*,\s*(?P<group>[A-Za-z0-9]+)\s*$")
+_HEADER_HEAD_RE = re.compile(r"^(?P<cluster>\d+),(?P<text>.*)$")
+
+
+@dataclass
+class ConllSentence:
+    text: str                 # raw address from the header line
+    tokens: List[str]
+    tags: List[str]
+    cluster: Optional[str] = None
+    group: Optional[str] = None
+
+
+# ---------- reading ----------
+
+def _parse_header(line: str) -> Tuple[str, Optional[str], Optional[str]]:
+    m = _HEADER_TAIL_RE.match(line)
+    if m:
+        return m.group("text").strip(), m.group("cluster"), m.group("group")
+    m = _HEADER_HEAD_RE.match(line)
+    if m:
+        return m.group("text").strip(), m.group("cluster"), None
+    return line.strip(), None, None
+
+def _parse_token_line(line: str) -> Optional[Tuple[str, str]]:
+    parts = line.split()
+    if len(parts) != 2 or not _TAG_RE.match(parts[1]):
+        return None
+    tok, tag = parts[0], parts[1].upper()
+    if tag != "O" and tag[1:2] != "-":
+        # hand-annotated files sometimes drop the prefix ("TARIF"); treat as a continuation
+        tag = f"I-{tag}"
+    return tok, tag
+
+def read_conll(path: str) -> List[ConllSentence]:
+    """
+    Parse a CoNLL file into sentences. Markdown fences and blank lines are skipped;
+    the first non-token line of each block is taken as its header.
+    """
+    out: List[ConllSentence] = []
+    cur: Optional[ConllSentence] = None
+    with open(path, encoding="utf-8") as f:
+        for raw_line in f:
+            line = raw_line.rstrip("\n")
+            if not line.strip() or line.strip().startswith("```"):
+                if cur is not None and cur.tokens:
+                    out.append(cur)
+                cur = None
+                continue
+            tok = _parse_token_line(line) if cur is not None else None
+            if tok is None:
+                if cur is not None and cur.tokens:
+                    out.append(cur)
+                text, cluster, group = _parse_header(line)
+                cur = ConllSentence(text=text, tokens=[], tags=[], cluster=cluster, group=group)
+                continue
+            cur.tokens.append(tok[0])
+            cur.tags.append(tok[1])
+    if cur is not None and cur.tokens:
+        out.append(cur)
+    return out
+
+
+# ---------- entity scoring ----------
+
+def bio_entities(tags: Sequence[str]) -> List[Tuple[str, int, int]]:
+    """
+    BIO tags -> [(type, start_token, end_token_exclusive)].
+    An I- tag that does not continue an entity of the same type opens a new one (conlleval rule).
+    """
+    ents: List[Tuple[str, int, int]] = []
+    cur_type: Optional[str] = None
+    cur_start = 0
+    for i, tag in enumerate(tags):
+        bi, _, typ = tag.partition("-")
+        if tag == "O" or not typ:
+            if cur_type is not None:
+                ents.append((cur_type, cur_start, i))
+            cur_type = None
+            continue
+        if bi == "B" or typ != cur_type:
+            if cur_type is not None:
+                ents.append((cur_type, cur_start, i))
+            cur_type, cur_start = typ, i
+    if cur_type is not None:
+        ents.append((cur_type, cur_start, len(tags)))
+    return ents
+
+def first_entities(tokens: Sequence[str], tags: Sequence[str]) -> Dict[str, str]:
+    """Tag -> text of its first entity (tokens joined with spaces), like the NER `fields`."""
+    out: Dict[str, str] = {}
+    for typ, start, end in bio_entities(tags):
+        out.setdefault(typ, " ".join(tokens[start:end]))
+    return out
+
+def entity_prf(gold: Iterable[Sequence[str]], pred: Iterable[Sequence[str]]) -> Dict[str, Dict[str, float]]:
+    """
+    Exact-match entity precision/recall/F1 per type plus micro average under "ALL".
+    Returns {type: {"precision", "recall", "f1", "support"}}.
+    """
+    tp: Dict[str, int] = {}
+    n_gold: Dict[str, int] = {}
+    n_pred: Dict[str, int] = {}
+    for g_tags, p_tags in zip(gold, pred):
+        g = set(bio_entities(g_tags))
+        p = set(bio_entities(p_tags))
+        for typ, _, _ in g:
+            n_gold[typ] = n_gold.get(typ, 0) + 1
+        for typ, _, _ in p:
+            n_pred[typ] = n_pred.get(typ, 0) + 1
+        for typ, _, _ in g & p:
+            tp[typ] = tp.get(typ, 0) + 1
+
+    def _prf(t: int, ng: int, np_: int) -> Dict[str, float]:
+        prec = t / np_ if np_ else 0.0
+        rec = t / ng if ng else 0.0
+        f1 = 2 * prec * rec / (prec + rec) if prec + rec else 0.0
+        return {"precision": prec, "recall": rec, "f1": f1, "support": ng}
+
+    out = {typ: _prf(tp.get(typ, 0), n_gold.get(typ, 0), n_pred.get(typ, 0))
+           for typ in sorted(set(n_gold) | set(n_pred))}
+    out["ALL"] = _prf(sum(tp.values()), sum(n_gold.values()), sum(n_pred.values()))
+    return out
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+hybrid_parser.py
+----------------
+Static parser first, NER only where the static result is incomplete or ambiguous.
+
+StaticAddressParser is exact on gazetteer names and costs microseconds; the BERTurk NER is
+robust but costs a forward pass. Each address is first resolved statically and given a
+confidence; only addresses under --min-confidence are batched through the NER model.
+Both results are merged into one record:
+    province / district / neighbourhood  (gazetteer keys; static first, then snapped NER spans)
+    confidence, route ("static" | "ner"), ambiguity flags
+    fields                                (NER tag -> first entity text, e.g. "SOKAK": "1004 sokak";
+                                           static rows: street_fields() by indicator words)
+    pred_tags / entities_json / entities_flat  (empty for static-only rows)
+
+Example:
+python hybrid_parser.py \
+  --model-dir /path/to/BERTurk_stage1_out \
+  --csv /path/to/input.csv \
+  --out /path/to/parsed.csv \
+  --backend direct
+"""
+
+from __future__ import annotations
+import argparse
+import csv
+import json
+import sys
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from .static_parser import StaticAddressParser, TR, street_fields
+    from .. import instrumentation
+    from ..profiling import add_profile_arguments, profile_from_args
+except ImportError:  # run as a script from this directory
+    from static_parser import StaticAddressParser, TR, street_fields
+    from src.address_matching import instrumentation  # static_parser put the project root on sys.path
+    from src.address_matching.profiling import add_profile_arguments, profile_from_args
+
+# Weight of each admin level in the confidence score (sums to 1)
+LEVEL_WEIGHTS = {"province": 0.25, "district": 0.35, "neighbourhood": 0.40}
+# Penalty per ambiguity flag
+AMBIGUITY_PENALTY = 0.2
+
+NerFn = Callable[[List[str]], List[Dict[str, Any]]]
+
+
+# ---------- static confidence ----------
+
+def ambiguity_flags(m: Dict[str, Any]) -> List[str]:
+    """Reasons to distrust a StaticAddressParser.match() result even when fields are filled."""
+    flags: List[str] = []
+    dist = m["district"]
+    if m["province_inferred"] and dist and len(TR.district_union.get(dist, {})) > 1:
+        # district name exists in several provinces and the text never named one
+        flags.append("district_in_many_provinces")
+    if m["neighbourhood"] and not dist:
+        # neighbourhood was searched countrywide, without a district restriction
+        flags.append("unrestricted_neighbourhood")
+    spans = [sp for sp in m["spans"].values() if sp]
+    for i, (s1, e1) in enumerate(spans):
+        for s2, e2 in spans[i + 1:]:
+            if s1 < e2 and s2 < e1:
+                # the same tokens were read as two admin levels (e.g. "merkez")
+                flags.append("overlapping_levels")
+                break
+    return flags
+
+def static_confidence(m: Dict[str, Any], flags: Optional[List[str]] = None) -> float:
+    """Completeness (weighted found levels) minus a fixed penalty per ambiguity flag, in [0, 1]."""
+    if flags is None:
+        flags = ambiguity_flags(m)
+    score = sum(w for level, w in LEVEL_WEIGHTS.items() if m[level])
+    return max(0.0, score - AMBIGUITY_PENALTY * len(flags))
+
+
+# ---------- hybrid parser ----------
+
+def first_entity_fields(entities: List[Dict[str, Any]]) -> Dict[str, str]:
+    """NER tag -> text of its first entity (entities as in `entities_json`)."""
+    fields: Dict[str, str] = {}
+    for e in entities:
+        fields.setdefault(e["type"], e["text"])
+    return fields
+
+class HybridAddressParser:
+    """
+    Routes each address to the static parser or the NER model.
+
+    `ner_fn` takes a list of texts and returns one dict per text with at least
+    `entities_json` (and usually `pred_tags` / `entities_flat`), i.e. the output of
+    ner_address_parser.process_batch / predict_texts. It is only called for routed texts.
+    """
+
+    def __init__(self, ner_fn: Optional[NerFn] = None, static_parser: Optional[StaticAddressParser] = None,
+                 min_confidence: float = 1.0):
+        self.static = static_parser or StaticAddressParser()
+        self.ner_fn = ner_fn
+        self.min_confidence = min_confidence
+        self.stats = {"rows": 0, "routed": 0}
+
+    def parse_batch(self, texts: List[str], folded: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """`folded`: fold_text() of every text when the caller already has it (street_fields input)."""
+        records: List[Dict[str, Any]] = []
+        routed: List[int] = []
+        for i, text in enumerate(texts):
+            m = self.static.match(text)
+            flags = ambiguity_flags(m)
+            conf = static_confidence(m, flags)
+            route = "ner" if (conf < self.min_confidence and self.ner_fn is not None) else "static"
+            records.append({
+                "text": text,
+                "province": m["province"],
+                "district": m["district"],
+                "neighbourhood": m["neighbourhood"],
+                "province_inferred": m["province_inferred"],
+                "confidence": conf,
+                "flags": flags,
+                "route": route,
+                "fields": {},
+                "pred_tags": "",
+                "entities_json": "[]",
+                "entities_flat": "",
+            })
+            if route == "ner":
+                routed.append(i)  # fields come from the NER entities
+            else:
+                records[-1]["fields"] = street_fields(text, folded[i] if folded is not None else None)
+
+        if routed:
+            with instrumentation.span("hybrid.ner", len(routed)):
+                preds = self.ner_fn([texts[i] for i in routed])
+            for i, pred in zip(routed, preds):
+                self._merge(records[i], pred)
+
+        self.stats["rows"] += len(texts)
+        self.stats["routed"] += len(routed)
+        instrumentation.count("hybrid.rows", len(texts))
+        instrumentation.count("hybrid.routed_ner", len(routed))
+        return records
+
+    def parse(self, text: str) -> Dict[str, Any]:
+        return self.parse_batch([text])[0]
+
+    def _merge(self, record: Dict[str, Any], pred: Dict[str, Any]) -> None:
+        """
+        Static admin keys stay authoritative; NER contributes everything below them and fills
+        missing admin levels with its IL/ILCE/MAHALLE spans snapped to the gazetteer (spans that
+        contradict the static province/district are rejected by resolve_admin). A province the
+        static parser only inferred from an ambiguous district name is not authoritative: an NER
+        IL span replaces it, and the static neighbourhood is re-resolved under the new province.
+        The confidence is recomputed from the merged levels.
+        """
+        entities = json.loads(pred["entities_json"])
+        texts: Dict[str, List[str]] = {"IL": [], "ILCE": [], "MAHALLE": []}
+        for e in entities:
+            if e["type"] in texts:
+                texts[e["type"]].append(e["text"])
+        inferred = record.get("province_inferred", False)
+        nbhd_texts = texts["MAHALLE"] + ([record["neighbourhood"]] if inferred and record["neighbourhood"] else [])
+        res = self.static.resolve_admin(texts["IL"], texts["ILCE"], nbhd_texts,
+                                        province=None if inferred else record["province"],
+                                        district=record["district"])
+        if inferred and texts["IL"] and res["province"] and ("province", texts["IL"][0]) not in res["rejected"]:
+            # the NER province decides; the static neighbourhood was searched under the guess
+            record["province"], record["neighbourhood"] = res["province"], res["neighbourhood"]
+            record["province_inferred"] = False
+            record["flags"] = [f for f in record["flags"] if f != "district_in_many_provinces"]
+        for level in LEVEL_WEIGHTS:
+            if not record[level]:
+                record[level] = res[level]
+        record["confidence"] = static_confidence(record, record["flags"])
+        record["fields"] = first_entity_fields(entities)
+        record["pred_tags"] = pred.get("pred_tags", "")
+        record["entities_json"] = pred["entities_json"]
+        record["entities_flat"] = pred.get("entities_flat", "")
+
+    @property
+    def routed_fraction(self) -> float:
+        return self.stats["routed"] / self.stats["rows"] if self.stats["rows"] else 0.0
+
+
+# ---------- CLI ----------
+
+OUT_COLUMNS = ["province", "district", "neighbourhood", "confidence", "route",
+               "pred_tags", "entities_json", "entities_flat"]
+
+def main():
+    try:
+        from . import ner_address_parser as ner
+    except ImportError:
+        import ner_address_parser as ner
+
+    ap = argparse.ArgumentParser(description="Static-first address parsing with NER fallback for low-confidence rows.")
+    ap.add_argument("--model-dir", required=True)
+    ap.add_argument("--csv", required=True)
+    ap.add_argument("--text-col", default="0", help="Index (int) or name (str) of the address column")
+    ap.add_argument("--out", default="parsed.csv")
+    ap.add_argument("--chunk-size", type=int, default=5000, help="Rows per chunk to stream")
+    ap.add_argument("--batch-size", type=int, default=32, help="Texts per NER forward pass")
+    ap.add_argument("--max-batch-tokens", type=int, default=None, help="Token budget per NER forward pass")
+    ap.add_argument("--device", type=int, default=None, help="-1 CPU, 0 GPU0, ...")
+    ap.add_argument("--max-length", type=int, default=None)
+    ap.add_argument("--header", choices=["infer","none"], default="none", help="CSV header mode")
+    ap.add_argument("--backend", choices=list(ner.BACKENDS), default="pipeline")
+    ap.add_argument("--quantize", choices=ner.QUANTIZE_CHOICES, default=None)
+    ap.add_argument("--min-confidence", type=float, default=1.0,
+                    help="Static results below this go to NER (1.0 = anything incomplete or ambiguous)")
+    add_profile_arguments(ap)
+    args = ap.parse_args()
+    profile_from_args(args, args.out)
+
+    try:
+        text_col = int(args.text_col)
+    except ValueError:
+        text_col = args.text_col
+
+    sys.stderr.write(f"[info] Loading model from: {args.model_dir}\n")
+    pipe = ner.load_ner(args.model_dir, device=args.device, quantize=args.quantize, backend=args.backend)
+    ner_fn = lambda texts: ner.predict_texts(pipe, texts, args.batch_size, args.max_length, args.max_batch_tokens)
+    parser = HybridAddressParser(ner_fn=ner_fn, min_confidence=args.min_confidence)
+
+    total_rows = 0
+    with open(args.out, "w", newline="", encoding="utf-8") as fout:
+        writer = None
+        for df_chunk, text_series in ner.iter_csv_chunks(args.csv, args.chunk_size, args.header == "none", text_col):
+            records = parser.parse_batch(text_series.tolist())
+            if writer is None:
+                writer = csv.DictWriter(fout, fieldnames=list(df_chunk.columns) + OUT_COLUMNS)
+                writer.writeheader()
+            for orig, rec in zip(df_chunk.to_dict(orient="records"), records):
+                merged = orig.copy()
+                for col in OUT_COLUMNS:
+                    merged[col] = rec[col]
+                writer.writerow(merged)
+            total_rows += len(records)
+            sys.stderr.write(f"[info] Wrote {total_rows} rows so far... "
+                             f"(routed to NER: {parser.routed_fraction:.1%})\n")
+
+    sys.stderr.write(f"[done] Finished. Total rows: {total_rows}. NER rows: {parser.stats['routed']}. Output: {args.out}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,31 +23,168 @@ python ner_address_parser.py \
   --batch-size 32 \
   --device -1
 
-Tip: Use --device 0 if you have a GPU.
+Tip: Use --device 0 if you have a GPU. On many-core CPUs try --workers N --threads-per-worker T
+(N*T ~= physical cores) and compare the [pool] throughput lines. Add --shared-weights so the
+workers memory-map one copy of the weights instead of each loading its own. Long jobs keep a
+<out>.ckpt.json sidecar; after a crash/preemption rerun the same command with --resume (the rows
+already written are skipped by the CSV reader, not re-predicted; the skipped input is still read once).
+Parquet in/out (pyarrow): --input addresses.parquet --text-col address --out preds.parquet writes one
+row group per chunk. --backend direct skips the HF pipeline's per-item pre/post-processing (same
+output columns, less Python overhead per address).
+
+CPU fleets can trade a little accuracy for speed/memory with dynamic INT8 quantization
+(weights cached next to a local model dir as <model-dir>.int8.pt). Add --eval-conll to print the
+entity-level F1 delta vs fp32 on the goldset before streaming (or on its own, without --csv):
+python ner_address_parser.py --model-dir /path/to/BERTurk_stage1_out --quantize int8 --eval-conll
+
+Long addresses are truncated at --max-length (or the model limit); the tail is often where
+district/province live. --stride 64 (--backend direct) instead runs overlapping windows and
+stitches the labels.
+
+Daily feeds repeat most addresses: --cache preds.sqlite stores predictions keyed by
+hash(text, model fingerprint) and only sends unseen texts to the model (hit rate in the logs).
+
+--gazetteer snaps IL / ILCE / MAHALLE spans to the static parser's gazetteer keys (top-down, so a
+district outside the predicted province is rejected) and adds province, district, neighbourhood
+and gazetteer_rejected ("TYPE=text | ...") columns.
 """
 
 from __future__ import annotations
 import argparse
 import csv
 import json
+import multiprocessing as mp
 import os
+import queue
 import re
 import sys
-from typing import List, Dict, Any, Tuple
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
 
+import numpy as np
 import pandas as pd
 import torch
-from transformers import AutoTokenizer, AutoModelForTokenClassification, TokenClassificationPipeline
+from transformers import AutoConfig, AutoTokenizer, AutoModelForTokenClassification, TokenClassificationPipeline
+
+try:
+    from .conll import read_conll, entity_prf
+    from .prediction_cache import PredictionCache, fingerprint, split_cached, merge_cached
+    from .ner_shared import prepare_shared_weights, attach_shared_model
+    from .. import instrumentation
+    from ..instrumentation import span, timed_iter
+    from ..profiling import add_profile_arguments, profile_from_args
+except ImportError:  # run as a script from this directory
+    from conll import read_conll, entity_prf
+    from prediction_cache import PredictionCache, fingerprint, split_cached, merge_cached
+    from ner_shared import prepare_shared_weights, attach_shared_model
+    sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+    from src.address_matching import instrumentation
+    from src.address_matching.instrumentation import span, timed_iter
+    from src.address_matching.profiling import add_profile_arguments, profile_from_args
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+DEFAULT_GOLDSET = PROJECT_ROOT / "data" / "goldset" / "goldset_1k_yegeb.conll"
+
+QUANTIZE_CHOICES = ("int8",)
 
 # ---------- loading ----------
 
-def load_pipeline(model_dir: str, device: int | None = None) -> TokenClassificationPipeline:
-    tok = AutoTokenizer.from_pretrained(model_dir)
-    model = AutoModelForTokenClassification.from_pretrained(model_dir)
+def _load_model(model_dir: str, device: int | None, quantize: str | None,
+                shared_weights: List[str] | None = None):
+    """
+    (model, device) with the INT8 / device rules shared by every backend.
+    `shared_weights` (from prepare_shared_weights) maps the weights instead of loading a private copy.
+    """
+    if shared_weights:
+        if quantize is not None:
+            raise ValueError("Shared weights are plain fp32/fp16 tensors; they cannot be combined with --quantize.")
+        model = attach_shared_model(model_dir, shared_weights)
+    elif quantize == "int8":
+        if device is not None and device >= 0:
+            sys.stderr.write("[warn] INT8 dynamic quantization runs on CPU only; ignoring --device.\n")
+        model = load_quantized_model(model_dir)
+        device = -1
+    elif quantize is not None:
+        raise ValueError(f"Unknown quantize mode '{quantize}'. Choose from {QUANTIZE_CHOICES}.")
+    else:
+        model = AutoModelForTokenClassification.from_pretrained(model_dir)
     if device is None:
         device = 0 if torch.cuda.is_available() else -1
+    return model, device
+
+def load_pipeline(model_dir: str, device: int | None = None, quantize: str | None = None,
+                  shared_weights: List[str] | None = None) -> TokenClassificationPipeline:
+    tok = AutoTokenizer.from_pretrained(model_dir)
+    model, device = _load_model(model_dir, device, quantize, shared_weights)
     return TokenClassificationPipeline(model=model, tokenizer=tok, aggregation_strategy="simple", device=device)
 
+def load_direct_runner(model_dir: str, device: int | None = None, quantize: str | None = None,
+                       shared_weights: List[str] | None = None) -> "DirectNerRunner":
+    tok = AutoTokenizer.from_pretrained(model_dir)
+    model, device = _load_model(model_dir, device, quantize, shared_weights)
+    return DirectNerRunner(model, tok, device=device)
+
+BACKENDS = {"pipeline": load_pipeline, "direct": load_direct_runner}
+
+def load_ner(model_dir: str, device: int | None = None, quantize: str | None = None, backend: str = "pipeline",
+             shared_weights: List[str] | None = None):
+    """Load either the HF pipeline or the DirectNerRunner; both are accepted by process_batch."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Choose from {tuple(BACKENDS)}.")
+    return BACKENDS[backend](model_dir, device=device, quantize=quantize, shared_weights=shared_weights)
+
+# ---------- INT8 quantization ----------
+
+def quantize_dynamic_int8(model: torch.nn.Module) -> torch.nn.Module:
+    """Dynamic quantization: nn.Linear weights stored as int8, activations quantized on the fly."""
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def quantized_cache_path(model_dir: str) -> str:
+    """Sibling of the model dir, e.g. models/BERTurk_stage1_out.int8.pt"""
+    return os.path.normpath(model_dir) + ".int8.pt"
+
+def _weights_signature(model_dir: str) -> Dict[str, Any]:
+    """Cheap cache key: weight file names/sizes/mtimes + torch version (packed params are version-bound)."""
+    files = []
+    for name in sorted(os.listdir(model_dir)):
+        if name.endswith((".safetensors", ".bin")) and name != "training_args.bin":
+            st = os.stat(os.path.join(model_dir, name))
+            files.append((name, st.st_size, st.st_mtime_ns))
+    return {"files": files, "torch": torch.__version__}
+
+def load_quantized_model(model_dir: str, use_cache: bool = True) -> torch.nn.Module:
+    """
+    Return the INT8 model, reusing <model-dir>.int8.pt when its signature still matches.
+    On a cache hit the fp32 weights are never read: we rebuild the quantized skeleton from
+    the config and load the packed int8 state dict into it. The cache needs a local model
+    directory; a hub model id is quantized in memory on every load.
+    """
+    if use_cache and not os.path.isdir(model_dir):
+        sys.stderr.write(f"[warn] {model_dir} is not a local directory; the INT8 model is not cached.\n")
+        use_cache = False
+    cache_path = quantized_cache_path(model_dir)
+    signature = _weights_signature(model_dir) if use_cache else None
+    if use_cache and os.path.exists(cache_path):
+        try:
+            blob = torch.load(cache_path, map_location="cpu", weights_only=False)
+            if blob.get("signature") == signature:
+                config = AutoConfig.from_pretrained(model_dir)
+                model = quantize_dynamic_int8(AutoModelForTokenClassification.from_config(config).eval())
+                model.load_state_dict(blob["state_dict"])
+                return model
+        except Exception as e:
+            sys.stderr.write(f"[warn] Ignoring unreadable INT8 cache {cache_path}: {e}\n")
+
+    model = quantize_dynamic_int8(AutoModelForTokenClassification.from_pretrained(model_dir).eval())
+    if use_cache:
+        tmp = cache_path + ".tmp"
+        torch.save({"signature": signature, "state_dict": model.state_dict()}, tmp)
+        os.replace(tmp, cache_path)
+    return model
+
 # ---------- token alignment helpers ----------
 
 _WS_TOKEN_RE = re.compile(r"\S+")
@@ -63,18 +200,20 @@ def whitespace_tokens_with_offsets(text: str):
 def spans_to_bio(text: str, spans: List[Dict[str, Any]]):
     tokens, offsets = whitespace_tokens_with_offsets(text)
     tags = ["O"] * len(tokens)
+    # Whitespace tokens are sorted and disjoint, so the tokens overlapping [s, e) form one
+    # contiguous run: first token ending after s .. last token starting before e.
+    tok_starts = [ts for ts, _ in offsets]
+    tok_ends = [te for _, te in offsets]
     spans_sorted = sorted(spans, key=lambda x: x.get("start", 0))
     for sp in spans_sorted:
         label = sp.get("entity_group") or sp.get("entity") or "ENT"
-        s = int(sp["start"]); e = int(sp["end"]); first = True
-        for i, (ts, te) in enumerate(offsets):
-            if te <= s: 
-                continue
-            if ts >= e:
-                break
-            if ts < e and te > s:
-                tags[i] = f"{'B' if first else 'I'}-{label}"
-                first = False
+        s = int(sp["start"]); e = int(sp["end"])
+        lo = bisect_right(tok_ends, s)
+        hi = bisect_left(tok_starts, e)
+        if lo < hi:
+            tags[lo] = f"B-{label}"
+            for i in range(lo + 1, hi):
+                tags[i] = f"I-{label}"
     return tokens, tags
 
 def aggregate_entities(text: str, spans: List[Dict[str, Any]]):
@@ -99,52 +238,453 @@ def join_entities_flat(entities: List[Dict[str, Any]]) -> str:
 
 # ---------- inference ----------
 
-def call_pipe_version_safe(pipe: TokenClassificationPipeline, inputs, max_length: int | None):
+def call_pipe_version_safe(pipe: TokenClassificationPipeline, inputs, max_length: int | None,
+                           batch_size: int | None = None):
     """
-    Some transformers versions reject `truncation`/`max_length` at call time for token-classification.
-    We try with them once; on TypeError, we retry without.
+    The token-classification pipeline truncates at tokenizer.model_max_length; depending on the
+    transformers version a call-time `truncation`/`max_length` is rejected or silently dropped.
+    An explicit `max_length` is therefore applied by lowering model_max_length for the call.
+    `batch_size` makes the pipeline pad and run the inputs as real forward batches
+    (without it every input is its own forward pass).
     """
-    if max_length is not None:
-        try:
-            return pipe(inputs, truncation=True, max_length=max_length)
-        except TypeError:
-            return pipe(inputs)
-    else:
-        return pipe(inputs)
+    kw: Dict[str, Any] = {"batch_size": batch_size} if batch_size else {}
+    if max_length is None:
+        return pipe(inputs, **kw)
+    tokenizer = pipe.tokenizer
+    model_max_length = tokenizer.model_max_length
+    tokenizer.model_max_length = min(max_length, model_max_length)
+    try:
+        return pipe(inputs, **kw)
+    finally:
+        tokenizer.model_max_length = model_max_length
+
+class DirectNerRunner:
+    """
+    Lean replacement for TokenClassificationPipeline(aggregation_strategy="simple").
+    One tokenizer call (with offsets) and one forward pass per batch; the "simple" grouping
+    (adjacent tokens with the same type merge unless the next one is B-, "O" groups dropped,
+    score = mean token score) is done with NumPy over the whole batch.
+    Calling it returns the same span dicts as the pipeline: entity_group/score/word/start/end.
 
-def process_batch(pipe: TokenClassificationPipeline, batch_texts: List[str], max_length: int | None) -> List[Dict[str, Any]]:
-    spans_list = call_pipe_version_safe(pipe, batch_texts, max_length)
+    With `stride` > 0 texts longer than the window are not truncated: the tokenizer splits them
+    into windows overlapping by `stride` tokens, all windows of the batch share one forward pass,
+    and each token keeps the label of the window that scored it highest (_stitch_windows).
+    """
+
+    def __init__(self, model, tokenizer, device: int = -1):
+        self.tokenizer = tokenizer
+        self.device = torch.device("cpu") if device is None or device < 0 else torch.device(f"cuda:{device}")
+        self.model = model.to(self.device).eval()
+        id2label = {int(k): v for k, v in model.config.id2label.items()}
+        n_labels = max(id2label) + 1
+        # per label id: entity type (the pipeline's get_tag) and whether it is a B- tag
+        types = [id2label[i][2:] if id2label[i].startswith(("B-", "I-")) else id2label[i] for i in range(n_labels)]
+        self._type_names = sorted(set(types))
+        self._label_type = np.array([self._type_names.index(t) for t in types], dtype=np.int64)
+        self._label_is_b = np.array([id2label[i].startswith("B-") for i in range(n_labels)], dtype=bool)
+        self._o_type = self._type_names.index("O") if "O" in self._type_names else -1
+
+    def encode(self, texts: List[str], max_length: int | None = None, stride: int = 0) -> List[List[Dict[str, list]]]:
+        """
+        Unpadded encodings per text: one feature dict (input_ids, attention_mask, offsets, ...)
+        per window, a single window without `stride`. predict_texts tokenizes a whole chunk once
+        with this, takes the token budget lengths from it and hands each batch its slice.
+        """
+        # Like the pipeline, always truncate at the model limit; unlike newer pipelines,
+        # an explicit max_length is honoured instead of silently ignored.
+        window_kw = {"return_overflowing_tokens": True, "stride": stride} if stride else {}
+        with span("ner.tokenize", len(texts)):
+            enc = self.tokenizer(
+                texts,
+                truncation=True,
+                max_length=max_length or self.tokenizer.model_max_length,
+                return_offsets_mapping=True,
+                return_special_tokens_mask=True,
+                **window_kw,
+            )
+        window_of = enc.pop("overflow_to_sample_mapping") if stride else range(len(texts))
+        windows: List[List[Dict[str, list]]] = [[] for _ in texts]
+        for row, i in enumerate(window_of):
+            windows[i].append({k: enc[k][row] for k in enc.keys()})
+        return windows
+
+    def _pad(self, rows: List[Dict[str, list]]):
+        """Right-pad feature dicts into model inputs plus (offsets, keep) for decoding."""
+        width = max(len(r["input_ids"]) for r in rows)
+        n = len(rows)
+        inputs = {"input_ids": np.full((n, width), self.tokenizer.pad_token_id or 0, dtype=np.int64),
+                  "attention_mask": np.zeros((n, width), dtype=np.int64)}
+        if "token_type_ids" in rows[0]:
+            inputs["token_type_ids"] = np.zeros((n, width), dtype=np.int64)
+        offsets = np.zeros((n, width, 2), dtype=np.int64)
+        special = np.ones((n, width), dtype=bool)
+        for i, r in enumerate(rows):
+            k = len(r["input_ids"])
+            for name, arr in inputs.items():
+                arr[i, :k] = r[name]
+            offsets[i, :k] = r["offset_mapping"]
+            special[i, :k] = r["special_tokens_mask"]
+        keep = (inputs["attention_mask"] == 1) & ~special
+        return {k: torch.from_numpy(v) for k, v in inputs.items()}, offsets, keep
+
+    def __call__(self, texts: List[str], max_length: int | None = None, stride: int = 0,
+                 windows: List[List[Dict[str, list]]] | None = None) -> List[List[Dict[str, Any]]]:
+        """`windows`: encode() output for these texts when the caller already tokenized them."""
+        if windows is None:
+            windows = self.encode(texts, max_length, stride)
+        rows = [w for ws in windows for w in ws]
+        window_of = np.repeat(np.arange(len(windows)), [len(ws) for ws in windows]) if stride else None
+        enc, offsets, keep = self._pad(rows)
+        with span("ner.forward", len(texts)), torch.inference_mode():
+            logits = self.model(**{k: v.to(self.device) for k, v in enc.items()}).logits
+            logits = logits.to(torch.float32).cpu().numpy()  # inside: waits for the device
+        with span("ner.decode", len(texts)):
+            return self._decode(texts, logits, keep, offsets, window_of)
+
+    def _decode(self, texts: List[str], logits: np.ndarray, keep: np.ndarray, offsets: np.ndarray,
+                window_of: np.ndarray | None) -> List[List[Dict[str, Any]]]:
+        maxes = np.max(logits, axis=-1, keepdims=True)
+        shifted_exp = np.exp(logits - maxes)
+        probs = shifted_exp / shifted_exp.sum(axis=-1, keepdims=True)
+        label_ids = probs.argmax(axis=-1)
+        token_scores = np.take_along_axis(probs, label_ids[..., None], axis=-1)[..., 0]
+
+        out: List[List[Dict[str, Any]]] = []
+        if window_of is None:
+            for row, text in enumerate(texts):
+                out.append(self._decode_row(text, label_ids[row][keep[row]], token_scores[row][keep[row]],
+                                            offsets[row][keep[row]]))
+            return out
+        for i, text in enumerate(texts):
+            rows = np.flatnonzero(window_of == i)
+            out.append(self._decode_row(text, *self._stitch_windows(
+                [label_ids[r][keep[r]] for r in rows],
+                [token_scores[r][keep[r]] for r in rows],
+                [offsets[r][keep[r]] for r in rows])))
+        return out
+
+    @staticmethod
+    def _stitch_windows(label_ids: List[np.ndarray], scores: List[np.ndarray], offsets: List[np.ndarray]):
+        """
+        Merge per-window token predictions of one text. Tokens are identified by their start
+        offset; a token seen in several windows (the overlap) keeps its highest-scoring label.
+        Returns (label_ids, scores, offsets) in text order.
+        """
+        if len(label_ids) == 1:
+            return label_ids[0], scores[0], offsets[0]
+        lab = np.concatenate(label_ids)
+        sc = np.concatenate(scores)
+        off = np.concatenate(offsets)
+        order = np.lexsort((-sc, off[:, 0]))  # by start offset, best score first
+        lab, sc, off = lab[order], sc[order], off[order]
+        first = np.ones(lab.size, dtype=bool)
+        first[1:] = off[1:, 0] != off[:-1, 0]
+        return lab[first], sc[first], off[first]
+
+    def _decode_row(self, text: str, label_ids: np.ndarray, scores: np.ndarray, offsets: np.ndarray):
+        if label_ids.size == 0:
+            return []
+        types = self._label_type[label_ids]
+        starts = np.empty(label_ids.size, dtype=bool)
+        starts[0] = True
+        starts[1:] = (types[1:] != types[:-1]) | self._label_is_b[label_ids[1:]]
+        first = np.flatnonzero(starts)
+        last = np.append(first[1:], label_ids.size) - 1
+        counts = last - first + 1
+        means = np.add.reduceat(scores, first) / counts
+        group_types = types[first]
+        spans = []
+        for g in np.flatnonzero(group_types != self._o_type):
+            st = int(offsets[first[g], 0]); en = int(offsets[last[g], 1])
+            spans.append({"entity_group": self._type_names[group_types[g]], "score": float(means[g]),
+                          "word": text[st:en], "start": st, "end": en})
+        return spans
+
+def process_batch(pipe: TokenClassificationPipeline, batch_texts: List[str], max_length: int | None,
+                  stride: int = 0, windows: List[List[Dict[str, list]]] | None = None) -> List[Dict[str, Any]]:
+    """`windows`: DirectNerRunner.encode() of `batch_texts`, to skip tokenizing them again."""
+    if isinstance(pipe, DirectNerRunner):
+        spans_list = pipe(batch_texts, max_length, stride, windows)
+    elif stride:
+        # the pipeline's own windowing keeps only non-overlapping entities across windows
+        raise ValueError("stride needs the direct backend (DirectNerRunner).")
+    else:
+        with span("ner.forward", len(batch_texts)):
+            spans_list = call_pipe_version_safe(pipe, batch_texts, max_length, batch_size=len(batch_texts))
     out = []
-    for text, spans in zip(batch_texts, spans_list):
-        ents = aggregate_entities(text, spans)
-        tokens, tags = spans_to_bio(text, spans)
-        out.append({
-            "text": text,
-            "tokens": tokens,
-            "pred_tags": " ".join(tags),
-            "entities_json": json.dumps(ents, ensure_ascii=False),
-            "entities_flat": join_entities_flat(ents),
-        })
+    with span("ner.postprocess", len(batch_texts)):
+        for text, spans in zip(batch_texts, spans_list):
+            ents = aggregate_entities(text, spans)
+            tokens, tags = spans_to_bio(text, spans)
+            out.append({
+                "text": text,
+                "tokens": tokens,
+                "pred_tags": " ".join(tags),
+                "entities_json": json.dumps(ents, ensure_ascii=False),
+                "entities_flat": join_entities_flat(ents),
+            })
     return out
 
+# ---------- batching ----------
+
+def token_lengths(tokenizer, texts: List[str], max_length: int | None) -> List[int]:
+    """Tokenized length (with special tokens) per text, clipped to max_length."""
+    if not texts:
+        return []
+    ids = tokenizer(texts, add_special_tokens=True)["input_ids"]
+    lengths = [len(x) for x in ids]
+    if max_length is not None:
+        lengths = [min(n, max_length) for n in lengths]
+    return lengths
+
+def plan_length_batches(lengths: List[int], max_tokens: int, max_rows: int | None = None) -> List[List[int]]:
+    """
+    Group text indices into batches whose padded size (rows x longest row) stays within
+    `max_tokens`. Indices are visited shortest-first so each batch holds similar lengths
+    and padding waste is small; a single text longer than the budget gets its own batch.
+    """
+    batches: List[List[int]] = []
+    cur: List[int] = []
+    for idx in sorted(range(len(lengths)), key=lengths.__getitem__):
+        longest = lengths[idx]  # ascending order: the newcomer is the longest
+        if cur and ((len(cur) + 1) * longest > max_tokens or (max_rows and len(cur) >= max_rows)):
+            batches.append(cur)
+            cur = []
+        cur.append(idx)
+    if cur:
+        batches.append(cur)
+    return batches
+
+def predict_texts(pipe: TokenClassificationPipeline, texts: List[str], batch_size: int,
+                  max_length: int | None, max_batch_tokens: int | None = None,
+                  stride: int = 0) -> List[Dict[str, Any]]:
+    """
+    Run process_batch over a chunk of texts and return predictions in input order.
+    Without `max_batch_tokens`, batches are fixed `batch_size` slices in file order;
+    with it, batches come from plan_length_batches (`batch_size` caps the rows; with `stride`
+    a long text's extra windows are not counted against the budget). The direct backend
+    tokenizes the chunk once and reuses those encodings for the lengths and the batches;
+    the HF pipeline tokenizes inside its call, so its lengths cost a second tokenizer pass.
+    """
+    if not texts:  # e.g. a chunk fully served by --cache
+        return []
+    windows = None
+    if max_batch_tokens:
+        if isinstance(pipe, DirectNerRunner):
+            windows = pipe.encode(texts, max_length, stride)
+            lengths = [len(ws[0]["input_ids"]) for ws in windows]
+        else:
+            lengths = token_lengths(pipe.tokenizer, texts, max_length)
+        batches = plan_length_batches(lengths, max_batch_tokens, batch_size)
+    else:
+        batches = [list(range(i, min(i + batch_size, len(texts)))) for i in range(0, len(texts), batch_size)]
+
+    preds: List[Dict[str, Any]] = [None] * len(texts)  # type: ignore[list-item]
+    for idx in batches:
+        batch_out = process_batch(pipe, [texts[j] for j in idx], max_length, stride,
+                                  [windows[j] for j in idx] if windows is not None else None)
+        for j, pred in zip(idx, batch_out):
+            preds[j] = pred
+    return preds
+
+# ---------- worker pool ----------
+
+PRED_COLUMNS = ("pred_tags", "entities_json", "entities_flat")
+
+def set_torch_threads(threads: int | None, interop_threads: int | None = None) -> None:
+    """Intra-op (per operator) and inter-op (between operators) thread pools; None keeps torch defaults."""
+    if threads:
+        torch.set_num_threads(threads)
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # can only be set before the first parallel op in this process
+            sys.stderr.write("[warn] inter-op threads already initialised; ignoring --interop-threads.\n")
+
+def _pool_worker(worker_id: int, load_kwargs: Dict[str, Any], predict_kwargs: Dict[str, Any],
+                 threads: int | None, interop_threads: int | None, task_q, result_q) -> None:
+    """
+    Worker process: load the model once (then report ready as seq -2), and turn (seq, texts)
+    tasks into (seq, worker_id, preds, busy_seconds) results until a None sentinel arrives.
+    """
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")  # one pool of threads per worker is enough
+    try:
+        set_torch_threads(threads, interop_threads)
+        pipe = load_ner(**load_kwargs)
+        result_q.put((-2, worker_id, None, 0.0))
+        while True:
+            task = task_q.get()
+            if task is None:
+                break
+            seq, texts = task
+            t0 = time.perf_counter()
+            preds = predict_texts(pipe, texts, **predict_kwargs)
+            slim = [{k: p[k] for k in PRED_COLUMNS} for p in preds]
+            result_q.put((seq, worker_id, slim, time.perf_counter() - t0))
+    except Exception as e:  # surface the failure to the parent instead of hanging it
+        result_q.put((-1, worker_id, f"{type(e).__name__}: {e}", 0.0))
+    result_q.put(None)
+
+class NerWorkerPool:
+    """
+    N spawned processes, each holding its own model with `threads_per_worker` intra-op threads.
+    A feeder thread pushes chunks into a bounded task queue (backpressure on the reader);
+    map_ordered() re-sequences results so a single writer sees chunks in input order.
+    """
+
+    def __init__(self, workers: int, load_kwargs: Dict[str, Any], predict_kwargs: Dict[str, Any],
+                 threads_per_worker: int | None = None, interop_threads: int | None = None,
+                 queue_size: int | None = None):
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+        ctx = mp.get_context("spawn")  # fork + torch/OpenMP thread pools is not safe
+        self._task_q = ctx.Queue(maxsize=queue_size or 2 * workers)
+        self._result_q = ctx.Queue()
+        self._procs = [
+            ctx.Process(target=_pool_worker, daemon=True,
+                        args=(i, load_kwargs, predict_kwargs, threads_per_worker, interop_threads,
+                              self._task_q, self._result_q))
+            for i in range(workers)
+        ]
+        self.stats = {"rows": 0, "chunks": 0, "wall_seconds": 0.0, "startup_seconds": [0.0] * workers,
+                      "busy_seconds": [0.0] * workers, "worker_rows": [0] * workers}
+
+    def _feed(self, items: Iterable[Tuple[Any, List[str]]], payloads: Dict[int, Any], feed_error: List[BaseException]) -> None:
+        try:
+            for seq, (payload, texts) in enumerate(items):
+                payloads[seq] = (payload, len(texts))
+                self._task_q.put((seq, texts))
+        except BaseException as e:
+            feed_error.append(e)
+        finally:
+            for _ in self._procs:
+                self._task_q.put(None)
+
+    def map_ordered(self, items: Iterable[Tuple[Any, List[str]]]) -> Iterator[Tuple[Any, List[Dict[str, Any]]]]:
+        """items: (payload, texts) pairs; yields (payload, preds) in the same order."""
+        t0 = time.perf_counter()
+        for p in self._procs:
+            p.start()
+        payloads: Dict[int, Any] = {}
+        feed_error: List[BaseException] = []
+        feeder = threading.Thread(target=self._feed, args=(items, payloads, feed_error), daemon=True)
+        feeder.start()
+
+        done: Dict[int, List[Dict[str, Any]]] = {}
+        next_seq = 0
+        alive = len(self._procs)
+        try:
+            while alive:
+                try:
+                    msg = self._result_q.get(timeout=1.0)
+                except queue.Empty:
+                    if not any(p.is_alive() for p in self._procs):
+                        raise RuntimeError("All NER workers exited unexpectedly.")
+                    continue
+                if msg is None:
+                    alive -= 1
+                    continue
+                seq, worker_id, preds, busy = msg
+                if seq == -2:  # spawn + imports + model load, on the parent's clock
+                    self.stats["startup_seconds"][worker_id] = time.perf_counter() - t0
+                    continue
+                if seq < 0:
+                    raise RuntimeError(f"NER worker {worker_id} failed: {preds}")
+                done[seq] = preds
+                self.stats["busy_seconds"][worker_id] += busy
+                self.stats["worker_rows"][worker_id] += len(preds)
+                while next_seq in done:
+                    payload, n_rows = payloads.pop(next_seq)
+                    self.stats["rows"] += n_rows
+                    self.stats["chunks"] += 1
+                    yield payload, done.pop(next_seq)
+                    next_seq += 1
+            feeder.join()
+            if feed_error:
+                raise feed_error[0]
+        finally:
+            self.stats["wall_seconds"] = time.perf_counter() - t0
+            for p in self._procs:
+                p.join(timeout=5.0)
+                if p.is_alive():
+                    p.terminate()
+                    p.join()
+            self._task_q.cancel_join_thread()  # unsent tasks are moot once we stop consuming
+            for q in (self._task_q, self._result_q):
+                q.close()
+
+    def throughput_report(self) -> Dict[str, Any]:
+        """Overall and post-startup rows/s plus per-worker share; compare across --workers/--threads-per-worker."""
+        wall = max(self.stats["wall_seconds"], 1e-9)
+        startup = max(self.stats["startup_seconds"])
+        return {
+            "workers": self.workers,
+            "threads_per_worker": self.threads_per_worker or torch.get_num_threads(),
+            "rows": self.stats["rows"],
+            "chunks": self.stats["chunks"],
+            "wall_seconds": round(wall, 3),
+            "startup_seconds": round(startup, 3),
+            "rows_per_second": round(self.stats["rows"] / wall, 1),
+            "rows_per_second_after_startup": round(self.stats["rows"] / max(wall - startup, 1e-9), 1),
+            "worker_rows": self.stats["worker_rows"],
+            "worker_utilization": [round(b / max(wall - startup, 1e-9), 3) for b in self.stats["busy_seconds"]],
+        }
+
+# ---------- evaluation ----------
+
+def evaluate_conll(pipe: TokenClassificationPipeline, conll_path: str, max_length: int | None,
+                   batch_size: int = 32) -> Dict[str, Dict[str, float]]:
+    """
+    Entity-level P/R/F1 against a BIO CoNLL file. Gold tokens are joined with single spaces,
+    so the whitespace tokens behind `pred_tags` line up 1:1 with the gold tokens.
+    """
+    return evaluate_sentences(pipe, read_conll(conll_path), max_length, batch_size)
+
+def evaluate_sentences(pipe: TokenClassificationPipeline, sents, max_length: int | None,
+                       batch_size: int = 32) -> Dict[str, Dict[str, float]]:
+    """evaluate_conll() over already-read ConllSentence objects (e.g. a held-out split)."""
+    texts = [" ".join(s.tokens) for s in sents]
+    pred: List[List[str]] = []
+    for row in predict_texts(pipe, texts, batch_size, max_length):
+        pred.append(row["pred_tags"].split())
+    return entity_prf([s.tags for s in sents], pred)
+
+def quantization_report(model_dir: str, conll_path: str, max_length: int | None,
+                        batch_size: int = 32, backend: str = "pipeline") -> Dict[str, Any]:
+    """fp32 vs INT8 on CPU: micro entity F1, wall time and the deltas between them."""
+    report: Dict[str, Any] = {"conll": str(conll_path), "backend": backend}
+    for mode in (None, "int8"):
+        pipe = load_ner(model_dir, device=-1, quantize=mode, backend=backend)
+        t0 = time.perf_counter()
+        scores = evaluate_conll(pipe, conll_path, max_length, batch_size)
+        report[mode or "fp32"] = {"f1": scores["ALL"]["f1"], "seconds": time.perf_counter() - t0}
+    report["f1_delta"] = report["int8"]["f1"] - report["fp32"]["f1"]
+    report["speedup"] = report["fp32"]["seconds"] / max(report["int8"]["seconds"], 1e-9)
+    return report
+
 # ---------- CSV streaming ----------
 
-def iter_csv_chunks(path: str, chunksize: int, header_none_try: bool, text_col):
+def iter_csv_chunks(path: str, chunksize: int, header_none_try: bool, text_col, skip_rows: int = 0):
     """
     A generator that yields (df_chunk, text_series) with strings only.
     If header_none_try is True, read first with header=None; otherwise infer header.
+    `skip_rows` data rows (after the header) are dropped by the C tokenizer without being
+    converted, e.g. the rows a --resume run already wrote.
     """
     if header_none_try:
-        reader = pd.read_csv(path, header=None, dtype=str, keep_default_na=False, chunksize=chunksize)
-        for df in reader:
+        reader = pd.read_csv(path, header=None, dtype=str, keep_default_na=False, chunksize=chunksize,
+                             skiprows=skip_rows or None)
+        for df in timed_iter("csv.read", reader):
             if isinstance(text_col, int):
                 yield df, df.iloc[:, text_col].astype(str)
             else:
                 # If user gave a name but we used header=None, switch to header=infer for the next run
                 raise ValueError("You provided a column name but file is read as header=None. Re-run with --header infer and --text-col as the name.")
     else:
-        reader = pd.read_csv(path, header="infer", dtype=str, keep_default_na=False, chunksize=chunksize)
-        for df in reader:
+        reader = pd.read_csv(path, header="infer", dtype=str, keep_default_na=False, chunksize=chunksize,
+                             skiprows=range(1, skip_rows + 1) if skip_rows else None)
+        for df in timed_iter("csv.read", reader):
             if isinstance(text_col, int):
                 yield df, df.iloc[:, text_col].astype(str)
             else:
@@ -152,18 +692,203 @@ def iter_csv_chunks(path: str, chunksize: int, header_none_try: bool, text_col):
                     raise ValueError(f"Column '{text_col}' not found. Available: {list(df.columns)}")
                 yield df, df[text_col].astype(str)
 
+# ---------- Parquet / Arrow ----------
+
+PARQUET_SUFFIXES = (".parquet", ".pq")
+
+def _require_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet input/output needs pyarrow (pip install pyarrow).") from e
+    return pa, pq
+
+def resolve_format(path: str, fmt: str) -> str:
+    """'auto' -> parquet for *.parquet / *.pq, csv otherwise."""
+    if fmt != "auto":
+        return fmt
+    return "parquet" if path.lower().endswith(PARQUET_SUFFIXES) else "csv"
+
+def iter_parquet_chunks(path: str, chunksize: int, text_col):
+    """
+    Yields (record_batch, texts). Batches stay columnar; only the text column is turned
+    into Python strings (nulls -> "", like keep_default_na=False on the CSV side).
+    """
+    pa, pq = _require_pyarrow()
+    pf = pq.ParquetFile(path)
+    names = pf.schema_arrow.names
+    if isinstance(text_col, int):
+        idx = text_col
+    else:
+        if text_col not in names:
+            raise ValueError(f"Column '{text_col}' not found. Available: {names}")
+        idx = names.index(text_col)
+    for batch in timed_iter("parquet.read", pf.iter_batches(batch_size=chunksize), items=lambda b: b.num_rows):
+        col = batch.column(idx)
+        if not (pa.types.is_string(col.type) or pa.types.is_large_string(col.type)):
+            col = col.cast(pa.string())
+        yield batch, ["" if t is None else t for t in col.to_pylist()]
+
+class ParquetPredictionSink:
+    """
+    Appends the prediction columns to each incoming chunk (RecordBatch or DataFrame) as
+    Arrow arrays and writes the chunk as one row group. Original columns are passed through
+    without ever becoming per-row Python objects.
+    """
+
+    def __init__(self, path: str, columns: Iterable[str] = PRED_COLUMNS):
+        self.path = path
+        self.columns = list(columns)
+        self._writer = None
+
+    def write(self, payload, preds: List[Dict[str, Any]]) -> None:
+        with span("parquet.write", len(preds)):
+            self._write(payload, preds)
+
+    def _write(self, payload, preds: List[Dict[str, Any]]) -> None:
+        pa, pq = _require_pyarrow()
+        if isinstance(payload, pd.DataFrame):
+            # header=None CSVs have integer column labels; Arrow wants strings
+            payload = pa.RecordBatch.from_pandas(payload.rename(columns=str), preserve_index=False)
+        arrays = list(payload.columns) + [pa.array([p[c] for p in preds], type=pa.string()) for c in self.columns]
+        names = [str(n) for n in payload.schema.names] + self.columns
+        table = pa.Table.from_arrays(arrays, names=names)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table, row_group_size=max(table.num_rows, 1))
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+# ---------- gazetteer snapping ----------
+
+# NER tag -> gazetteer level, in hierarchy order
+ADMIN_TAGS = {"IL": "province", "ILCE": "district", "MAHALLE": "neighbourhood"}
+GAZETTEER_COLUMNS = ("province", "district", "neighbourhood", "gazetteer_rejected")
+
+def load_gazetteer():
+    """StaticAddressParser (imported lazily: building it loads the PTT gazetteer)."""
+    try:
+        from .static_parser import StaticAddressParser
+    except ImportError:
+        from static_parser import StaticAddressParser
+    return StaticAddressParser()
+
+def snap_to_gazetteer(parser, preds: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Post-decoding stage: resolve each prediction's admin spans with parser.resolve_admin()
+    and add the GAZETTEER_COLUMNS in place. Unmatched levels are left empty.
+    """
+    level_tag = {level: tag for tag, level in ADMIN_TAGS.items()}
+    for p in preds:
+        texts: Dict[str, List[str]] = {level: [] for level in ADMIN_TAGS.values()}
+        for e in json.loads(p["entities_json"]):
+            level = ADMIN_TAGS.get(e["type"])
+            if level:
+                texts[level].append(e["text"])
+        res = parser.resolve_admin(texts["province"], texts["district"], texts["neighbourhood"])
+        for level in ADMIN_TAGS.values():
+            p[level] = res[level] or ""
+        p["gazetteer_rejected"] = " | ".join(f"{level_tag[level]}={text}" for level, text in res["rejected"])
+    return preds
+
+# ---------- prediction cache ----------
+
+def model_fingerprint(load_kwargs: Dict[str, Any], predict_kwargs: Dict[str, Any]) -> str:
+    """Everything that changes a prediction: weights, quantization, backend, truncation/windowing."""
+    return fingerprint({
+        "weights": _weights_signature(load_kwargs["model_dir"]),
+        "quantize": load_kwargs.get("quantize"),
+        "backend": load_kwargs.get("backend"),
+        "max_length": predict_kwargs.get("max_length"),
+        "stride": predict_kwargs.get("stride", 0),
+    })
+
+# ---------- checkpointing ----------
+
+def checkpoint_path(out_path: str) -> str:
+    """Sidecar next to the output, e.g. predictions.csv.ckpt.json"""
+    return out_path + ".ckpt.json"
+
+def read_checkpoint(path: str) -> Dict[str, Any] | None:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_checkpoint(path: str, state: Dict[str, Any]) -> None:
+    """Atomic + durable: write tmp, fsync, rename over the old sidecar."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--model-dir", required=True)
-    ap.add_argument("--csv", required=True)
+    ap.add_argument("--csv", "--input", dest="csv", default=None,
+                    help="Input CSV or Parquet file (optional when only running --eval-conll)")
     ap.add_argument("--text-col", default="0", help="Index (int) or name (str) of the address column")
     ap.add_argument("--out", default="predictions.csv")
     ap.add_argument("--chunk-size", type=int, default=5000, help="Rows per chunk to stream")
-    ap.add_argument("--batch-size", type=int, default=32, help="Texts per forward pass")
+    ap.add_argument("--batch-size", type=int, default=32, help="Texts per forward pass (row cap with --max-batch-tokens)")
+    ap.add_argument("--max-batch-tokens", type=int, default=None,
+                    help="Length-bucketed batching: padded tokens per forward pass (e.g. 4096)")
     ap.add_argument("--device", type=int, default=None, help="-1 CPU, 0 GPU0, ...")
     ap.add_argument("--max-length", type=int, default=None, help="Tokenizer max_length; omit to let defaults apply")
+    ap.add_argument("--stride", type=int, default=0,
+                    help="Run texts longer than the window as windows overlapping by this many tokens "
+                         "instead of truncating them (0 = truncate; needs --backend direct)")
     ap.add_argument("--header", choices=["infer","none"], default="none", help="CSV header mode")
+    ap.add_argument("--in-format", choices=["auto","csv","parquet"], default="auto",
+                    help="Input format; auto picks parquet for .parquet/.pq (needs pyarrow)")
+    ap.add_argument("--out-format", choices=["auto","csv","parquet"], default="auto",
+                    help="Output format; parquet writes one row group per chunk (needs pyarrow)")
+    ap.add_argument("--backend", choices=list(BACKENDS), default="pipeline",
+                    help="pipeline: HF TokenClassificationPipeline; direct: tensor-level runner (same output, less overhead)")
+    ap.add_argument("--quantize", choices=QUANTIZE_CHOICES, default=None,
+                    help="Dynamic INT8 quantization of Linear layers (CPU); cached as <model-dir>.int8.pt")
+    ap.add_argument("--resume", action="store_true",
+                    help="Continue an interrupted run from <out>.ckpt.json (same --csv/--chunk-size), appending to --out")
+    ap.add_argument("--fsync-every", type=int, default=1,
+                    help="fsync the output and advance the checkpoint every N chunks")
+    ap.add_argument("--workers", type=int, default=0,
+                    help="Worker processes, each with its own model (0 = run in this process)")
+    ap.add_argument("--threads-per-worker", type=int, default=None,
+                    help="torch intra-op threads per worker (or for this process when --workers 0)")
+    ap.add_argument("--interop-threads", type=int, default=None, help="torch inter-op threads per worker")
+    ap.add_argument("--shared-weights", action="store_true",
+                    help="Memory-map one read-only copy of the weights for all workers (not with --quantize)")
+    ap.add_argument("--gazetteer", action="store_true",
+                    help="Snap IL/ILCE/MAHALLE spans to gazetteer keys and add province/district/neighbourhood columns")
+    ap.add_argument("--cache", default=None,
+                    help="SQLite prediction store; rows already predicted with the same model/settings skip the model")
+    ap.add_argument("--metrics-json", default=None,
+                    help="Write per-stage timing / throughput / peak RSS as JSON here (instrumentation.py)")
+    ap.add_argument("--metrics-prom", default=None, help="Same metrics in Prometheus text format")
+    add_profile_arguments(ap)
+    ap.add_argument("--eval-conll", nargs="?", const=str(DEFAULT_GOLDSET), default=None,
+                    help="With --quantize: report entity F1 delta vs fp32 on this CoNLL (default: goldset)")
     args = ap.parse_args()
+    if args.csv is None and not (args.eval_conll and args.quantize):
+        ap.error("--csv is required unless running --quantize with --eval-conll")
+    if args.stride and args.backend != "direct":
+        ap.error("--stride needs --backend direct.")
+    if args.metrics_json or args.metrics_prom:
+        instrumentation.enable()
+    profile_from_args(args, args.out if args.csv else None)
+
+    if args.eval_conll and args.quantize:
+        report = quantization_report(args.model_dir, args.eval_conll, args.max_length, args.batch_size,
+                                     backend=args.backend)
+        sys.stderr.write("[eval] " + json.dumps(report) + "\n")
+        if args.csv is None:
+            return
 
     # Coerce text_col to int if numeric
     try:
@@ -171,49 +896,177 @@ def main():
     except ValueError:
         text_col = args.text_col  # name
 
-    sys.stderr.write(f"[info] Loading model from: {args.model_dir}\n")
-    pipe = load_pipeline(args.model_dir, device=args.device)
+    load_kwargs = {"model_dir": args.model_dir, "device": args.device, "quantize": args.quantize, "backend": args.backend}
+    predict_kwargs = {"batch_size": args.batch_size, "max_length": args.max_length,
+                      "max_batch_tokens": args.max_batch_tokens, "stride": args.stride}
 
-    # Prepare writer
-    write_header = True
+    if args.shared_weights:
+        if args.quantize:
+            ap.error("--shared-weights cannot be combined with --quantize.")
+        load_kwargs["shared_weights"] = prepare_shared_weights(args.model_dir)
+
+    in_format = resolve_format(args.csv, args.in_format)
+    out_format = resolve_format(args.out, args.out_format)
+    if out_format == "parquet" and args.resume:
+        ap.error("--resume needs CSV output (a Parquet file cannot be appended to).")
+
+    # Checkpoint: the sidecar only ever points at chunks whose bytes were fsynced to --out
+    ckpt_path = checkpoint_path(args.out)
+    state: Dict[str, Any] = {"input": os.path.abspath(args.csv), "chunk_size": args.chunk_size,
+                             "chunks_done": 0, "rows_done": 0, "out_bytes": 0, "fieldnames": None,
+                             "out_columns": None, "complete": False}
     mode = "w"
-    total_rows = 0
+    if args.resume:
+        prev = read_checkpoint(ckpt_path)
+        if prev is None:
+            sys.stderr.write(f"[warn] No checkpoint at {ckpt_path}; starting from row 0.\n")
+        else:
+            if prev.get("input") != state["input"] or prev.get("chunk_size") != args.chunk_size:
+                ap.error(f"Checkpoint {ckpt_path} was written for --csv {prev.get('input')} "
+                         f"--chunk-size {prev.get('chunk_size')}; rerun with the same values.")
+            if prev.get("complete"):
+                sys.stderr.write(f"[done] Checkpoint says {args.out} is complete ({prev['rows_done']} rows).\n")
+                return
+            if not os.path.exists(args.out) or os.path.getsize(args.out) < prev["out_bytes"]:
+                raise RuntimeError(f"{args.out} is shorter than its checkpoint; cannot resume safely.")
+            state = prev
+            os.truncate(args.out, state["out_bytes"])  # drop any partially written chunk
+            mode = "a"
+            sys.stderr.write(f"[info] Resuming after chunk {state['chunks_done']} ({state['rows_done']} rows).\n")
+
+    # Prepare writer
+    total_rows = state["rows_done"]
     header_none_try = (args.header == "none")
+    skip_chunks = state["chunks_done"]
+    # Already-processed input is never predicted. CSV: the tokenizer skips rows_done rows (every
+    # finished chunk is full, so chunk boundaries line up); Parquet: skipped batches are read but
+    # dropped. Either way resume still scans the skipped input once (no byte offset is stored:
+    # pandas reads ahead, so a chunk's end position in the file is not known).
+    if in_format == "parquet":
+        source = iter_parquet_chunks(args.csv, args.chunk_size, text_col)
+        chunks = (chunk for i, chunk in enumerate(source) if i >= skip_chunks)
+    else:
+        chunks = ((df, series.tolist()) for df, series in
+                  iter_csv_chunks(args.csv, args.chunk_size, header_none_try, text_col, skip_rows=state["rows_done"]))
+
+    cache = None
+    if args.cache:
+        cache = PredictionCache(args.cache, model_fingerprint(load_kwargs, predict_kwargs))
+        sys.stderr.write(f"[info] Prediction cache: {args.cache} ({len(cache)} stored rows)\n")
+
+        def _lookup(items):
+            # only cache misses travel on to the model; the payload carries what merge_cached needs
+            for payload, texts in items:
+                hits, misses = split_cached(cache, texts)
+                yield (payload, texts, hits, misses), misses
+        chunks = _lookup(chunks)
+
+    pool = None
+    if args.workers > 0:
+        sys.stderr.write(f"[info] Starting {args.workers} workers x {args.threads_per_worker or 'default'} threads "
+                         f"(model: {args.model_dir})\n")
+        pool = NerWorkerPool(args.workers, load_kwargs, predict_kwargs,
+                             threads_per_worker=args.threads_per_worker, interop_threads=args.interop_threads)
+        predicted = pool.map_ordered(chunks)
+    else:
+        set_torch_threads(args.threads_per_worker, args.interop_threads)
+        sys.stderr.write(f"[info] Loading model from: {args.model_dir}\n")
+        pipe = load_ner(**load_kwargs)
+        predicted = ((df, predict_texts(pipe, texts, **predict_kwargs)) for df, texts in chunks)
+
+    if cache is not None:
+        predicted = ((payload, merge_cached(cache, texts, hits, misses, preds))
+                     for (payload, texts, hits, misses), preds in predicted)
+
+    def _progress() -> str:
+        note = f" (cache hit rate {cache.hit_rate:.1%})" if cache is not None else ""
+        return f"[info] Wrote {total_rows} rows so far...{note}\n"
+
+    out_columns = list(PRED_COLUMNS)
+    if args.gazetteer:
+        sys.stderr.write("[info] Loading gazetteer for span snapping...\n")
+        gazetteer = load_gazetteer()
+        predicted = ((payload, snap_to_gazetteer(gazetteer, preds)) for payload, preds in predicted)
+        out_columns += GAZETTEER_COLUMNS
 
-    with open(args.out, mode, newline="", encoding="utf-8") as fout:
-        writer = None
-
-        for df_chunk, text_series in iter_csv_chunks(args.csv, args.chunk_size, header_none_try, text_col):
-            rows = df_chunk.to_dict(orient="records")
-            texts = text_series.tolist()
-            total_rows += len(texts)
-
-            # Process in sub-batches for speed
-            results_rows: List[Dict[str, Any]] = []
-            for i in range(0, len(texts), args.batch_size):
-                batch_texts = texts[i:i+args.batch_size]
-                batch_out = process_batch(pipe, batch_texts, args.max_length)
-                # Merge with original row dicts
-                for orig, pred in zip(rows[i:i+args.batch_size], batch_out):
+    if out_format == "parquet":
+        sink = ParquetPredictionSink(args.out, out_columns)
+        try:
+            for payload, preds in predicted:
+                sink.write(payload, preds)
+                total_rows += len(preds)
+                sys.stderr.write(_progress())
+        finally:
+            sink.close()
+            if cache is not None:
+                cache.close()
+        sys.stderr.write(f"[done] Finished. Total rows: {total_rows}. Output: {args.out}\n")
+        if pool is not None:
+            sys.stderr.write("[pool] " + json.dumps(pool.throughput_report()) + "\n")
+        instrumentation.export(args.metrics_json, args.metrics_prom)
+        return
+
+    def _sync_checkpoint(fout, complete: bool = False) -> None:
+        fout.flush()
+        os.fsync(fout.fileno())
+        state["out_bytes"] = os.fstat(fout.fileno()).st_size
+        state["complete"] = complete
+        write_checkpoint(ckpt_path, state)
+
+    try:
+        with open(args.out, mode, newline="", encoding="utf-8") as fout:
+            writer = None
+            if state["fieldnames"]:
+                # checkpoints from before out_columns was stored: the prediction columns are the tail
+                started = state.get("out_columns") or state["fieldnames"][-len(out_columns):]
+                if started != out_columns:
+                    raise RuntimeError(f"{args.out} was started with output columns {started}, not {out_columns}; "
+                                       f"rerun with the same --gazetteer setting.")
+                writer = csv.DictWriter(fout, fieldnames=state["fieldnames"])  # header already on disk
+            state["out_columns"] = out_columns
+
+            for df_chunk, preds in predicted:
+                if not isinstance(df_chunk, pd.DataFrame):  # Arrow RecordBatch from --in-format parquet
+                    df_chunk = df_chunk.to_pandas()
+                rows = df_chunk.to_dict(orient="records")
+                total_rows += len(rows)
+
+                results_rows: List[Dict[str, Any]] = []
+                for orig, pred in zip(rows, preds):
+                    # Merge with original row dicts
                     merged = orig.copy()
-                    merged["pred_tags"] = pred["pred_tags"]
-                    merged["entities_json"] = pred["entities_json"]
-                    merged["entities_flat"] = pred["entities_flat"]
+                    for col in out_columns:
+                        merged[col] = pred[col]
                     results_rows.append(merged)
 
-            # Initialize CSV DictWriter once with combined fieldnames
-            if writer is None:
-                fieldnames = list(results_rows[0].keys()) if results_rows else list(df_chunk.columns) + ["pred_tags","entities_json","entities_flat"]
-                writer = csv.DictWriter(fout, fieldnames=fieldnames)
-                writer.writeheader()
+                # Initialize CSV DictWriter once with combined fieldnames
+                if writer is None:
+                    fieldnames = list(results_rows[0].keys()) if results_rows else list(df_chunk.columns) + out_columns
+                    writer = csv.DictWriter(fout, fieldnames=fieldnames)
+                    writer.writeheader()
+                    state["fieldnames"] = fieldnames
+
+                # Stream write
+                with span("csv.write", len(results_rows)):
+                    for row in results_rows:
+                        writer.writerow(row)
+
+                state["chunks_done"] += 1
+                state["rows_done"] = total_rows
+                if state["chunks_done"] % max(args.fsync_every, 1) == 0:
+                    _sync_checkpoint(fout)
 
-            # Stream write
-            for row in results_rows:
-                writer.writerow(row)
+                sys.stderr.write(_progress())
 
-            sys.stderr.write(f"[info] Wrote {total_rows} rows so far...\n")
+            _sync_checkpoint(fout, complete=True)
+    finally:
+        if cache is not None:
+            cache.close()
 
     sys.stderr.write(f"[done] Finished. Total rows: {total_rows}. Output: {args.out}\n")
+    if pool is not None:
+        sys.stderr.write("[pool] " + json.dumps(pool.throughput_report()) + "\n")
+    instrumentation.export(args.metrics_json, args.metrics_prom)
 
 
 if __name__ == "__main__":
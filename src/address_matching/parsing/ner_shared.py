@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+ner_shared.py
+-------------
+Shared, read-only weight loading for NER worker fleets (ner_address_parser.py --shared-weights).
+
+from_pretrained() gives every worker process its own parsed copy of the ~440MB weights. Here the
+weights stay in a safetensors file and every process memory-maps it: the tensors are views on
+the mapped pages, so all workers on a host share one copy through the page cache and attaching
+costs no copy or parse.
+
+    path = prepare_shared_weights(model_dir)  # once, in the parent
+    model = attach_shared_model(model_dir, path)  # in every worker
+
+Models saved with safetensors are mapped in place. Models that only have pytorch_model.bin are
+exported once to /dev/shm (RAM-backed where available) and the export is reused while the
+weights are unchanged.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+from typing import Dict, List
+
+import numpy as np
+import torch
+from transformers import AutoConfig, AutoModelForTokenClassification
+
+try:  # skip random init of the skeleton: its tensors are replaced right away
+    from transformers.initialization import no_init_weights
+except ImportError:
+    try:
+        from transformers.modeling_utils import no_init_weights
+    except ImportError:
+        no_init_weights = contextlib.nullcontext
+
+SHARED_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+# safetensors dtype -> (numpy dtype to map the bytes with, torch dtype to view them as)
+_DTYPES = {
+    "F64": (np.float64, torch.float64),
+    "F32": (np.float32, torch.float32),
+    "F16": (np.float16, torch.float16),
+    "BF16": (np.uint16, torch.bfloat16),  # numpy has no bfloat16: map raw 16-bit words, view in torch
+    "I64": (np.int64, torch.int64),
+    "I32": (np.int32, torch.int32),
+    "I16": (np.int16, torch.int16),
+    "I8": (np.int8, torch.int8),
+    "U8": (np.uint8, torch.uint8),
+    "BOOL": (np.bool_, torch.bool),
+}
+
+
+# ---------- preparing the file ----------
+
+def safetensors_files(model_dir: str) -> List[str]:
+    """Weight files of a safetensors checkpoint (single file or sharded), [] if there are none."""
+    index = os.path.join(model_dir, "model.safetensors.index.json")
+    if os.path.exists(index):
+        with open(index, encoding="utf-8") as f:
+            shards = sorted(set(json.load(f)["weight_map"].values()))
+        return [os.path.join(model_dir, s) for s in shards]
+    single = os.path.join(model_dir, "model.safetensors")
+    return [single] if os.path.exists(single) else []
+
+def _export_path(model_dir: str) -> str:
+    sig = []
+    for name in sorted(os.listdir(model_dir)):
+        if name.endswith(".bin") and name != "training_args.bin":
+            st = os.stat(os.path.join(model_dir, name))
+            sig.append((name, st.st_size, st.st_mtime_ns))
+    digest = hashlib.sha1(json.dumps([os.path.abspath(model_dir), sig]).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(SHARED_DIR, f"ner_weights_{digest}.safetensors")
+
+def prepare_shared_weights(model_dir: str) -> List[str]:
+    """
+    Safetensors file(s) the workers should map. Uses the checkpoint's own files when it has them;
+    otherwise loads the model once and exports its tensors under SHARED_DIR.
+    """
+    files = safetensors_files(model_dir)
+    if files:
+        return files
+    from safetensors.torch import save_file
+
+    path = _export_path(model_dir)
+    if not os.path.exists(path):
+        sys.stderr.write(f"[info] Exporting shared weights to {path}\n")
+        model = AutoModelForTokenClassification.from_pretrained(model_dir)
+        tensors: Dict[str, torch.Tensor] = {}
+        seen: Dict[int, str] = {}
+        for name, t in model.state_dict().items():
+            if t.data_ptr() in seen:  # tied weights: stored once, re-tied after loading
+                continue
+            seen[t.data_ptr()] = name
+            tensors[name] = t.contiguous()
+        tmp = path + ".tmp"
+        save_file(tensors, tmp)
+        os.replace(tmp, path)
+    return [path]
+
+
+# ---------- attaching ----------
+
+def mmap_safetensors(path: str) -> Dict[str, torch.Tensor]:
+    """
+    name -> tensor backed by a copy-on-write memory map of `path` (nothing is read up front;
+    pages are shared with every other process mapping the same file until someone writes).
+    """
+    with open(path, "rb") as f:
+        (header_len,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_len))
+    header.pop("__metadata__", None)
+    data_start = 8 + header_len
+    tensors: Dict[str, torch.Tensor] = {}
+    for name, info in header.items():
+        np_dtype, torch_dtype = _DTYPES[info["dtype"]]
+        begin, end = info["data_offsets"]
+        count = (end - begin) // np.dtype(np_dtype).itemsize
+        if count == 0:
+            tensors[name] = torch.empty(info["shape"], dtype=torch_dtype)
+            continue
+        arr = np.memmap(path, dtype=np_dtype, mode="c", offset=data_start + begin, shape=(count,))
+        t = torch.from_numpy(arr)
+        if t.dtype != torch_dtype:
+            t = t.view(torch_dtype)
+        tensors[name] = t.view(info["shape"])
+    return tensors
+
+def attach_shared_model(model_dir: str, weight_files: List[str]) -> torch.nn.Module:
+    """
+    Build the model skeleton from config.json (no weight init) and point its parameters at the
+    mapped tensors with load_state_dict(assign=True). Fails loudly if a parameter is missing.
+    """
+    config = AutoConfig.from_pretrained(model_dir)
+    with no_init_weights():
+        model = AutoModelForTokenClassification.from_config(config)
+    state: Dict[str, torch.Tensor] = {}
+    for path in weight_files:
+        state.update(mmap_safetensors(path))
+    model.load_state_dict(state, strict=False, assign=True)
+    if hasattr(model, "tie_weights"):
+        model.tie_weights()  # tied tensors are stored once
+    mapped = {t.data_ptr() for t in state.values()}
+    missing = [n for n, p in model.named_parameters(remove_duplicate=False) if p.data_ptr() not in mapped]
+    if missing:
+        raise RuntimeError(f"Shared weights {weight_files} do not cover parameters {missing[:5]}; "
+                           f"re-save the model with save_pretrained().")
+    for p in model.parameters():
+        p.requires_grad_(False)
+    return model.eval()
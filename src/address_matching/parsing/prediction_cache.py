@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+prediction_cache.py
+-------------------
+Persistent NER prediction store (SQLite, one file) for ner_address_parser.py --cache.
+
+Rows are content-addressed: key = blake2b(model fingerprint + text). The fingerprint covers
+everything that changes the output (weights, quantization, backend, max_length, stride), so
+retraining or changing those settings simply stops hitting the old rows.
+
+The text is hashed exactly as read: `entities_json` holds character offsets into the raw
+string, so two spellings that only normalize to the same form must not share a row.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Sequence
+
+CACHE_COLUMNS = ("pred_tags", "entities_json", "entities_flat")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    key           BLOB PRIMARY KEY,
+    pred_tags     TEXT NOT NULL,
+    entities_json TEXT NOT NULL,
+    entities_flat TEXT NOT NULL
+) WITHOUT ROWID
+"""
+# SQLite's default limit on bound parameters is 999 on older builds
+_LOOKUP_BATCH = 900
+
+
+def fingerprint(parts: Dict[str, Any]) -> str:
+    """Stable hex digest of a JSON-serializable description of the model + inference settings."""
+    blob = json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(blob).hexdigest()
+
+
+class PredictionCache:
+    """
+    get_many() / put_many() over one SQLite file. Keeps running hit/lookup counters
+    for the progress logs. Safe to share between threads (the worker pool looks chunks up
+    from its feeder thread while the main thread stores results).
+    """
+
+    def __init__(self, path: str, model_fingerprint: str):
+        self.path = path
+        self._prefix = model_fingerprint.encode("utf-8") + b"\0"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+        self.lookups = 0
+        self.hits = 0
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.blake2b(self._prefix + text.encode("utf-8"), digest_size=16).digest()
+
+    def get_many(self, texts: Iterable[str]) -> Dict[str, Dict[str, str]]:
+        """{text: prediction} for the distinct texts that are stored; counts every input as a lookup."""
+        texts = list(texts)
+        by_key = {self._key(t): t for t in texts}
+        keys = list(by_key)
+        found: Dict[str, Dict[str, str]] = {}
+        with self._lock:
+            for i in range(0, len(keys), _LOOKUP_BATCH):
+                part = keys[i:i + _LOOKUP_BATCH]
+                rows = self._conn.execute(
+                    f"SELECT key, pred_tags, entities_json, entities_flat FROM predictions "
+                    f"WHERE key IN ({','.join('?' * len(part))})", part).fetchall()
+                for key, *values in rows:
+                    found[by_key[key]] = dict(zip(CACHE_COLUMNS, values))
+            self.lookups += len(texts)
+            self.hits += sum(1 for t in texts if t in found)
+        return found
+
+    def put_many(self, texts: Sequence[str], preds: Sequence[Dict[str, Any]]) -> None:
+        """Store predictions (dicts with CACHE_COLUMNS) for `texts`, one transaction per call."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO predictions (key, pred_tags, entities_json, entities_flat) VALUES (?, ?, ?, ?)",
+                [(self._key(t), *(p[c] for c in CACHE_COLUMNS)) for t, p in zip(texts, preds)])
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def split_cached(cache: PredictionCache, texts: List[str]):
+    """
+    Look a chunk up before batching. Returns (hits, misses): `hits` maps text -> cached
+    prediction, `misses` lists each uncached text once (duplicates in a chunk run once).
+    """
+    hits = cache.get_many(texts)
+    misses = list(dict.fromkeys(t for t in texts if t not in hits))
+    return hits, misses
+
+def merge_cached(cache: PredictionCache, texts: List[str], hits: Dict[str, Dict[str, Any]],
+                 misses: List[str], miss_preds: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Store fresh predictions and return one prediction per input text, in input order."""
+    if misses:
+        cache.put_many(misses, miss_preds)
+    by_text = dict(hits)
+    by_text.update(zip(misses, miss_preds))
+    return [by_text[t] for t in texts]
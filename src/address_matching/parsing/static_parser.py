@@ -1,7 +1,7 @@
 import re
 import unicodedata
 from dataclasses import dataclass
-from typing import Dict, Tuple, Optional, List, Set, Any
+from typing import Dict, Tuple, Optional, List, Set, Any, Sequence
 
 import sys
 from pathlib import Path
@@ -14,6 +14,7 @@ sys.path.insert(0, str(PROJECT_ROOT))
 # Import runtime tree + normalizer
 from data.ptt_data.map import Turkey
 from src.address_matching import AddressNormalizer
+from src.address_matching.instrumentation import timed
 
 # Load the XLSX via an absolute path (works regardless of CWD); Turkey caches via pkl
 XLSX = PROJECT_ROOT / "data" / "ptt_data" / "turkiye_posta_kodlari.xlsx"
@@ -32,6 +33,69 @@ class Address:
         self.neighbourhood = neighbourhood
         self.label = label
 
+# ------------------------ Street / number fields ------------------------ #
+
+# Indicator words after normalize() + normalize_static_parser() -> field tag
+STREET_INDICATORS: Dict[str, str] = {"cad": "CADDE", "sk": "SOKAK", "bulvari": "BULVAR", "blv": "BULVAR",
+                                     "bul": "BULVAR", "bulv": "BULVAR"}
+NUMBER_INDICATORS: Dict[str, str] = {"no": "BINA_NO", "daire": "DAIRE_NO", "kat": "KAT"}
+# Words that end a street name when reading backwards from its indicator
+_NAME_STOPS = set(STREET_INDICATORS) | set(NUMBER_INDICATORS) | {
+    "mah", "sitesi", "site", "apt", "apartmani", "blok", "is", "hani", ":", "/", "-", "(", ")"}
+MAX_NAME_WORDS = 3
+
+def _street_name(tokens: List[str], end: int) -> Optional[str]:
+    """Words before tokens[end]: a numbered street ('1004', '367 / 2') or up to MAX_NAME_WORDS names."""
+    j = end - 1
+    if j >= 0 and tokens[j].isdigit():
+        start = j
+        while start >= 2 and tokens[start - 1] == "/" and tokens[start - 2].isdigit():
+            start -= 2
+        return " ".join(tokens[start:end])
+    start = end
+    while start > 0 and end - start < MAX_NAME_WORDS and tokens[start - 1] not in _NAME_STOPS \
+            and not tokens[start - 1].isdigit():
+        start -= 1
+    return " ".join(tokens[start:end]) or None
+
+def _number_after(tokens: List[str], start: int) -> Optional[str]:
+    """'no : 9 b' / 'no 9 / d' / 'kat 3' -> the number (and single-letter suffix) after an indicator."""
+    i = start
+    while i < len(tokens) and tokens[i] == ":":
+        i += 1
+    if i >= len(tokens) or not tokens[i].isdigit():
+        return None
+    end = i + 1
+    if end + 1 < len(tokens) and tokens[end] == "/" and len(tokens[end + 1]) == 1 and tokens[end + 1].isalnum():
+        end += 2
+    elif end < len(tokens) and len(tokens[end]) == 1 and tokens[end].isalpha() \
+            and (end + 1 == len(tokens) or tokens[end + 1] != ":"):  # "7 d : 4" is flat 7, door 4
+        end += 1
+    return " ".join(tokens[i:end])
+
+@timed("static.fields")
+def street_fields(address_text: str, folded: Optional[str] = None) -> Dict[str, str]:
+    """
+    Street and number fields by indicator words, in the NER `fields` shape (tag -> first text):
+    "Moda Cad. No:12 D:5" -> {"CADDE": "moda", "BINA_NO": "12"}. Rule-based and conservative:
+    names come from the words right before cad / sk / bulvari, numbers right after no / daire / kat.
+    `folded`: normalize() + normalize_static_parser() of the text when the caller already has it.
+    """
+    if folded is None:
+        folded = n.normalize_static_parser(n.normalize(address_text)) if address_text else ""
+    tokens = folded.split()
+    fields: Dict[str, str] = {}
+    for i, tok in enumerate(tokens):
+        tag = STREET_INDICATORS.get(tok)
+        value = _street_name(tokens, i) if tag else None
+        if tag is None:
+            tag = NUMBER_INDICATORS.get(tok)
+            value = _number_after(tokens, i + 1) if tag else None
+        if value and tag not in fields:
+            fields[tag] = value
+    return fields
+
+
 # ---------------------------- Static Parser ----------------------------- #
 
 class StaticAddressParser:
@@ -56,6 +120,22 @@ class StaticAddressParser:
     # ------------------------- Public API ------------------------- #
 
     def parse(self, address_text: str) -> Address:
+        m = self.match(address_text)
+        return Address(
+            province=m["province"],
+            district=m["district"],
+            neighbourhood=m["neighbourhood"],
+            label=address_text
+        )
+
+    @timed("static.match")
+    def match(self, address_text: str) -> Dict[str, Any]:
+        """
+        Same resolution as parse(), plus the evidence behind it:
+          spans: {"province"|"district"|"neighbourhood": (start_tok, end_tok) or None}
+          province_inferred: province came from the district, not from the text
+          tokens: the normalized tokens the spans index into
+        """
         # Normalize and tokenize (keep ALL tokens)
         norm = n.normalize_static_parser(address_text)
         tokens = norm.split()
@@ -73,28 +153,71 @@ class StaticAddressParser:
         dist_norm = match_dist[0] if match_dist else None
 
         # Infer province from district if needed (may be ambiguous; we pick the first)
+        province_inferred = False
         if not prov_norm and dist_norm:
             prov_norm = self._some_province_of_district(dist_norm)
+            province_inferred = prov_norm is not None
 
         # Neighbourhood allowed set
         allowed_nbhds: Optional[Set[str]] = None
         if dist_norm:
             if prov_norm:
                 # Known (province, district) → restrict to that pair
-                allowed_nbhds = set(TR.neighbourhoods_of(province=prov_norm, district=dist_norm))
+                allowed_nbhds = set(self._neighbourhoods_of(province=prov_norm, district=dist_norm))
             else:
                 # Province unknown → union across all provinces that contain this district
-                allowed_nbhds = set(TR.neighbourhoods_of(district=dist_norm))
+                allowed_nbhds = set(self._neighbourhoods_of(district=dist_norm))
 
         match_nbhd = self._best_match(tokens, self._nbhd_index, allowed_names=allowed_nbhds)
         nbhd_norm = match_nbhd[0] if match_nbhd else None
 
-        return Address(
-            province=prov_norm,
-            district=dist_norm,
-            neighbourhood=nbhd_norm,
-            label=address_text
-        )
+        def _span(m):
+            return (m[1], m[2]) if m else None
+
+        return {
+            "province": prov_norm,
+            "district": dist_norm,
+            "neighbourhood": nbhd_norm,
+            "spans": {"province": _span(match_prov), "district": _span(match_dist), "neighbourhood": _span(match_nbhd)},
+            "province_inferred": province_inferred,
+            "tokens": tokens,
+        }
+
+    def resolve_admin(
+        self,
+        province_texts: Sequence[str] = (),
+        district_texts: Sequence[str] = (),
+        neighbourhood_texts: Sequence[str] = (),
+        province: Optional[str] = None,
+        district: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Snap free-text admin spans (e.g. NER IL / ILCE / MAHALLE texts) to gazetteer keys,
+        top-down through the same token indices parse() uses. `province`/`district` are
+        already-known keys that constrain the lower levels.
+
+        A span is rejected when it only matches outside the resolved parent (a district that
+        is not in the province) or resolves to a different name than an earlier span.
+        Returns {"province", "district", "neighbourhood", "rejected": [(level, text), ...]}.
+        """
+        rejected: List[Tuple[str, str]] = []
+
+        prov = self._snap(province_texts, self._prov_index, None, province, "province", rejected)
+
+        allowed_districts = set(self._districts_of(prov)) if prov else None
+        dist = self._snap(district_texts, self._dist_index, allowed_districts, district, "district", rejected)
+        if not prov and dist:
+            prov = self._some_province_of_district(dist)
+
+        allowed_nbhds: Optional[Set[str]] = None
+        if dist:
+            allowed_nbhds = set(self._neighbourhoods_of(province=prov, district=dist) if prov
+                                else self._neighbourhoods_of(district=dist))
+        elif prov:
+            allowed_nbhds = set(self._neighbourhoods_of(province=prov))
+        nbhd = self._snap(neighbourhood_texts, self._nbhd_index, allowed_nbhds, None, "neighbourhood", rejected)
+
+        return {"province": prov, "district": dist, "neighbourhood": nbhd, "rejected": rejected}
 
     # ----------------------- Internal: Build ----------------------- #
 
@@ -117,6 +240,7 @@ class StaticAddressParser:
 
     # ----------------------- Internal: Search ---------------------- #
 
+    @timed("static.best_match")
     def _best_match(
         self,
         tokens: List[str],
@@ -161,14 +285,47 @@ class StaticAddressParser:
             lst.sort(key=lambda x: len(x[0]), reverse=True)
         return idx
 
+    def _snap(
+        self,
+        texts: Sequence[str],
+        index: Dict[str, List[Tuple[List[str], str]]],
+        allowed_names: Optional[Set[str]],
+        known: Optional[str],
+        level: str,
+        rejected: List[Tuple[str, str]],
+    ) -> Optional[str]:
+        """First span text that matches inside `allowed_names` wins (unless `known` is set);
+        spans that match only outside it, or a different name, go to `rejected`."""
+        chosen = known
+        for text in texts:
+            tokens = n.normalize_static_parser(text).split()
+            m = self._best_match(tokens, index, allowed_names=allowed_names)
+            if m is None:
+                if allowed_names is not None and self._best_match(tokens, index, allowed_names=None):
+                    rejected.append((level, text))
+                continue
+            if chosen is None:
+                chosen = m[0]
+            elif m[0] != chosen:
+                rejected.append((level, text))
+        return chosen
+
     # ----------------------- Internal: Lookups --------------------- #
 
     @staticmethod
+    @timed("gazetteer.lookup")
     def _districts_of(province: str) -> List[str]:
         """District list for a province (plain names)."""
         return list(TR.districts_of(province)) if province else []
 
     @staticmethod
+    @timed("gazetteer.lookup")
+    def _neighbourhoods_of(province: Optional[str] = None, district: Optional[str] = None) -> List[str]:
+        """Neighbourhood list, restricted to a province and/or district (plain names)."""
+        return list(TR.neighbourhoods_of(province=province, district=district))
+
+    @staticmethod
+    @timed("gazetteer.lookup")
     def _some_province_of_district(district: str) -> Optional[str]:
         """
         Return one province that contains the given district.
@@ -0,0 +1,2 @@
+from .pipeline import AddressPipeline, Batch, PipelineConfig, parallel_map, read_batches, run_files
+from .async_runtime import AsyncCsvWriter, run_files_async
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+async_runtime.py
+----------------
+asyncio runtime for AddressPipeline: reading, the compute stages and writing overlap, so the
+CPU does not idle while a chunk is read from a slow mount or written to the output store.
+
+    reader --q--> normalize --q--> parse --q--> collect --q--> parsed-out writer
+    (thread)      (pool)           (pool)       (thread)       (thread)
+
+    ... score + cluster (thread) ...
+
+    reader --q--> labeled chunks --q--> cluster writer
+    (thread)                             (thread)
+
+Every arrow is a bounded asyncio.Queue. Compute stages put executor futures on their output
+queue instead of results, so a stage keeps up to `maxsize` batches in flight on its pool and
+downstream consumers await them in input order; a full queue suspends the producer
+(backpressure). Blocking file I/O runs in threads (pandas chunk reads, csv writes), the event
+loop itself only moves batches between queues.
+
+The result is identical to the synchronous AddressPipeline.run(); select it with
+`--runtime async` on the pipeline CLI, or:
+
+    labels = asyncio.run(run_files_async(AddressPipeline(config), "in.csv", "clusters.csv"))
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import csv
+import sys
+import time
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Callable, Iterable, List, Optional
+
+import numpy as np
+
+from ..instrumentation import span
+from ..matching.blocking import BlockIndex
+from ..scoring.field_scorer import AddressTableBuilder
+from .pipeline import (EXECUTORS, PARSED_COLUMNS, AddressPipeline, NormalizeStage, ParseStage,
+                       labeled_chunks, parsed_rows, read_batches)
+
+_DONE = object()  # end-of-stream marker
+
+
+def _failed(exc: BaseException) -> asyncio.Future:
+    fut = asyncio.get_running_loop().create_future()
+    fut.set_exception(exc)
+    return fut
+
+async def produce(items: Iterable, out_q: asyncio.Queue) -> None:
+    """Pull a (blocking) iterator in a worker thread; its items go to out_q, then _DONE."""
+    it = iter(items)
+    try:
+        while True:
+            item = await asyncio.to_thread(next, it, _DONE)
+            await out_q.put(item)
+            if item is _DONE:
+                return
+    except Exception as exc:  # surfaces in the consumer, which then stops the runtime
+        await out_q.put(_failed(exc))
+
+async def stage(fn: Callable, executor: Executor, in_q: asyncio.Queue, out_q: asyncio.Queue) -> None:
+    """fn over in_q on `executor`; puts the futures (in input order) on out_q."""
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            item = await in_q.get()
+            if item is _DONE:
+                await out_q.put(_DONE)
+                return
+            batch = await item if asyncio.isfuture(item) else item
+            await out_q.put(loop.run_in_executor(executor, fn, batch))
+    except Exception as exc:
+        await out_q.put(_failed(exc))
+
+async def results(q: asyncio.Queue) -> AsyncIterator[Any]:
+    """Items of a queue filled by produce() / stage(), awaited in order, until _DONE."""
+    while True:
+        item = await q.get()
+        if item is _DONE:
+            return
+        yield await item if asyncio.isfuture(item) else item
+
+
+class AsyncCsvWriter:
+    """CSV file written by a background task; write() only blocks when `maxsize` chunks are queued."""
+
+    def __init__(self, path: str, maxsize: int = 4):
+        self.path = path
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self._task: Optional[asyncio.Task] = None
+        self._file = None
+
+    async def __aenter__(self) -> "AsyncCsvWriter":
+        self._file = await asyncio.to_thread(open, self.path, "w", newline="", encoding="utf-8")
+        self._task = asyncio.create_task(self._drain(csv.writer(self._file)))
+        return self
+
+    async def _drain(self, writer) -> None:
+        while True:
+            rows = await self.queue.get()
+            if rows is _DONE:
+                return
+            await asyncio.to_thread(self._write_rows, writer, rows)
+
+    @staticmethod
+    def _write_rows(writer, rows: List[list]) -> None:
+        with span("csv.write", len(rows)):
+            writer.writerows(rows)
+
+    async def write(self, rows: List[list]) -> None:
+        if self._task.done():  # a failed write stops accepting rows
+            self._task.result()
+        await self.queue.put(rows)
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None:
+                await self.queue.put(_DONE)
+                await self._task
+            else:
+                self._task.cancel()
+        finally:
+            await asyncio.to_thread(self._file.close)
+
+
+async def run_files_async(pipeline: AddressPipeline, path: str, out: str, parsed_out: Optional[str] = None,
+                          text_col=0, header: bool = False) -> np.ndarray:
+    """Async counterpart of pipeline.run_files: same outputs, I/O overlapped with compute."""
+    c = pipeline.config
+    depth = lambda workers: max(1, workers) * c.max_pending
+    pools = [EXECUTORS[c.executor](max_workers=max(1, w)) for w in (c.normalize_workers, c.parse_workers)]
+    read_q, norm_q, parse_q = asyncio.Queue(c.max_pending), asyncio.Queue(depth(c.normalize_workers)), \
+        asyncio.Queue(depth(c.parse_workers))
+    tasks = [
+        asyncio.create_task(produce(read_batches(path, c.batch_size, text_col, header), read_q)),
+        asyncio.create_task(stage(NormalizeStage(), pools[0], read_q, norm_q)),
+        asyncio.create_task(stage(ParseStage(c), pools[1], norm_q, parse_q)),
+    ]
+    t0 = time.perf_counter()
+    try:
+        index, table = BlockIndex(c.blocking), AddressTableBuilder()
+        async with contextlib.AsyncExitStack() as stack:
+            parsed = await stack.enter_async_context(AsyncCsvWriter(parsed_out)) if parsed_out else None
+            if parsed is not None:
+                await parsed.write([["row", "text"] + PARSED_COLUMNS])
+            async for batch in results(parse_q):
+                await asyncio.to_thread(pipeline.collect, batch, index, table)
+                if parsed is not None:
+                    await parsed.write(parsed_rows(batch))
+                sys.stderr.write(f"[info] Parsed {batch.offset + len(batch.texts)} rows so far...\n")
+        await asyncio.gather(*tasks)
+
+        labels = await asyncio.to_thread(pipeline.cluster, index, table.build())
+        sys.stderr.write(f"[info] Scored {pipeline.stats['pairs']} candidate pairs "
+                         f"({pipeline.stats['merged_pairs']} merged) in {time.perf_counter() - t0:.1f}s\n")
+
+        chunk_q: asyncio.Queue = asyncio.Queue(c.max_pending)
+        tasks.append(asyncio.create_task(produce(labeled_chunks(path, labels, c.batch_size, header), chunk_q)))
+        async with AsyncCsvWriter(out) as writer:
+            first = True
+            async for df in results(chunk_q):
+                rows = list(df.itertuples(index=False, name=None))
+                await writer.write([list(df.columns)] + rows if first else rows)
+                first = False
+        return labels
+    finally:
+        for task in tasks:
+            task.cancel()
+        for pool in pools:
+            pool.shutdown(wait=True, cancel_futures=True)
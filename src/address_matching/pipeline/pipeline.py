@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+"""
+pipeline.py
+-----------
+Raw address file -> cluster label per row, in one process, without intermediate files.
+
+    read --> normalize --> parse --> collect (block index + field table) --> score --> cluster
+         batches of `batch_size` rows                          pair batches of `pair_batch_size`
+
+Stages are generators over batches, so the whole chain is pull-driven: a stage only runs when
+the next one asks for a batch. A stage with workers > 1 maps its batches on a thread or process
+pool, keeping at most workers * max_pending batches in flight (backpressure) and yielding them
+in input order. Only compact state survives a batch: the block keys (BlockIndex) and the
+integer field codes (AddressTableBuilder); raw texts and parse records are dropped, or streamed
+to --parsed-out. Once the input is exhausted, candidate pairs are streamed from the block index
+through the scorer into the union-find, and the input is read a second time to write every row
+with its cluster label.
+
+Parsers (--parser):
+    static   StaticAddressParser admin levels + rule-based street / number fields (street_fields)
+    hybrid   static first, NER for incomplete or ambiguous rows (hybrid_parser.py)
+    ner      NER for every row, admin spans snapped to the gazetteer
+
+Example (from the project root):
+python -m src.address_matching.pipeline.pipeline \
+  --csv /path/to/input.csv \
+  --out /path/to/clusters.csv \
+  --parser hybrid --model-dir /path/to/BERTurk_stage1_out \
+  --parse-workers 2 --threshold 0.5
+
+Tips:
+  - --executor process sidesteps the GIL for the Python-heavy normalize / static parse stages;
+    each worker process loads its parser (and model) once.
+  - --scorer takes FieldScorer.save() weights; the defaults are uncalibrated.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import sys
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .. import instrumentation
+from ..address import Address
+from ..instrumentation import span, timed_iter
+from ..profiling import add_profile_arguments, profile_from_args
+from ..matching.blocking import BlockIndex, BlockingConfig, fold_text
+from ..matching.clustering import UnionFind
+from ..scoring.field_scorer import AddressTableBuilder, FieldScorer
+
+PARSERS = ("static", "hybrid", "ner")
+EXECUTORS = {"thread": ThreadPoolExecutor, "process": ProcessPoolExecutor}
+PARSED_COLUMNS = ["norm", "province", "district", "neighbourhood", "confidence", "route", "entities_json"]
+
+
+@dataclass
+class Batch:
+    offset: int                                     # input row id of texts[0]
+    texts: List[str]
+    norm: Optional[List[str]] = None                # fold_text(text), set by NormalizeStage
+    records: Optional[List[Dict[str, Any]]] = None  # HybridAddressParser records, set by ParseStage
+
+
+@dataclass
+class PipelineConfig:
+    batch_size: int = 1000
+    parser: str = "static"
+    model_dir: Optional[str] = None
+    ner_batch_size: int = 32
+    ner_backend: str = "direct"
+    min_confidence: float = 1.0
+    normalize_workers: int = 1
+    parse_workers: int = 1
+    score_workers: int = 1
+    executor: str = "thread"
+    max_pending: int = 2            # batches in flight per worker
+    blocking: BlockingConfig = field(default_factory=BlockingConfig)
+    pair_batch_size: int = 1_000_000
+    threshold: float = 0.5
+    scorer_path: Optional[str] = None
+
+    def __post_init__(self):
+        if self.parser not in PARSERS:
+            raise ValueError(f"Unknown parser '{self.parser}'. Choose one of {PARSERS}.")
+        if self.parser != "static" and not self.model_dir:
+            raise ValueError(f"--parser {self.parser} needs --model-dir")
+        if self.executor not in EXECUTORS:
+            raise ValueError(f"Unknown executor '{self.executor}'. Choose one of {list(EXECUTORS)}.")
+
+
+# ---------- stages ----------
+
+class NormalizeStage:
+    def __call__(self, batch: Batch) -> Batch:
+        with span("pipeline.normalize", len(batch.texts)):
+            batch.norm = [fold_text(t) for t in batch.texts]
+        return batch
+
+_PARSERS: Dict[tuple, Any] = {}  # one parser (and model) per process and configuration
+
+class ParseStage:
+    """Picklable: only the configuration travels to workers, each process builds its parser once."""
+
+    def __init__(self, config: PipelineConfig):
+        self.key = (config.parser, config.model_dir, config.ner_backend, config.ner_batch_size,
+                    config.min_confidence)
+
+    def _parser(self):
+        if self.key not in _PARSERS:
+            from ..parsing.hybrid_parser import HybridAddressParser
+
+            mode, model_dir, backend, batch_size, min_confidence = self.key
+            if mode == "static":
+                _PARSERS[self.key] = HybridAddressParser(ner_fn=None)
+            else:
+                from ..parsing import ner_address_parser as ner
+
+                pipe = ner.load_ner(model_dir, backend=backend)
+                ner_fn = lambda texts: ner.predict_texts(pipe, texts, batch_size, None, None)
+                threshold = min_confidence if mode == "hybrid" else float("inf")  # "ner": route all
+                _PARSERS[self.key] = HybridAddressParser(ner_fn=ner_fn, min_confidence=threshold)
+        return _PARSERS[self.key]
+
+    def __call__(self, batch: Batch) -> Batch:
+        parser = self._parser()
+        with span("pipeline.parse", len(batch.texts)):
+            # the gazetteer match needs the raw text (its names keep "mahalle", "cadde", ...);
+            # street fields reuse the folded text of the normalize stage
+            batch.records = parser.parse_batch(batch.texts, folded=batch.norm)
+        return batch
+
+def parallel_map(fn: Callable, items: Iterable, workers: int = 1, executor: str = "thread",
+                 max_pending: int = 2) -> Iterator:
+    """fn over items, in order; with workers > 1 at most workers * max_pending items in flight."""
+    if workers <= 1:
+        for item in items:
+            yield fn(item)
+        return
+    pool: Executor = EXECUTORS[executor](max_workers=workers)
+    try:
+        pending: deque = deque()
+        for item in items:
+            pending.append(pool.submit(fn, item))
+            if len(pending) >= workers * max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+# ---------- input ----------
+
+def read_batches(path: str, batch_size: int, text_col=0, header: bool = False) -> Iterator[Batch]:
+    offset = 0
+    reader = pd.read_csv(path, header=0 if header else None, dtype=str, keep_default_na=False,
+                         chunksize=batch_size)
+    for df in timed_iter("csv.read", reader):
+        col = df.iloc[:, text_col] if isinstance(text_col, int) else df[text_col]
+        texts = col.astype(str).tolist()
+        yield Batch(offset=offset, texts=texts)
+        offset += len(texts)
+
+
+def parsed_rows(batch: Batch) -> List[list]:
+    """--parsed-out rows of a parsed batch: row id, text, then PARSED_COLUMNS."""
+    rows = []
+    for i, (text, norm, rec) in enumerate(zip(batch.texts, batch.norm, batch.records)):
+        rec = {**rec, "norm": norm}
+        rows.append([batch.offset + i, text] + [rec.get(col, "") for col in PARSED_COLUMNS])
+    return rows
+
+def labeled_chunks(path: str, labels: np.ndarray, batch_size: int, header: bool = False) -> Iterator[pd.DataFrame]:
+    """Second pass over the input: original columns + 'cluster', chunk by chunk."""
+    offset = 0
+    reader = pd.read_csv(path, header=0 if header else None, dtype=str, keep_default_na=False,
+                         chunksize=batch_size)
+    for df in timed_iter("csv.read", reader):
+        yield df.assign(cluster=labels[offset:offset + len(df)])
+        offset += len(df)
+
+
+# ---------- orchestration ----------
+
+class AddressPipeline:
+    def __init__(self, config: Optional[PipelineConfig] = None):
+        self.config = config or PipelineConfig()
+        self.scorer = FieldScorer.load(self.config.scorer_path) if self.config.scorer_path else FieldScorer()
+        self.stats: Dict[str, float] = {"rows": 0, "pairs": 0, "merged_pairs": 0}
+
+    def parsed_batches(self, batches: Iterable[Batch]) -> Iterator[Batch]:
+        """normalize -> parse, each stage on its own pool."""
+        c = self.config
+        normalized = parallel_map(NormalizeStage(), batches, c.normalize_workers, c.executor, c.max_pending)
+        return parallel_map(ParseStage(c), normalized, c.parse_workers, c.executor, c.max_pending)
+
+    def run(self, batches: Iterable[Batch],
+            on_parsed: Optional[Callable[[Batch], None]] = None) -> np.ndarray:
+        """Cluster label for every input row (0..k-1, in order of first appearance)."""
+        c = self.config
+        index = BlockIndex(c.blocking)
+        table = AddressTableBuilder()
+        for batch in self.parsed_batches(batches):
+            self.collect(batch, index, table)
+            if on_parsed is not None:
+                on_parsed(batch)
+        return self.cluster(index, table.build())
+
+    def collect(self, batch: Batch, index: BlockIndex, table: AddressTableBuilder) -> None:
+        """Keep only the block keys and field codes of a parsed batch."""
+        with span("pipeline.collect", len(batch.records)):
+            addresses = [Address.from_record(r) for r in batch.records]
+            index.add(addresses, sort_texts=batch.norm)
+            table.add(addresses)
+        self.stats["rows"] += len(addresses)
+
+    def cluster(self, index: BlockIndex, table) -> np.ndarray:
+        c = self.config
+        uf = UnionFind(len(table))
+
+        def score(pair):
+            with span("pipeline.score", pair[0].size):
+                return pair[0], pair[1], self.scorer.score(table, pair[0], pair[1])
+
+        pairs = timed_iter("pipeline.block", index.iter_pairs(c.pair_batch_size), items=lambda pair: pair[0].size)
+        for left, right, p in parallel_map(score, pairs, c.score_workers, "thread", c.max_pending):
+            merged = int(np.count_nonzero(p >= c.threshold))
+            self.stats["pairs"] += left.size
+            self.stats["merged_pairs"] += merged
+            instrumentation.count("pipeline.candidate_pairs", left.size)
+            instrumentation.count("pipeline.merged_pairs", merged)
+            with span("pipeline.cluster", left.size):
+                uf.union(left, right, scores=p, threshold=c.threshold)
+        with span("pipeline.cluster", 0):
+            return uf.labels()
+
+
+# ---------- CLI ----------
+
+def main():
+    ap = argparse.ArgumentParser(description="Raw addresses -> cluster labels (normalize, parse, block, score, cluster).")
+    ap.add_argument("--csv", required=True)
+    ap.add_argument("--text-col", default="0", help="Index (int) or name (str) of the address column")
+    ap.add_argument("--header", choices=["infer", "none"], default="none", help="CSV header mode")
+    ap.add_argument("--out", default="clusters.csv", help="Input rows + 'cluster' column")
+    ap.add_argument("--parsed-out", default=None, help="Optional CSV of per-row parse results (streamed)")
+    ap.add_argument("--parser", choices=PARSERS, default="static")
+    ap.add_argument("--model-dir", default=None, help="NER model for --parser hybrid / ner")
+    ap.add_argument("--ner-batch-size", type=int, default=32)
+    ap.add_argument("--min-confidence", type=float, default=1.0, help="Hybrid: static results below this go to NER")
+    ap.add_argument("--batch-size", type=int, default=1000, help="Rows per pipeline batch")
+    ap.add_argument("--normalize-workers", type=int, default=1)
+    ap.add_argument("--parse-workers", type=int, default=1)
+    ap.add_argument("--score-workers", type=int, default=1)
+    ap.add_argument("--executor", choices=list(EXECUTORS), default="thread")
+    ap.add_argument("--max-pending", type=int, default=2, help="Batches in flight per worker (backpressure)")
+    ap.add_argument("--max-block-size", type=int, default=100)
+    ap.add_argument("--pair-batch-size", type=int, default=1_000_000)
+    ap.add_argument("--threshold", type=float, default=0.5, help="Match probability to merge a pair")
+    ap.add_argument("--scorer", default=None, help="FieldScorer weights (JSON from FieldScorer.save)")
+    ap.add_argument("--metrics-json", default=None,
+                    help="Write per-stage timing / throughput / peak RSS as JSON here (instrumentation.py)")
+    ap.add_argument("--metrics-prom", default=None, help="Same metrics in Prometheus text format")
+    ap.add_argument("--runtime", choices=["sync", "async"], default="sync",
+                    help="async: overlap input/output I/O with the compute stages (async_runtime.py)")
+    add_profile_arguments(ap)
+    args = ap.parse_args()
+    profile_from_args(args, args.out)
+
+    try:
+        text_col = int(args.text_col)
+    except ValueError:
+        text_col = args.text_col
+    header = args.header == "infer"
+    if args.metrics_json or args.metrics_prom:
+        instrumentation.enable()
+
+    config = PipelineConfig(
+        batch_size=args.batch_size, parser=args.parser, model_dir=args.model_dir,
+        ner_batch_size=args.ner_batch_size, min_confidence=args.min_confidence,
+        normalize_workers=args.normalize_workers, parse_workers=args.parse_workers,
+        score_workers=args.score_workers, executor=args.executor, max_pending=args.max_pending,
+        blocking=BlockingConfig(max_block_size=args.max_block_size),
+        pair_batch_size=args.pair_batch_size, threshold=args.threshold, scorer_path=args.scorer,
+    )
+    pipeline = AddressPipeline(config)
+
+    if args.runtime == "async":
+        from .async_runtime import run_files_async
+
+        labels = asyncio.run(run_files_async(pipeline, args.csv, args.out, args.parsed_out, text_col, header))
+    else:
+        labels = run_files(pipeline, args.csv, args.out, args.parsed_out, text_col, header)
+    n_clusters = int(labels.max()) + 1 if labels.size else 0
+    sys.stderr.write(f"[done] Finished. Rows: {labels.size}. Clusters: {n_clusters}. Output: {args.out}\n")
+    instrumentation.export(args.metrics_json, args.metrics_prom)
+
+def run_files(pipeline: AddressPipeline, path: str, out: str, parsed_out: Optional[str] = None,
+              text_col=0, header: bool = False) -> np.ndarray:
+    """Synchronous runtime: input CSV -> `out` (input rows + cluster), optional parse results."""
+    batch_size = pipeline.config.batch_size
+    parsed_file = open(parsed_out, "w", newline="", encoding="utf-8") if parsed_out else None
+    parsed_writer = None
+    if parsed_file is not None:
+        parsed_writer = csv.writer(parsed_file)
+        parsed_writer.writerow(["row", "text"] + PARSED_COLUMNS)
+
+    def on_parsed(batch: Batch) -> None:
+        if parsed_writer is not None:
+            with span("csv.write", len(batch.texts)):
+                parsed_writer.writerows(parsed_rows(batch))
+        sys.stderr.write(f"[info] Parsed {batch.offset + len(batch.texts)} rows so far...\n")
+
+    t0 = time.perf_counter()
+    try:
+        labels = pipeline.run(read_batches(path, batch_size, text_col, header), on_parsed)
+    finally:
+        if parsed_file is not None:
+            parsed_file.close()
+    sys.stderr.write(f"[info] Scored {pipeline.stats['pairs']} candidate pairs "
+                     f"({pipeline.stats['merged_pairs']} merged) in {time.perf_counter() - t0:.1f}s\n")
+
+    with open(out, "w", newline="", encoding="utf-8") as fout:
+        writer = csv.writer(fout)
+        for k, df in enumerate(labeled_chunks(path, labels, batch_size, header)):
+            if k == 0:
+                writer.writerow(list(df.columns))
+            with span("csv.write", len(df)):
+                writer.writerows(df.itertuples(index=False, name=None))
+    return labels
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+profiling.py
+------------
+`--profile` for the CLI entry points: cProfile plus a wall-clock stack sampler, written next
+to the run's output.
+
+    <prefix>.prof        cProfile stats of the main thread (pstats / snakeviz)
+    <prefix>.collapsed   sampled stacks of every Python thread, one "root;...;leaf count" line
+                         per distinct stack: flamegraph.pl, speedscope and inferno read it as is
+    <prefix>.txt         top functions by cumulative time (cProfile) and by sampled self time
+
+Why both: cProfile counts Python calls exactly but only sees the thread that enabled it and
+books time in native code (torch kernels, Rust tokenizers) to whichever builtin happens to be
+on top, often not at all when the native call releases the GIL. The sampler looks at every
+thread's current stack every `interval` seconds, so a forward pass shows up as samples under
+the Python frame that called into torch, and pool threads are included (threads parked on a
+lock or queue, i.e. idle pool workers, are skipped).
+Worker processes (NerWorkerPool, --executor process) are not profiled.
+
+CLI wiring (after parse_args):
+
+    add_profile_arguments(ap)
+    ...
+    profile_from_args(args, args.out)    # no-op without --profile; dumps at interpreter exit
+
+Library use:
+
+    with Profiler("run.profile"):
+        ...
+"""
+
+from __future__ import annotations
+
+import atexit
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+DEFAULT_INTERVAL = 0.005  # seconds between stack samples
+MAX_DEPTH = 256
+# Leaf frames of threads parked on a lock / queue (idle pool workers); not sampled unless idle=True
+IDLE_LEAVES = {("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"), ("queue.py", "get"),
+               ("selectors.py", "select"), ("thread.py", "_worker")}
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _collapse(frame, thread_name: str, max_depth: int = MAX_DEPTH) -> str:
+    labels: List[str] = []
+    while frame is not None and len(labels) < max_depth:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(f"thread:{thread_name}")
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """Background thread counting the collapsed stacks of all other threads."""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, max_depth: int = MAX_DEPTH, idle: bool = False):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.idle = idle
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (not self.idle and self._is_idle(frame)):
+                    continue
+                self.stacks[_collapse(frame, names.get(ident, str(ident)), self.max_depth)] += 1
+            self.samples += 1
+
+    @staticmethod
+    def _is_idle(frame) -> bool:
+        code = frame.f_code
+        return (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES
+
+    def self_counts(self) -> Counter:
+        """Samples per leaf frame (where the thread actually was)."""
+        leaves: Counter = Counter()
+        for stack, n in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += n
+        return leaves
+
+
+class Profiler:
+    def __init__(self, prefix: str, interval: float = DEFAULT_INTERVAL, top: int = 40):
+        self.prefix = prefix
+        self.top = top
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(interval)
+        self._t0 = 0.0
+        self._running = False
+
+    def start(self) -> "Profiler":
+        self._t0 = time.perf_counter()
+        self.sampler.start()
+        self.profile.enable()
+        self._running = True
+        return self
+
+    def stop(self) -> Dict[str, str]:
+        """Stop and write the three files (once); returns {kind: path}."""
+        if not self._running:
+            return {}
+        self._running = False
+        self.profile.disable()
+        self.sampler.stop()
+        wall = time.perf_counter() - self._t0
+
+        paths = {"prof": f"{self.prefix}.prof", "collapsed": f"{self.prefix}.collapsed", "txt": f"{self.prefix}.txt"}
+        parent = os.path.dirname(os.path.abspath(self.prefix))
+        os.makedirs(parent, exist_ok=True)
+        self.profile.dump_stats(paths["prof"])
+        with open(paths["collapsed"], "w", encoding="utf-8") as f:
+            for stack, n in sorted(self.sampler.stacks.items()):
+                f.write(f"{stack} {n}\n")
+        with open(paths["txt"], "w", encoding="utf-8") as f:
+            f.write(self.report(wall))
+        sys.stderr.write(f"[profile] {wall:.1f}s, {self.sampler.samples} stack samples -> "
+                         f"{paths['prof']}, {paths['collapsed']}, {paths['txt']}\n")
+        return paths
+
+    def report(self, wall: float) -> str:
+        out = io.StringIO()
+        out.write(f"wall time: {wall:.3f}s, stack samples: {self.sampler.samples} "
+                  f"(every {1e3 * self.sampler.interval:.1f} ms)\n\n")
+        out.write("== sampled self time (all threads; includes native code under its Python caller) ==\n")
+        total = sum(self.sampler.stacks.values()) or 1
+        for label, n in self.sampler.self_counts().most_common(self.top):
+            out.write(f"{100.0 * n / total:6.1f}%  {n:8d}  {label}\n")
+        out.write("\n== cProfile, main thread, by cumulative time ==\n")
+        stats = pstats.Stats(self.profile, stream=out)
+        stats.sort_stats("cumulative").print_stats(self.top)
+        return out.getvalue()
+
+    def __enter__(self) -> "Profiler":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+
+# ---------- CLI wiring ----------
+
+def add_profile_arguments(ap) -> None:
+    ap.add_argument("--profile", action="store_true",
+                    help="Write cProfile stats + sampled collapsed stacks (flamegraph) next to the output")
+    ap.add_argument("--profile-interval", type=float, default=DEFAULT_INTERVAL,
+                    help="Seconds between stack samples with --profile")
+
+def profile_from_args(args, output: Optional[str] = None) -> Optional[Profiler]:
+    """
+    Start a Profiler when args.profile is set; files go to '<output>.profile.*' (or
+    './profile.*'). It stops at interpreter exit, so every return path of main() is covered.
+    """
+    if not getattr(args, "profile", False):
+        return None
+    prefix = f"{output}.profile" if output else "profile"
+    profiler = Profiler(prefix, interval=getattr(args, "profile_interval", DEFAULT_INTERVAL))
+    atexit.register(profiler.stop)
+    return profiler.start()
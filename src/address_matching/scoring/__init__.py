@@ -0,0 +1,2 @@
+from .field_scorer import AddressTable, AddressTableBuilder, FieldScorer
+from .similarity import jaro_winkler, levenshtein_similarity, token_set_ratio
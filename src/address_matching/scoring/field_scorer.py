@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+field_scorer.py
+---------------
+Field-by-field match probability for pairs of parsed addresses, scored over NumPy arrays.
+
+Addresses are encoded once into an AddressTable (one row per address):
+    codes    (n, 8) int32   province, district, neighbourhood, street (SOKAK), avenue (CADDE,
+                            else BULVAR: both are main roads and an address names one of them),
+                            building (BINA_NO), flat (DAIRE_NO) and floor (KAT) as integer ids,
+                            -1 if missing; numbers are canonical (normalization/numbers.py), so
+                            "no:9b" and "9/B" get the same id
+    vocab    encoded codepoints of every distinct value (see similarity.encode), indexed by id
+
+A pair batch is then a pair of row-index arrays. Every field gives a similarity s in [0, 1]
+(id equality; for non-numeric street names with different ids the Jaro-Winkler similarity,
+computed once per distinct id pair of the batch, so typos and "Kazımdirik"/"kazimdirik" still
+score high) and two features: agree = s, disagree = 1 - s, both 0 when either side lacks the
+field. A logistic model turns the 16 features into a probability:
+
+    table = AddressTable.from_addresses(addresses)       # Address objects with NER fields
+    scorer = FieldScorer()                               # default (hand-set) weights
+    scorer.fit(table, left, right, y)                    # calibrate on labeled pairs
+    p = scorer.score(table, left, right)                 # (len(left),) float32 probabilities
+
+The default weights only encode which fields matter (a different building number outweighs a
+matching street); fit() on labeled pairs makes the output an actual probability.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..address import Address
+from ..matching.blocking import street_token
+from ..normalization import canonical_number, format_number
+from .similarity import encode, jaro_winkler_codes
+
+FIELDS = ("province", "district", "neighbourhood", "street", "avenue", "building", "flat", "floor")
+FUZZY_FIELDS = ("street", "avenue")  # compared by Jaro-Winkler as well as by id
+FEATURES = tuple(f"{f}_{kind}" for f in FIELDS for kind in ("agree", "disagree"))
+
+# Uncalibrated starting point: log-odds contribution of each feature, plus the bias
+DEFAULT_WEIGHTS: Dict[str, float] = {
+    "province_agree": 0.5, "province_disagree": -4.0,
+    "district_agree": 1.0, "district_disagree": -4.0,
+    "neighbourhood_agree": 2.0, "neighbourhood_disagree": -3.0,
+    "street_agree": 2.5, "street_disagree": -2.5,
+    "avenue_agree": 1.5, "avenue_disagree": -1.5,
+    "building_agree": 2.0, "building_disagree": -5.0,
+    "flat_agree": 1.0, "flat_disagree": -3.0,
+    "floor_agree": 0.5, "floor_disagree": -2.0,
+}
+DEFAULT_BIAS = -4.0
+
+
+@dataclass
+class AddressTable:
+    codes: np.ndarray                      # (n, len(FIELDS)) int32
+    vocab: Tuple[np.ndarray, np.ndarray]   # (codepoints, lengths) of every id
+    numeric: np.ndarray                    # (n_ids,) bool, value is all digits
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    @classmethod
+    def from_addresses(cls, addresses: Sequence[Address]) -> "AddressTable":
+        builder = AddressTableBuilder()
+        builder.add(addresses)
+        return builder.build()
+
+
+def field_values(address: Address) -> Dict[str, Optional[str]]:
+    """Comparable value of every field (street tokens, canonical numbers), None if missing."""
+    return {
+        "province": address.city,
+        "district": address.district,
+        "neighbourhood": address.neighbourhood,
+        "street": street_token(address.get_field("SOKAK")),
+        "avenue": street_token(address.get_field("CADDE") or address.get_field("BULVAR")),
+        "building": format_number(canonical_number(address.get_field("BINA_NO"), "BINA_NO")),
+        "flat": format_number(canonical_number(address.get_field("DAIRE_NO"), "DAIRE_NO")),
+        "floor": format_number(canonical_number(address.get_field("KAT"), "KAT")),
+    }
+
+class AddressTableBuilder:
+    """Encodes addresses batch by batch (row ids continue across add() calls) into one table."""
+
+    def __init__(self):
+        self._ids: Dict[tuple, int] = {}
+        self._values: List[str] = []
+        self._chunks: List[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return sum(c.shape[0] for c in self._chunks)
+
+    def _code(self, field: str, value: Optional[str]) -> int:
+        if not value:
+            return -1
+        key = (field, value)
+        if key not in self._ids:
+            self._ids[key] = len(self._values)
+            self._values.append(value)
+        return self._ids[key]
+
+    def add(self, addresses: Iterable[Address]) -> None:
+        rows = []
+        for a in addresses:
+            values = field_values(a)
+            rows.append([self._code(f, values[f]) for f in FIELDS])
+        self._chunks.append(np.array(rows, dtype=np.int32).reshape(-1, len(FIELDS)))
+
+    def build(self) -> AddressTable:
+        codes = np.concatenate(self._chunks) if self._chunks else np.empty((0, len(FIELDS)), dtype=np.int32)
+        numeric = np.fromiter((v.replace(" ", "").isdigit() for v in self._values), dtype=bool,
+                              count=len(self._values))
+        return AddressTable(codes, encode(self._values), numeric)
+
+
+def field_similarities(table: AddressTable, left: np.ndarray, right: np.ndarray):
+    """(similarity, present): (m, len(FIELDS)) float32 in [0, 1] and bool, for m pairs."""
+    cl, cr = table.codes[left], table.codes[right]
+    present = (cl >= 0) & (cr >= 0)
+    sim = (cl == cr).astype(np.float32)
+    for f in FUZZY_FIELDS:
+        col = FIELDS.index(f)
+        a, b = cl[:, col], cr[:, col]
+        need = np.flatnonzero(present[:, col] & (a != b))
+        need = need[~(table.numeric[a[need]] | table.numeric[b[need]])]  # "2001" vs "2005": exact only
+        if not need.size:
+            continue
+        # one kernel call per distinct (id, id) pair: street vocabularies are small
+        packed, inverse = np.unique((a[need].astype(np.int64) << 32) | b[need], return_inverse=True)
+        ids_a, ids_b = packed >> 32, packed & 0xFFFFFFFF
+        codes, lengths = table.vocab
+        jw = jaro_winkler_codes(codes[ids_a], lengths[ids_a], codes[ids_b], lengths[ids_b])
+        sim[need, col] = jw[inverse]
+    sim[~present] = 0.0
+    return sim, present
+
+def pair_features(table: AddressTable, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """(m, len(FEATURES)) float32 agree / disagree features, ordered as FEATURES."""
+    sim, present = field_similarities(table, left, right)
+    out = np.empty((sim.shape[0], 2 * len(FIELDS)), dtype=np.float32)
+    out[:, 0::2] = sim
+    out[:, 1::2] = present - sim
+    return out
+
+
+class FieldScorer:
+    def __init__(self, weights: Optional[Dict[str, float]] = None, bias: float = DEFAULT_BIAS):
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        unknown = set(weights) - set(FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown feature weights {sorted(unknown)}. Known: {list(FEATURES)}")
+        self.weights = np.array([weights[f] for f in FEATURES], dtype=np.float32)
+        self.bias = float(bias)
+
+    def score(self, table: AddressTable, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        """Match probability of every (left[i], right[i]) row pair."""
+        z = pair_features(table, left, right) @ self.weights + np.float32(self.bias)
+        return (1.0 / (1.0 + np.exp(-z))).astype(np.float32)
+
+    __call__ = score
+
+    def fit(self, table: AddressTable, left: np.ndarray, right: np.ndarray, y: np.ndarray,
+            l2: float = 1.0, max_iter: int = 50, tol: float = 1e-6) -> "FieldScorer":
+        """
+        Logistic regression on labeled pairs (y = 1 same address) by Newton's method with an L2
+        penalty on the weights (not the bias). Keeps missing fields neutral: their features are 0.
+        """
+        X = pair_features(table, left, right).astype(np.float64)
+        X = np.hstack([X, np.ones((X.shape[0], 1))])
+        y = np.asarray(y, dtype=np.float64)
+        w = np.append(self.weights.astype(np.float64), self.bias)
+        penalty = np.full(w.size, l2)
+        penalty[-1] = 0.0
+        for _ in range(max_iter):
+            p = 1.0 / (1.0 + np.exp(-(X @ w)))
+            grad = X.T @ (p - y) + penalty * w
+            hess = (X * (p * (1 - p))[:, None]).T @ X + np.diag(penalty) + 1e-9 * np.eye(w.size)
+            step = np.linalg.solve(hess, grad)
+            w -= step
+            if np.abs(step).max() < tol:
+                break
+        self.weights = w[:-1].astype(np.float32)
+        self.bias = float(w[-1])
+        return self
+
+    # ---------- persistence ----------
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"weights": dict(zip(FEATURES, self.weights.tolist())), "bias": self.bias}
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "FieldScorer":
+        with open(path, encoding="utf-8") as f:
+            d = json.load(f)
+        return cls(d["weights"], d["bias"])
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+similarity.py
+-------------
+Batch string similarity for arrays of string pairs: Jaro-Winkler, normalized Levenshtein and
+token-set ratio, all in [0, 1].
+
+Strings are folded like normalize_static_parser (Turkish-aware lowercase + TR_FOLD_TABLE, so
+'ı/i', 'ş/s', 'ğ/g', 'ü/u', 'ö/o', 'ç/c' compare equal) and encoded once into a padded
+(n, max_len) uint32 codepoint matrix. The kernels then run over a whole batch of pairs at once:
+the Python loops go over character positions (at most max_len iterations), every step is a
+NumPy operation over all pairs.
+
+    a = encode(["Kazımdirik", "Atatürk"])
+    b = encode(["kazimdirik", "Ataturk Cad"])
+    jaro_winkler_codes(*a, *b)                      # encoded inputs, reusable across calls
+    jaro_winkler(left_texts, right_texts)           # same on plain strings
+
+Early exits (`min_similarity`): pairs that provably cannot reach the threshold are not computed
+and get 0.0. Levenshtein uses the length difference and the row minimum of the DP table
+(Ukkonen cut-off) and drops finished pairs from the batch; Jaro-Winkler uses the length-ratio
+upper bound.
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..normalization import AddressNormalizer
+
+MAX_LEN = 64          # longer strings are truncated when encoded
+CHUNK_SIZE = 4096     # pairs per kernel call (keeps the (chunk, width) work arrays in cache)
+
+Encoded = Tuple[np.ndarray, np.ndarray]  # (codes (n, L) uint32, lengths (n,) int32)
+
+
+def encode(texts: Sequence[Optional[str]], max_len: int = MAX_LEN, fold: bool = True) -> Encoded:
+    """Folded, truncated, zero-padded codepoints of every text (None counts as empty)."""
+    items = [(AddressNormalizer.fold(t) if fold else t)[:max_len] if t else "" for t in texts]
+    lengths = np.fromiter((len(t) for t in items), dtype=np.int32, count=len(items))
+    width = max(int(lengths.max(initial=0)), 1)
+    codes = np.array(items, dtype=f"<U{width}").view(np.uint32).reshape(len(items), width)
+    return codes, lengths
+
+
+def _length_chunks(la: np.ndarray, lb: np.ndarray, chunk_size: int):
+    """
+    Pair indices in chunks of similar lengths: the kernels loop over the longest string of a
+    chunk and work on (chunk, width) arrays, so one long outlier must not widen every pair.
+    """
+    order = np.lexsort((np.minimum(la, lb), np.maximum(la, lb)))
+    for start in range(0, order.size, chunk_size):
+        yield order[start:start + chunk_size]
+
+def _trim(a: np.ndarray, la: np.ndarray, b: np.ndarray, lb: np.ndarray, idx: np.ndarray):
+    wa, wb = max(int(la[idx].max(initial=0)), 1), max(int(lb[idx].max(initial=0)), 1)
+    return a[idx, :wa], la[idx], b[idx, :wb], lb[idx]
+
+
+# ---------- Levenshtein ----------
+
+def _levenshtein(a: np.ndarray, la: np.ndarray, b: np.ndarray, lb: np.ndarray, limit: np.ndarray) -> np.ndarray:
+    out = np.abs(la - lb)  # exact when one side is empty; a lower bound otherwise
+    act = np.flatnonzero((la > 0) & (lb > 0) & (out <= limit))
+    if act.size:
+        width = int(lb[act].max())
+        A, B = a[act], b[act, :width]
+        la_a, lb_a, lim_a = la[act], lb[act], limit[act]
+        cols = np.arange(width + 1, dtype=np.int32)
+        prev = np.broadcast_to(cols, (act.size, width + 1)).copy()
+        for i in range(1, int(la_a.max()) + 1):
+            tmp = np.empty_like(prev)
+            tmp[:, 0] = i
+            np.minimum(prev[:, 1:] + 1, prev[:, :-1] + (B != A[:, i - 1:i]), out=tmp[:, 1:])
+            # insertions: cur[j] = min_k<=j tmp[k] + (j - k)
+            cur = np.minimum.accumulate(tmp - cols, axis=1) + cols
+            done = la_a == i
+            out[act[done]] = cur[done, lb_a[done]]
+            # every path to the final cell crosses this row, so the row minimum is a lower bound
+            over = ~done & (cur.min(axis=1) > lim_a)
+            out[act[over]] = lim_a[over] + 1
+            keep = ~(done | over)
+            if not keep.all():
+                if not keep.any():
+                    break
+                act, A, B, cur = act[keep], A[keep], B[keep], cur[keep]
+                la_a, lb_a, lim_a = la_a[keep], lb_a[keep], lim_a[keep]
+            prev = cur
+    return np.minimum(out, limit + 1)
+
+def levenshtein_codes(a: np.ndarray, la: np.ndarray, b: np.ndarray, lb: np.ndarray,
+                      max_dist: Optional[np.ndarray] = None, chunk_size: int = CHUNK_SIZE) -> np.ndarray:
+    """
+    Edit distance of every (a[i], b[i]) pair. With `max_dist` (scalar or per pair), distances
+    above it are reported as max_dist + 1 and their computation stops early.
+    """
+    la, lb = la.astype(np.int32), lb.astype(np.int32)
+    limit = np.maximum(la, lb) if max_dist is None else np.broadcast_to(np.asarray(max_dist, dtype=np.int32), la.shape)
+    out = np.empty(la.size, dtype=np.int32)
+    for idx in _length_chunks(la, lb, chunk_size):
+        out[idx] = _levenshtein(*_trim(a, la, b, lb, idx), limit[idx])
+    return out
+
+def levenshtein_similarity_codes(a: np.ndarray, la: np.ndarray, b: np.ndarray, lb: np.ndarray,
+                                 min_similarity: float = 0.0) -> np.ndarray:
+    """1 - distance / max(len): 1.0 for equal strings (also both empty), 0.0 below min_similarity."""
+    longest = np.maximum(la, lb).astype(np.int32)
+    max_dist = np.floor((1.0 - min_similarity) * longest + 1e-9).astype(np.int32)
+    dist = levenshtein_codes(a, la, b, lb, max_dist)
+    sim = np.where(longest > 0, 1.0 - dist / np.maximum(longest, 1), 1.0).astype(np.float32)
+    sim[dist > max_dist] = 0.0
+    return sim
+
+
+# ---------- Jaro-Winkler ----------
+
+def _jaro_winkler(a: np.ndarray, la: np.ndarray, b: np.ndarray, lb: np.ndarray,
+                  prefix_weight: float, boost_threshold: float, min_similarity: float) -> np.ndarray:
+    m = a.shape[0]
+    out = np.zeros(m, dtype=np.float32)
+    out[(la == 0) & (lb == 0)] = 1.0
+    short, long_ = np.minimum(la, lb), np.maximum(la, lb)
+    # at most `short` matches and no transpositions: jaro <= (short/la + short/lb + 1) / 3
+    bound = (short / np.maximum(la, 1) + short / np.maximum(lb, 1) + 1.0) / 3.0
+    bound = bound + 4 * prefix_weight * (1.0 - bound)
+    act = np.flatnonzero((short > 0) & (bound >= min_similarity))
+    if not act.size:
+        return out
+    A, B = a[act], b[act, :int(lb[act].max())]
+    la_a, lb_a = la[act], lb[act]
+    k, width_a, width_b = act.size, int(la_a.max()), B.shape[1]
+    window = np.maximum(long_[act] // 2 - 1, 0)
+    # (k, width_a, width_b): equal chars within the match window, inside both strings
+    pos_a, pos_b = np.arange(width_a)[:, None], np.arange(width_b)[None, :]
+    allowed = ((A[:, :width_a, None] == B[:, None, :])
+               & (np.abs(pos_a - pos_b)[None] <= window[:, None, None])
+               & (pos_a[None] < la_a[:, None, None]) & (pos_b[None] < lb_a[:, None, None]))
+    b_used = np.zeros((k, width_b), dtype=bool)
+    a_match = np.zeros((k, width_a), dtype=bool)
+    rows = np.arange(k)
+    for i in range(width_a):
+        cand = allowed[:, i] & ~b_used
+        has = cand.any(axis=1)
+        first = cand.argmax(axis=1)
+        b_used[rows[has], first[has]] = True
+        a_match[:, i] = has
+    matches = a_match.sum(axis=1)
+    # transpositions: k-th matched char of a vs k-th matched char of b
+    a_seq = np.take_along_axis(A[:, :width_a], np.argsort(~a_match, axis=1, kind="stable"), axis=1)
+    b_seq = np.take_along_axis(B, np.argsort(~b_used, axis=1, kind="stable"), axis=1)
+    n = min(width_a, width_b)
+    half_t = ((a_seq[:, :n] != b_seq[:, :n]) & (np.arange(n) < matches[:, None])).sum(axis=1) / 2.0
+    safe = np.maximum(matches, 1)
+    jaro = np.where(matches > 0, (matches / la_a + matches / lb_a + (matches - half_t) / safe) / 3.0, 0.0)
+    p = min(4, n)
+    same = (A[:, :p] == B[:, :p]) & (np.arange(p) < np.minimum(la_a, lb_a)[:, None])
+    prefix = np.cumprod(same, axis=1).sum(axis=1)
+    jw = np.where(jaro > boost_threshold, jaro + prefix * prefix_weight * (1.0 - jaro), jaro)
+    out[act] = np.where(jw >= min_similarity, jw, 0.0)
+    return out
+
+def jaro_winkler_codes(a: np.ndarray, la: np.ndarray, b: np.ndarray, lb: np.ndarray,
+                       prefix_weight: float = 0.1, boost_threshold: float = 0.7,
+                       min_similarity: float = 0.0, chunk_size: int = CHUNK_SIZE) -> np.ndarray:
+    """
+    Jaro-Winkler similarity of every (a[i], b[i]) pair; the common-prefix boost (up to 4 chars)
+    applies when the Jaro similarity exceeds `boost_threshold`.
+    """
+    la, lb = la.astype(np.int32), lb.astype(np.int32)
+    out = np.empty(la.size, dtype=np.float32)
+    for idx in _length_chunks(la, lb, chunk_size):
+        out[idx] = _jaro_winkler(*_trim(a, la, b, lb, idx), prefix_weight, boost_threshold, min_similarity)
+    return out
+
+
+# ---------- string-level wrappers ----------
+
+def levenshtein_similarity(left: Sequence[Optional[str]], right: Sequence[Optional[str]],
+                           min_similarity: float = 0.0, max_len: int = MAX_LEN) -> np.ndarray:
+    return levenshtein_similarity_codes(*encode(left, max_len), *encode(right, max_len), min_similarity)
+
+def jaro_winkler(left: Sequence[Optional[str]], right: Sequence[Optional[str]],
+                 min_similarity: float = 0.0, max_len: int = MAX_LEN) -> np.ndarray:
+    return jaro_winkler_codes(*encode(left, max_len), *encode(right, max_len), min_similarity=min_similarity)
+
+def token_set_ratio(left: Sequence[Optional[str]], right: Sequence[Optional[str]],
+                    min_similarity: float = 0.0, max_len: int = MAX_LEN) -> np.ndarray:
+    """
+    Token-set ratio on folded tokens: with I = sorted common tokens and Da / Db the sorted rest,
+    the best normalized Levenshtein similarity among (I, I+Da), (I, I+Db), (I+Da, I+Db).
+    Word order and repeated tokens do not matter; a subset scores 1.0. Empty sides score 0.0.
+    """
+    t0, t1, t2, empty = [], [], [], []
+    for x, y in zip(left, right):
+        sa = set(AddressNormalizer.fold(x).split()) if x else set()
+        sb = set(AddressNormalizer.fold(y).split()) if y else set()
+        empty.append(not sa or not sb)
+        common = " ".join(sorted(sa & sb))
+        t0.append(common)
+        t1.append(" ".join(filter(None, (common, " ".join(sorted(sa - sb))))))
+        t2.append(" ".join(filter(None, (common, " ".join(sorted(sb - sa))))))
+    e0, e1, e2 = (encode(t, max_len, fold=False) for t in (t0, t1, t2))
+    best = levenshtein_similarity_codes(*e0, *e1, min_similarity)
+    np.maximum(best, levenshtein_similarity_codes(*e0, *e2, min_similarity), out=best)
+    np.maximum(best, levenshtein_similarity_codes(*e1, *e2, min_similarity), out=best)
+    best[np.asarray(empty, dtype=bool)] = 0.0
+    return best
@@ -0,0 +1,41 @@
+# test/test_benchmarks.py
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.harness import compare, measure
+from benchmarks.workloads import synth_texts, workload_digest
+
+def _payload(per_item, digest="abc"):
+    results = {name: {"items": 10, "per_item_us": us, "min_s": us * 10 / 1e6} for name, us in per_item.items()}
+    return {"meta": {"workloads": {"synth": digest}}, "results": results}
+
+def test_measure():
+    calls = []
+    res = measure(lambda: calls.append(1), items=4, repeat=3, warmup=1, params={"n": 4})
+    assert len(calls) == 4 and len(res.samples_s) == 3
+    d = res.to_dict()
+    assert d["items"] == 4 and d["params"] == {"n": 4} and d["min_s"] <= d["median_s"]
+
+def test_compare():
+    base = _payload({"a": 100.0, "b": 100.0, "only_base": 1.0})
+    new = _payload({"a": 125.0, "b": 90.0})
+    rows, problems = compare(base, new)
+    assert problems == []
+    change = {r.case: round(r.change, 3) for r in rows}
+    assert change == {"a": 0.25, "b": -0.1}
+    _, problems = compare(base, _payload({"a": 1.0}, digest="other"))
+    assert problems and "synth" in problems[0]
+
+def test_workload_is_reproducible():
+    a, b = synth_texts(20, seed=3), synth_texts(20, seed=3)
+    assert a == b and len(a) == 20
+    assert workload_digest(a) != workload_digest(synth_texts(20, seed=4))
+
+if __name__ == "__main__":
+    test_measure()
+    test_compare()
+    test_workload_is_reproducible()
+    print("OK")
@@ -0,0 +1,56 @@
+# test/test_blocking.py
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from src.address_matching.address import Address
+from src.address_matching.matching.blocking import BlockIndex, BlockingConfig, street_token
+
+# Each tuple: (field text, expected street token)
+tests_tokens = [
+    ("1004. Sokak", "1004"),
+    ("Atatürk Caddesi", "ataturk"),
+    ("Şehit Er Bulvarı", "sehit er"),
+    ("No : 012 / 3", "no 012 3"),
+]
+
+ADMIN = ("izmir", "cesme", "16 eylul")
+addresses = [
+    Address(*ADMIN, text="16 eylül mah 2001 sk no 9", fields={"SOKAK": "2001 sokak", "BINA_NO": "no 9"}),
+    Address(*ADMIN, text="16 Eylül Mahallesi 2001. Sokak No:9/D", fields={"SOKAK": "2001. Sokak", "BINA_NO": "No:9/D"}),
+    Address(*ADMIN, text="16 eylül mah 2005 sk no 9", fields={"SOKAK": "2005 sk", "BINA_NO": "no 9"}),
+    Address("izmir", "bornova", "kazimdirik", text="kazımdirik mah 2001 sk no 9",
+            fields={"SOKAK": "2001 sk", "BINA_NO": "no 9"}),
+    Address(None, None, None, text="no admin ids at all", fields={"SOKAK": "2001 sk"}),
+]
+
+def test_tokens():
+    for text, street in tests_tokens:
+        assert street_token(text) == street, text
+
+def test_pairs_stay_inside_blocks():
+    index = BlockIndex()
+    index.add(addresses)
+    left, right = index.candidate_pairs()
+    pairs = set(zip(left.tolist(), right.tolist()))
+    # 0-1 share street and number, 0-2 / 1-2 share the number; 3 is another neighbourhood, 4 has no keys
+    assert pairs == {(0, 1), (0, 2), (1, 2)}
+
+def test_block_size_cap():
+    many = [Address(*ADMIN, text=f"16 eylül mah {i} sk", fields={"SOKAK": "2001 sk"}) for i in range(10)]
+    index = BlockIndex(BlockingConfig(max_block_size=3))
+    index.add(many)
+    left, _ = index.candidate_pairs()
+    assert index.stats()["oversize_blocks"] == 1
+    assert left.size == 9 + 8                      # window of 3: neighbours at distance 1 and 2
+    index = BlockIndex(BlockingConfig(max_block_size=3, oversize="skip"))
+    index.add(many)
+    assert index.candidate_pairs()[0].size == 0
+
+if __name__ == "__main__":
+    test_tokens()
+    test_pairs_stay_inside_blocks()
+    test_block_size_cap()
+    print("OK")
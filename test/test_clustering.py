@@ -0,0 +1,40 @@
+# test/test_clustering.py
+from pathlib import Path
+import sys
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from src.address_matching.matching.clustering import UnionFind, cluster_pairs
+
+# Each tuple: (left, right, score)
+pairs = [
+    (5, 3, 0.9),
+    (3, 1, 0.8),
+    (6, 7, 0.7),
+    (0, 2, 0.2),   # below threshold
+    (7, 6, 0.95),  # duplicate of an earlier pair
+    (1, 5, 0.6),   # already joined
+]
+
+def test_labels():
+    batches = [tuple(np.array(col) for col in zip(*pairs[:3])), tuple(np.array(col) for col in zip(*pairs[3:]))]
+    labels = cluster_pairs(8, batches, threshold=0.5)
+    # clusters numbered by smallest member: {0} {1,3,5} {2} {4} {6,7}
+    assert labels.tolist() == [0, 1, 2, 1, 3, 1, 4, 4]
+
+def test_merge_count_and_roots():
+    uf = UnionFind(6)
+    # one batch where several pairs hook the same root
+    assert uf.union(np.array([5, 5, 4, 2]), np.array([0, 1, 1, 3])) == 4
+    assert uf.n_clusters() == 2
+    assert uf.roots().tolist() == [0, 0, 2, 2, 0, 0]
+    assert uf.union(np.array([3]), np.array([4])) == 1
+    assert uf.labels().tolist() == [0] * 6
+
+if __name__ == "__main__":
+    test_labels()
+    test_merge_count_and_roots()
+    print("OK")
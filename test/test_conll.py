@@ -0,0 +1,45 @@
+# test/test_conll.py
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from src.address_matching.parsing.conll import read_conll, bio_entities, entity_prf
+
+# Each tuple: (tags, expected entities)
+tests_bio_entities = [
+    (["B-MAHALLE", "I-MAHALLE", "B-CADDE", "I-CADDE"], [("MAHALLE", 0, 2), ("CADDE", 2, 4)]),
+    (["B-IL", "B-IL"], [("IL", 0, 1), ("IL", 1, 2)]),
+    (["O", "I-TARIF", "I-TARIF", "O"], [("TARIF", 1, 3)]),
+    (["B-SOKAK", "I-BINA_NO", "I-BINA_NO"], [("SOKAK", 0, 1), ("BINA_NO", 1, 3)]),
+    (["O", "O"], []),
+]
+
+def test_bio_entities():
+    for tags, exp in tests_bio_entities:
+        assert bio_entities(tags) == exp, (tags, bio_entities(tags))
+
+def test_entity_prf():
+    gold = [["B-MAHALLE", "I-MAHALLE", "B-IL"], ["B-CADDE", "O"]]
+    pred = [["B-MAHALLE", "I-MAHALLE", "B-ILCE"], ["B-CADDE", "O"]]
+    out = entity_prf(gold, pred)
+    assert out["MAHALLE"]["f1"] == 1.0
+    assert out["IL"]["recall"] == 0.0 and out["ILCE"]["precision"] == 0.0
+    assert abs(out["ALL"]["f1"] - 2 / 3) < 1e-9
+
+def test_read_conll():
+    path = ROOT / "data" / "goldset" / "goldset_1k_yegeb.conll"
+    sents = read_conll(str(path))
+    first = sents[0]
+    assert first.text.startswith("Foça mahallesi Yergüzler caddesi")
+    assert (first.cluster, first.group) == ("15675", "A")
+    assert first.tokens[:2] == ["Foça", "mahallesi"] and first.tags[:2] == ["B-MAHALLE", "I-MAHALLE"]
+    assert all(len(s.tokens) == len(s.tags) for s in sents)
+    assert all(s.cluster is not None for s in sents)
+
+if __name__ == "__main__":
+    test_bio_entities()
+    test_entity_prf()
+    test_read_conll()
+    print("OK")
@@ -0,0 +1,110 @@
+# test/test_distill_student.py
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import torch
+from transformers import AutoConfig, AutoModelForTokenClassification, AutoTokenizer
+
+from src.address_matching.parsing.conll import ConllSentence
+from training_notebooks.distill_student import DEFAULT_SYNTH, build_student, distill_loss, encode, pick_layers
+
+MODEL_DIR = ROOT / "models" / "BERTurk_stage1_out"
+
+tests_layers = [
+    ((12, 3), [0, 6, 11]),
+    ((12, 2), [0, 11]),
+    ((4, 4), [0, 1, 2, 3]),
+    ((4, 1), [0]),
+]
+
+def _tiny_teacher(layers=4):
+    config = AutoConfig.from_pretrained(MODEL_DIR, hidden_size=32, num_hidden_layers=layers,
+                                        num_attention_heads=2, intermediate_size=64)
+    torch.manual_seed(0)
+    return AutoModelForTokenClassification.from_config(config).eval()
+
+def test_pick_layers():
+    for (n_teacher, n_student), expected in tests_layers:
+        assert pick_layers(n_teacher, n_student) == expected
+
+def test_default_synth_path_is_where_the_generator_writes():
+    from data.synth import generate_A2E_BIO_synth as a2e
+
+    assert DEFAULT_SYNTH[0] == a2e.HERE.parent / "synth_group_A2E.conll"
+
+def test_build_student_copies_teacher_layers():
+    teacher = _tiny_teacher(4)
+    student, kept = build_student(teacher, 2)
+    assert kept == [0, 3] and student.config.num_hidden_layers == 2
+    assert teacher.config.num_hidden_layers == 4  # config is copied, not shared
+    t, s = teacher.state_dict(), student.state_dict()
+    for key, value in s.items():
+        src = key.replace(".layer.1.", ".layer.3.")
+        assert torch.equal(value, t[src]), key
+
+def test_encode_labels_first_subwords():
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_DIR)
+    label2id = {"O": 0, "B-MAHALLE": 1, "I-MAHALLE": 2}
+    sent = ConllSentence(text="kemalpaşa mahallesi xyz", tokens=["kemalpaşa", "mahallesi", "xyz"],
+                         tags=["B-MAHALLE", "I-MAHALLE", "B-UNSEEN"])
+    [feat] = encode(tokenizer, [sent], label2id, max_length=32)
+    enc = tokenizer(sent.tokens, is_split_into_words=True)
+    assert feat["input_ids"] == enc["input_ids"] and len(feat["labels"]) == len(feat["input_ids"])
+    assert len(feat["input_ids"]) > len(sent.tokens) + 2  # at least one word is split into subwords
+    expected, prev = [], None
+    for w in enc.word_ids():
+        expected.append(-100 if w is None or w == prev else [1, 2, -100][w])
+        prev = w
+    assert feat["labels"] == expected
+    assert [l for l in feat["labels"] if l != -100] == [1, 2]  # unseen tag ignored, one label per word
+
+def test_distill_loss():
+    torch.manual_seed(0)
+    teacher_logits = torch.randn(2, 5, 7)
+    labels = torch.tensor([[-100, 3, -100, 1, -100], [-100, 2, -100, -100, -100]])
+    mask = torch.tensor([[1, 1, 1, 1, 1], [1, 1, 1, 0, 0]])
+
+    loss, kd, ce = distill_loss(teacher_logits.clone(), teacher_logits, labels, mask, 2.0, 0.5)
+    assert abs(kd) < 1e-6 and ce > 0 and abs(loss.item() - 0.5 * ce) < 1e-5
+
+    student_logits = torch.randn(2, 5, 7, requires_grad=True)
+    loss, kd, ce = distill_loss(student_logits, teacher_logits, labels, mask, 2.0, 1.0)
+    assert kd > 0 and abs(loss.item() - kd) < 1e-5
+    loss.backward()
+    assert student_logits.grad[1, 3:].abs().sum() == 0  # padding gets no gradient
+    assert student_logits.grad[0, 0].abs().sum() > 0    # every real subword is distilled
+
+    padded = teacher_logits.clone()
+    padded[1, 3:] += 100.0
+    assert abs(distill_loss(student_logits, padded, labels, mask, 2.0, 1.0)[1] - kd) < 1e-5
+
+def test_distill_step_smoke():
+    teacher = _tiny_teacher(4)
+    student, _ = build_student(teacher, 2)
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_DIR)
+    label2id = {str(k): int(v) for k, v in teacher.config.label2id.items()}
+    tag = next(t for t in label2id if t != "O")
+    sents = [ConllSentence(text="moda caddesi no 12", tokens=["moda", "caddesi", "no", "12"],
+                           tags=[tag, "O", "O", "O"])]
+    feat = encode(tokenizer, sents, label2id, max_length=32)[0]
+    batch = {k: torch.tensor([v]) for k, v in feat.items()}
+    labels = batch.pop("labels")
+    with torch.no_grad():
+        teacher_logits = teacher(**batch).logits
+    student.train()
+    loss, kd, ce = distill_loss(student(**batch).logits, teacher_logits, labels, batch["attention_mask"], 2.0, 0.5)
+    loss.backward()
+    assert torch.isfinite(loss) and kd >= 0 and ce > 0
+    assert student.classifier.weight.grad is not None
+
+if __name__ == "__main__":
+    test_pick_layers()
+    test_default_synth_path_is_where_the_generator_writes()
+    test_build_student_copies_teacher_layers()
+    test_encode_labels_first_subwords()
+    test_distill_loss()
+    test_distill_step_smoke()
+    print("OK")
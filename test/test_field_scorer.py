@@ -0,0 +1,74 @@
+# test/test_field_scorer.py
+from pathlib import Path
+import sys
+import tempfile
+import os
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from src.address_matching.address import Address
+from src.address_matching.scoring.field_scorer import AddressTable, FieldScorer, field_similarities, FIELDS
+
+ADMIN = ("izmir", "cesme", "16 eylul")
+addresses = [
+    Address(*ADMIN, fields={"SOKAK": "2001 sokak", "BINA_NO": "no 9", "DAIRE_NO": "d 3"}),
+    Address(*ADMIN, fields={"SOKAK": "2001. Sokağı", "BINA_NO": "No:9", "DAIRE_NO": "Daire 3"}),
+    Address(*ADMIN, fields={"SOKAK": "2001 sokak", "BINA_NO": "no 11", "DAIRE_NO": "d 3"}),
+    Address("izmir", "bornova", "kazimdirik", fields={"SOKAK": "372 sk", "BINA_NO": "no 9"}),
+    Address(*ADMIN, fields={}),
+]
+
+# Each tuple: (left row, right row)
+pairs = [(0, 1), (0, 2), (0, 3), (0, 4)]
+
+def test_field_similarities():
+    table = AddressTable.from_addresses(addresses)
+    left, right = np.array([p[0] for p in pairs]), np.array([p[1] for p in pairs])
+    sim, present = field_similarities(table, left, right)
+    col = {f: i for i, f in enumerate(FIELDS)}
+    assert sim[0, col["street"]] == 1.0 and sim[0, col["building"]] == 1.0
+    assert present[1, col["building"]] and sim[1, col["building"]] == 0.0
+    assert present[2, col["district"]] and sim[2, col["district"]] == 0.0
+    assert not present[3, col["street"]] and sim[3, col["street"]] == 0.0
+
+def test_boulevard_fills_the_avenue_slot():
+    boulevards = [
+        Address(*ADMIN, fields={"BULVAR": "Atatürk Bulvarı", "BINA_NO": "no 9"}),
+        Address(*ADMIN, fields={"BULVAR": "ataturk blv", "BINA_NO": "9"}),
+        Address(*ADMIN, fields={"BULVAR": "Şehit Er Bulvarı", "BINA_NO": "9"}),
+    ]
+    table = AddressTable.from_addresses(boulevards)
+    sim, present = field_similarities(table, np.array([0, 0]), np.array([1, 2]))
+    col = FIELDS.index("avenue")
+    assert present[:, col].all() and sim[0, col] == 1.0 and sim[1, col] < 0.8
+    p = FieldScorer().score(table, np.array([0, 0]), np.array([1, 2]))
+    assert p[0] > p[1]
+
+def test_scores_order():
+    table = AddressTable.from_addresses(addresses)
+    left, right = np.array([p[0] for p in pairs]), np.array([p[1] for p in pairs])
+    p = FieldScorer().score(table, left, right)
+    # same address >> only admin known > other building number > other district
+    assert p[0] > 0.9 and p[0] > p[3] > p[1] > p[2]
+
+def test_fit_and_persist():
+    table = AddressTable.from_addresses(addresses)
+    left, right = np.array([0, 0, 0, 1, 1]), np.array([1, 2, 3, 2, 3])
+    y = np.array([1, 0, 0, 0, 0])
+    scorer = FieldScorer().fit(table, np.tile(left, 20), np.tile(right, 20), np.tile(y, 20))
+    p = scorer.score(table, left, right)
+    assert p[0] > 0.5 > p[1:].max()
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "scorer.json")
+        scorer.save(path)
+        assert np.allclose(FieldScorer.load(path).score(table, left, right), p)
+
+if __name__ == "__main__":
+    test_field_similarities()
+    test_boulevard_fills_the_avenue_slot()
+    test_scores_order()
+    test_fit_and_persist()
+    print("OK")
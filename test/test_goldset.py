@@ -0,0 +1,76 @@
+# test/test_goldset.py
+from collections import Counter
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.goldset import (EvalConfig, build_parser, evaluate, format_table, gold_items, item_prf,
+                                pairwise_prf, predicted_items)
+from src.address_matching.parsing.conll import ConllSentence, read_conll
+from src.address_matching.parsing.hybrid_parser import HybridAddressParser
+from src.address_matching.pipeline.pipeline import PipelineConfig
+
+SPECS = [
+    ("static", EvalConfig("static")),
+    ("ner", EvalConfig("ner", "direct")),
+    ("hybrid:pipeline:int8", EvalConfig("hybrid", "pipeline", "int8")),
+]
+BAD_SPECS = ["regex", "ner:onnx", "static:int8"]
+
+def test_config_specs():
+    for spec, expected in SPECS:
+        assert EvalConfig.from_spec(spec) == expected
+    assert EvalConfig.from_spec("ner").name == "ner:direct"
+    for spec in BAD_SPECS:
+        try:
+            EvalConfig.from_spec(spec)
+        except ValueError:
+            continue
+        raise AssertionError(f"{spec} accepted")
+
+def test_item_prf():
+    gold = [Counter({("IL", "izmir"): 1, ("SOKAK", "1004 sk"): 1}), Counter({("IL", "denizli"): 1})]
+    pred = [Counter({("IL", "izmir"): 1, ("SOKAK", "1005 sk"): 1}), Counter()]
+    res = item_prf(gold, pred)
+    assert res["IL"]["precision"] == 1.0 and res["IL"]["recall"] == 0.5
+    assert res["SOKAK"]["f1"] == 0.0 and res["SOKAK"]["support"] == 1
+    assert res["ALL"]["precision"] == 0.5 and res["ALL"]["support"] == 3
+
+def test_pairwise_prf():
+    # gold pairs {01, 23}; predicted pairs {01, 02, 12}
+    res = pairwise_prf([0, 0, 1, 1], ["a", "a", "a", "b"])
+    assert abs(res["precision"] - 1 / 3) < 1e-9 and res["recall"] == 0.5 and res["support"] == 2
+    assert pairwise_prf([0, 1, 2], [5, 6, 7])["f1"] == 1.0  # no pairs on either side
+    assert pairwise_prf([0, 1], [0, 0])["precision"] == 0.0
+
+def test_static_fields_get_credit():
+    sent = ConllSentence(text="Moda Caddesi No: 12 Kat 3", tokens=["Moda", "Caddesi", "No:", "12", "Kat", "3"],
+                         tags=["B-CADDE", "I-CADDE", "B-BINA_NO", "I-BINA_NO", "B-KAT", "I-KAT"])
+    [record] = HybridAddressParser().parse_batch([sent.text])
+    assert record["route"] == "static"
+    pred = predicted_items(record)
+    assert pred == gold_items(record, sent)
+    assert pred[("CADDE", "moda")] == 1 and pred[("BINA_NO", "12")] == 1 and pred[("KAT", "3")] == 1
+    res = item_prf([gold_items(record, sent)], [pred])
+    assert res["CADDE"]["f1"] == 1.0 and res["BINA_NO"]["f1"] == 1.0
+
+def test_static_on_goldset():
+    sents = read_conll(str(ROOT / "data" / "baris_250.conll"))
+    parser, random_init = build_parser(EvalConfig("static"), None, model_dir="unused")
+    assert not random_init
+    res = evaluate(parser, sents, parser.static, batch_size=1, match_config=PipelineConfig())
+    assert res["addresses"] == len(sents) and res["routed_ner"] == 0.0
+    assert res["latency_p50_ms"] <= res["latency_p99_ms"] and res["addresses_per_s"] > 0
+    assert res["entities"]["MAHALLE"]["recall"] > 0 and res["entities"]["SOKAK"]["recall"] > 0
+    table = format_table("baris_250.conll", {"static": res})
+    assert "addresses/s" in table and "pairs P/R/F1" in table and "MAHALLE" in table
+
+if __name__ == "__main__":
+    test_config_specs()
+    test_item_prf()
+    test_pairwise_prf()
+    test_static_fields_get_credit()
+    test_static_on_goldset()
+    print("OK")
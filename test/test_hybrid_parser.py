@@ -0,0 +1,88 @@
+# test/test_hybrid_parser.py
+from pathlib import Path
+import json
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.address_matching.parsing.hybrid_parser import HybridAddressParser, static_confidence, ambiguity_flags
+from src.address_matching.matching.blocking import fold_text
+from src.address_matching.parsing.static_parser import street_fields
+
+# Each tuple: (input, expected route)
+tests_routing = [
+    ("Caferağa Mah., Kadıköy / İstanbul No:12 D:5", "static"),
+    ("Etlik mh keçiören ankara no:10", "static"),
+    ("Barbaros Bulvarı No:12", "ner"),            # no admin units at all
+]
+
+def _fake_ner(texts):
+    ents = [{"type": "BINA_NO", "text": "No:12", "start": 0, "end": 5, "score": 1.0}]
+    return [{"pred_tags": "", "entities_json": json.dumps(ents), "entities_flat": "BINA_NO=No:12"} for _ in texts]
+
+def test_routing():
+    parser = HybridAddressParser(ner_fn=_fake_ner)
+    records = parser.parse_batch([t for t, _ in tests_routing])
+    for (text, exp), rec in zip(tests_routing, records):
+        assert rec["route"] == exp, (text, rec)
+    assert records[0]["neighbourhood"] == "caferaga" and records[0]["confidence"] == 1.0
+    assert records[0]["fields"] == {"BINA_NO": "12"}  # static rows: street_fields()
+    assert records[2]["fields"] == {"BINA_NO": "No:12"}
+    assert parser.stats == {"rows": 3, "routed": 1}
+
+def test_fields_only_for_static_rows():
+    from src.address_matching.parsing import hybrid_parser
+
+    texts = [t for t, _ in tests_routing]
+    calls = []
+    hybrid_parser.street_fields = lambda text, folded=None: calls.append((text, folded)) or street_fields(text, folded)
+    try:
+        records = HybridAddressParser(ner_fn=_fake_ner).parse_batch(texts, folded=[fold_text(t) for t in texts])
+    finally:
+        hybrid_parser.street_fields = street_fields
+    assert calls == [(t, fold_text(t)) for t, route in tests_routing if route == "static"]  # no re-normalizing
+    assert records == HybridAddressParser(ner_fn=_fake_ner).parse_batch(texts)
+
+# Each tuple: (input, expected street_fields)
+tests_fields = [
+    ("Caferağa Mah. Moda Cad. No:12 Kadıköy İstanbul", {"CADDE": "moda", "BINA_NO": "12"}),
+    ("kazimdirik mahallesi 372 sokak no 5 bornova izmir", {"SOKAK": "372", "BINA_NO": "5"}),
+    ("Atatürk Bulvarı No 15 Kat 3 Daire 7 D:4", {"BULVAR": "ataturk", "BINA_NO": "15", "KAT": "3", "DAIRE_NO": "7"}),
+    ("Etlik Mah. Keçiören Ankara", {}),
+]
+
+def test_street_fields():
+    for text, exp in tests_fields:
+        assert street_fields(text) == exp, (text, street_fields(text))
+        assert street_fields(text, folded=fold_text(text)) == exp, text
+
+def test_ner_province_replaces_inferred():
+    ents = [{"type": "IL", "text": "zonguldak", "start": 0, "end": 9, "score": 1.0}]
+    parser = HybridAddressParser(ner_fn=lambda texts: [{"entities_json": json.dumps(ents)} for _ in texts])
+    static = parser.static.match("merkez ilçesi cumhuriyet caddesi no 5")
+    assert static["province_inferred"] and static["province"] != "zonguldak"
+    rec = parser.parse("merkez ilçesi cumhuriyet caddesi no 5")
+    assert rec["route"] == "ner" and (rec["province"], rec["district"]) == ("zonguldak", "merkez")
+    assert "district_in_many_provinces" not in rec["flags"]
+    assert rec["confidence"] == static_confidence(rec, rec["flags"])
+
+def test_gazetteer_snapping():
+    parser = HybridAddressParser()
+    res = parser.static.resolve_admin(["İzmir"], ["Kadıköy", "Bornova"], ["Kazımdirik Mah."])
+    assert (res["province"], res["district"], res["neighbourhood"]) == ("izmir", "bornova", "kazimdirik")
+    assert res["rejected"] == [("district", "Kadıköy")]  # not a district of İzmir
+
+def test_confidence():
+    parser = HybridAddressParser()
+    m = parser.static.match("Kadıköy")
+    assert static_confidence(m, ambiguity_flags(m)) < 1.0
+
+if __name__ == "__main__":
+    test_routing()
+    test_fields_only_for_static_rows()
+    test_street_fields()
+    test_ner_province_replaces_inferred()
+    test_gazetteer_snapping()
+    test_confidence()
+    print("OK")
@@ -0,0 +1,69 @@
+# test/test_instrumentation.py
+from pathlib import Path
+import json
+import sys
+import tempfile
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.address_matching import instrumentation
+from src.address_matching.instrumentation import METRICS, Metrics, span, timed, timed_iter
+from src.address_matching import AddressNormalizer
+
+@timed("test.square", items=lambda xs: len(xs))
+def _squares(xs):
+    return [x * x for x in xs]
+
+def test_disabled_records_nothing():
+    METRICS.reset()
+    instrumentation.disable()
+    assert _squares([1, 2, 3]) == [1, 4, 9]
+    with span("test.block", items=5):
+        pass
+    assert list(timed_iter("test.iter", [[1], [2]])) == [[1], [2]]
+    assert METRICS.stages == {}
+
+def test_stages_and_exports():
+    METRICS.reset()
+    instrumentation.enable()
+    try:
+        for _ in range(10):
+            _squares([1, 2, 3])
+        AddressNormalizer().normalize_static_parser("Kazımdirik Mah. 372 Sk. No:5")
+        list(timed_iter("test.iter", [[1, 2], [3]]))
+        instrumentation.count("test.events", 7)
+    finally:
+        instrumentation.disable()
+    summary = METRICS.summary()
+    sq = summary["stages"]["test.square"]
+    assert (sq["calls"], sq["items"]) == (10, 30)
+    assert 0 <= sq["p50_ms"] <= sq["p99_ms"]
+    assert summary["stages"]["normalize.static"]["calls"] == 1
+    assert summary["stages"]["test.iter"]["items"] == 3
+    assert summary["counters"] == {"test.events": 7}
+
+    prom = METRICS.to_prometheus()
+    assert 'address_matching_stage_duration_seconds_bucket{stage="test.square",le="+Inf"} 10' in prom
+    assert 'address_matching_stage_items_total{stage="test.square"} 30' in prom
+    assert 'address_matching_events_total{name="test.events"} 7' in prom
+
+    out = Path(tempfile.mkdtemp())
+    instrumentation.export(str(out / "m.json"), str(out / "m.prom"))
+    assert json.loads((out / "m.json").read_text())["stages"]["test.square"]["calls"] == 10
+    assert (out / "m.prom").read_text().startswith("# HELP address_matching_stage_duration_seconds")
+    METRICS.reset()
+
+def test_quantiles():
+    m = Metrics(enabled=True)
+    for s in [0.001] * 90 + [0.1] * 10:
+        m.observe("q", s)
+    st = m.stages["q"]
+    assert 0.0005 < st.quantile(0.5) <= 0.0018
+    assert 0.05 < st.quantile(0.99) <= 0.18
+
+if __name__ == "__main__":
+    test_disabled_records_nothing()
+    test_stages_and_exports()
+    test_quantiles()
+    print("OK")
@@ -0,0 +1,56 @@
+# test/test_minhash.py
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from src.address_matching.matching.minhash import MinHashLSH, choose_bands, shingles
+
+# Each tuple: (text, near-duplicate of text)
+tests_near_duplicates = [
+    ("16 Eylül Mahallesi 2001. Sokak No:9/D Çeşme İzmir", "16 eylül mah 2001 sk no 9/d çeşme izmir"),
+    ("Kazımdirik Mah. 372. Sokak No:12 Bornova/İzmir", "KAZIMDİRİK MAH 372 SK NO 12 BORNOVA İZMİR"),
+    ("Atatürk Caddesi No:45 Daire:3 Konak İzmir", "Atatürk Cad. No 45 D:3 Konak/İzmir"),
+]
+
+def test_choose_bands():
+    bands, rows = choose_bands(64, 0.6)
+    assert bands * rows == 64
+    assert (1.0 / bands) ** (1.0 / rows) <= 0.6
+
+def test_near_duplicates_are_paired():
+    texts = [a for a, _ in tests_near_duplicates] + [b for _, b in tests_near_duplicates] + ["", "  "]
+    n = len(tests_near_duplicates)
+    lsh = MinHashLSH(threshold=0.5)
+    left, right, jaccard = lsh.candidate_pairs(texts)
+    pairs = set(zip(left.tolist(), right.tolist()))
+    assert pairs == {(i, i + n) for i in range(n)}, pairs   # no cross pairs, empty texts never paired
+    assert (jaccard >= 0.5).all()
+
+def test_oversize_buckets_are_windowed():
+    # one address repeated past max_bucket_size must still form one cluster
+    from src.address_matching.matching.clustering import cluster_pairs
+
+    texts = [tests_near_duplicates[0][0]] * 30 + [tests_near_duplicates[1][0]]
+    lsh = MinHashLSH(max_bucket_size=5)
+    left, right, _ = lsh.candidate_pairs(texts)
+    assert lsh.stats["oversize_buckets"] > 0
+    labels = cluster_pairs(len(texts), [(left, right)])
+    assert (labels[:30] == labels[0]).all() and labels[30] != labels[0]
+    skip = MinHashLSH(max_bucket_size=5, oversize="skip")
+    assert skip.candidate_pairs(texts)[0].size == 0
+
+def test_signatures_are_stable():
+    lsh = MinHashLSH()
+    sig = lsh.signatures([tests_near_duplicates[0][0]] * 2)
+    assert (sig[0] == sig[1]).all()
+    assert (MinHashLSH().signatures([tests_near_duplicates[0][0]]) == sig[0]).all()
+    assert shingles("") == []
+
+if __name__ == "__main__":
+    test_choose_bands()
+    test_near_duplicates_are_paired()
+    test_oversize_buckets_are_windowed()
+    test_signatures_are_stable()
+    print("OK")
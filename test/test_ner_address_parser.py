@@ -0,0 +1,362 @@
+# test/test_ner_address_parser.py
+from pathlib import Path
+import json
+import subprocess
+import sys
+import tempfile
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+MODEL_DIR = ROOT / "models" / "BERTurk_stage1_out"
+
+tests_texts = [
+    "Caferağa Mah. Moda Cad. No:12 Kadıköy İstanbul",
+    "Kazımdirik Mah. 372 Sk. No:5 Bornova İzmir",
+    "Etlik Mah. Keçiören Ankara",
+    "16 eylül mahallesi inkilap caddesi 2001 sokak no 9/d Çeşme/İzmir",
+    "Barbaros Bulvarı No:12",
+]
+
+_TINY: dict = {}
+
+def tiny_model_dir() -> str:
+    """BERTurk tokenizer + label set on a 2-layer randomly initialised model, saved once per session."""
+    if "dir" not in _TINY:
+        import torch
+        from transformers import AutoConfig, AutoModelForTokenClassification, AutoTokenizer
+
+        config = AutoConfig.from_pretrained(str(MODEL_DIR), hidden_size=32, num_hidden_layers=2,
+                                            num_attention_heads=2, intermediate_size=64, initializer_range=0.2)
+        torch.manual_seed(0)
+        model = AutoModelForTokenClassification.from_config(config)
+        out = tempfile.mkdtemp(prefix="tiny_ner_")
+        model.save_pretrained(out)
+        AutoTokenizer.from_pretrained(str(MODEL_DIR)).save_pretrained(out)
+        _TINY["dir"] = out
+    return _TINY["dir"]
+
+def _write_csv(path: Path, texts) -> Path:
+    path.write_text("".join(f'"{t}"\n' for t in texts), encoding="utf-8")
+    return path
+
+def run_cli(*args: str, ok: bool = True) -> subprocess.CompletedProcess:
+    cmd = [sys.executable, "-m", "src.address_matching.parsing.ner_address_parser", "--model-dir", tiny_model_dir()]
+    res = subprocess.run(cmd + list(args), cwd=ROOT, capture_output=True, text=True)
+    assert (res.returncode == 0) == ok, res.stderr[-2000:]
+    return res
+
+def test_cli_twice_with_cache():
+    # second run: every chunk is a full cache hit, so the model gets empty lists
+    tmp = Path(tempfile.mkdtemp())
+    src = _write_csv(tmp / "in.csv", tests_texts)
+    common = ["--csv", str(src), "--cache", str(tmp / "preds.sqlite"), "--backend", "direct",
+              "--max-batch-tokens", "64", "--chunk-size", "2"]
+    run_cli(*common, "--out", str(tmp / "first.csv"))
+    run_cli(*common, "--out", str(tmp / "second.csv"))
+    assert (tmp / "first.csv").read_text(encoding="utf-8") == (tmp / "second.csv").read_text(encoding="utf-8")
+
+def test_int8_cache_round_trip():
+    import shutil
+    from src.address_matching.parsing import ner_address_parser as ner
+
+    tmp = Path(tempfile.mkdtemp())
+    model_dir = shutil.copytree(tiny_model_dir(), tmp / "tiny")  # the cache is a sibling: tmp/tiny.int8.pt
+    cache = Path(ner.quantized_cache_path(str(model_dir)))
+    assert cache == tmp / "tiny.int8.pt"
+
+    fp32 = ner.predict_texts(ner.load_ner(str(model_dir), device=-1, backend="direct"), tests_texts, 2, None)
+    first = ner.predict_texts(ner.load_ner(str(model_dir), device=-1, quantize="int8", backend="direct"),
+                              tests_texts, 2, None)
+    written = cache.stat().st_mtime_ns
+    model = ner.load_quantized_model(str(model_dir))  # cache hit: rebuilt from config, nothing rewritten
+    assert cache.stat().st_mtime_ns == written
+    assert type(model.classifier).__module__.startswith("torch.ao.nn.quantized")
+    reloaded = ner.predict_texts(ner.load_ner(str(model_dir), device=-1, quantize="int8", backend="direct"),
+                                 tests_texts, 2, None)
+    assert reloaded == first
+    # same shape and label set; a random tiny model has near-tied logits, so allow a few flips
+    labels = set(model.config.label2id) | {"O"}
+    same = total = 0
+    for a, b in zip(fp32, first):
+        tags_a, tags_b = a["pred_tags"].split(), b["pred_tags"].split()
+        assert a["tokens"] == b["tokens"] and len(tags_a) == len(tags_b) == len(a["tokens"])
+        assert set(tags_b) <= labels
+        same += sum(x == y for x, y in zip(tags_a, tags_b))
+        total += len(tags_a)
+    assert same >= 0.8 * total, (same, total)
+
+    conll = tmp / "gold.conll"
+    conll.write_text("".join(f"# {t}\n" + "".join(f"{w}\tO\n" for w in t.split()) + "\n" for t in tests_texts),
+                     encoding="utf-8")
+    report = ner.quantization_report(str(model_dir), str(conll), None, batch_size=2, backend="direct")
+    assert set(report) >= {"fp32", "int8", "f1_delta", "speedup"} and report["f1_delta"] == 0.0
+
+    src = _write_csv(tmp / "in.csv", tests_texts)
+    run_cli("--model-dir", str(model_dir), "--csv", str(src), "--out", str(tmp / "int8.csv"),
+            "--backend", "direct", "--quantize", "int8")
+    assert len((tmp / "int8.csv").read_text(encoding="utf-8").splitlines()) == len(tests_texts) + 1
+
+def test_resume_matches_single_run():
+    import csv
+    import io
+    from src.address_matching.parsing.ner_address_parser import (GAZETTEER_COLUMNS, PRED_COLUMNS, checkpoint_path,
+                                                                  read_checkpoint, write_checkpoint)
+
+    tmp = Path(tempfile.mkdtemp())
+    texts = ["Moda Cad.\nNo:12 Kadıköy"] + tests_texts  # a quoted newline inside the skipped chunk
+    src = _write_csv(tmp / "in.csv", texts)
+    common = ["--csv", str(src), "--backend", "direct", "--chunk-size", "2"]
+    run_cli(*common, "--out", str(tmp / "full.csv"))
+    full = (tmp / "full.csv").read_bytes()
+
+    # interrupted after the first chunk, with half of the next row torn off mid-write
+    rows = list(csv.reader(io.StringIO(full.decode("utf-8"), newline="")))
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows[:3])  # header + chunk 1
+    done = buf.getvalue().encode("utf-8")
+    assert full.startswith(done)
+    out = tmp / "resumed.csv"
+    out.write_bytes(done + full[len(done):len(done) + 20])
+    state = read_checkpoint(checkpoint_path(str(tmp / "full.csv")))
+    assert state["complete"] and state["out_bytes"] == len(full)
+    state.update(chunks_done=1, rows_done=2, out_bytes=len(done), complete=False)
+    write_checkpoint(checkpoint_path(str(out)), state)
+    run_cli(*common, "--out", str(out), "--resume")
+    assert out.read_bytes() == full
+    assert read_checkpoint(checkpoint_path(str(out)))["out_columns"] == list(PRED_COLUMNS)
+
+    # a run started with --gazetteer cannot be resumed without it (its columns would go blank)
+    gazetteer_columns = list(PRED_COLUMNS) + list(GAZETTEER_COLUMNS)
+    for fields in ({"out_columns": gazetteer_columns},
+                   {"out_columns": None, "fieldnames": state["fieldnames"] + list(GAZETTEER_COLUMNS)}):
+        write_checkpoint(checkpoint_path(str(out)), dict(state, **fields))
+        res = run_cli(*common, "--out", str(out), "--resume", ok=False)
+        assert "rerun with the same --gazetteer setting" in res.stderr
+
+def test_parquet_round_trip():
+    import pytest
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    from src.address_matching.parsing.ner_address_parser import PRED_COLUMNS
+
+    tmp = Path(tempfile.mkdtemp())
+    ids = [f"r{i}" for i in range(len(tests_texts))]
+    pq.write_table(pa.table({"id": ids, "address": tests_texts}), tmp / "in.parquet")
+    run_cli("--csv", str(tmp / "in.parquet"), "--text-col", "address", "--out", str(tmp / "out.parquet"),
+            "--backend", "direct", "--chunk-size", "2")
+    _write_csv(tmp / "in.csv", tests_texts)
+    run_cli("--csv", str(tmp / "in.csv"), "--out", str(tmp / "out.csv"), "--backend", "direct", "--chunk-size", "2")
+
+    pf = pq.ParquetFile(tmp / "out.parquet")
+    assert pf.metadata.num_row_groups == 3  # one per chunk of 2
+    table = pf.read()
+    assert table.column_names == ["id", "address"] + list(PRED_COLUMNS)
+    assert table.column("id").to_pylist() == ids and table.column("address").to_pylist() == tests_texts
+    import pandas as pd
+    from_csv = pd.read_csv(tmp / "out.csv", dtype=str, keep_default_na=False)
+    for col in PRED_COLUMNS:
+        assert table.column(col).to_pylist() == from_csv[col].tolist(), col
+
+def test_worker_pool_matches_single_process():
+    tmp = Path(tempfile.mkdtemp())
+    texts = tests_texts * 3  # 15 rows, 8 chunks spread over both workers
+    src = _write_csv(tmp / "in.csv", [f"{t} {i}" for i, t in enumerate(texts)])
+    common = ["--csv", str(src), "--backend", "direct", "--chunk-size", "2"]
+    run_cli(*common, "--out", str(tmp / "single.csv"))
+    run_cli(*common, "--out", str(tmp / "pool.csv"), "--workers", "2", "--threads-per-worker", "1")
+    single = (tmp / "single.csv").read_text(encoding="utf-8")
+    assert (tmp / "pool.csv").read_text(encoding="utf-8") == single
+    assert single.count("\n") == len(texts) + 1
+
+def test_mmap_safetensors_matches_load_file():
+    import torch
+    from safetensors.torch import load_file, save_file
+    from src.address_matching.parsing.ner_shared import mmap_safetensors
+
+    path = Path(tempfile.mkdtemp()) / "w.safetensors"
+    tensors = {"f32": torch.randn(3, 4), "f16": torch.randn(5).half(), "bf16": torch.randn(2, 2).bfloat16(),
+               "i64": torch.arange(6).view(2, 3), "empty": torch.zeros(0, 4), "flag": torch.tensor([True, False])}
+    save_file(tensors, str(path))
+    mapped, loaded = mmap_safetensors(str(path)), load_file(str(path))
+    assert set(mapped) == set(loaded)
+    for name, t in loaded.items():
+        assert mapped[name].dtype == t.dtype and mapped[name].shape == t.shape and torch.equal(mapped[name], t), name
+
+def test_shared_weights_predict_like_a_normal_load():
+    import os
+    from transformers import AutoModelForTokenClassification, AutoTokenizer
+    from src.address_matching.parsing import ner_address_parser as ner
+    from src.address_matching.parsing.ner_shared import prepare_shared_weights
+
+    want = ner.predict_texts(ner.load_ner(tiny_model_dir(), device=-1, backend="direct"), tests_texts, 2, None)
+    files = prepare_shared_weights(tiny_model_dir())
+    assert files == [os.path.join(tiny_model_dir(), "model.safetensors")]  # mapped in place
+    shared = ner.load_ner(tiny_model_dir(), device=-1, backend="direct", shared_weights=files)
+    assert ner.predict_texts(shared, tests_texts, 2, None) == want
+
+    # a pytorch_model.bin-only checkpoint is exported once to SHARED_DIR
+    bin_dir = tempfile.mkdtemp(prefix="tiny_ner_bin_")
+    AutoModelForTokenClassification.from_pretrained(tiny_model_dir()).save_pretrained(bin_dir, safe_serialization=False)
+    AutoTokenizer.from_pretrained(tiny_model_dir()).save_pretrained(bin_dir)
+    [exported] = prepare_shared_weights(bin_dir)
+    try:
+        assert exported.endswith(".safetensors") and prepare_shared_weights(bin_dir) == [exported]
+        shared = ner.load_ner(bin_dir, device=-1, backend="direct", shared_weights=[exported])
+        assert ner.predict_texts(shared, tests_texts, 2, None) == want
+    finally:
+        os.remove(exported)
+
+def _entities(pred):
+    return [(e["type"], e["text"], e["start"], e["end"]) for e in json.loads(pred["entities_json"])]
+
+def test_direct_runner_matches_pipeline():
+    from src.address_matching.parsing import ner_address_parser as ner
+
+    direct = ner.load_ner(tiny_model_dir(), device=-1, backend="direct")
+    pipe = ner.load_ner(tiny_model_dir(), device=-1, backend="pipeline")
+    for batch_size in (1, 3):
+        got = ner.predict_texts(direct, tests_texts, batch_size, None)
+        want = ner.predict_texts(pipe, tests_texts, batch_size, None)
+        for text, g, w in zip(tests_texts, got, want):
+            assert _entities(g) == _entities(w), (batch_size, text)
+            assert g["pred_tags"] == w["pred_tags"] and g["entities_flat"] == w["entities_flat"]
+            scores = [(a["score"], b["score"]) for a, b in zip(json.loads(g["entities_json"]),
+                                                              json.loads(w["entities_json"]))]
+            assert all(abs(a - b) < 1e-5 for a, b in scores)
+    assert any(len(_entities(p)) > 1 for p in got)
+
+# Each tuple: (token lengths, max_tokens, max_rows)
+tests_budgets = [
+    ([5, 3, 9, 4, 4, 7, 2, 8], 16, None),
+    ([5, 3, 9, 4, 4, 7, 2, 8], 64, 3),
+    ([10, 40, 12], 32, None),          # 40 alone is over the budget
+    ([1] * 20, 8, None),
+]
+
+def test_plan_length_batches():
+    from src.address_matching.parsing.ner_address_parser import plan_length_batches
+
+    for lengths, max_tokens, max_rows in tests_budgets:
+        batches = plan_length_batches(lengths, max_tokens, max_rows)
+        assert sorted(i for b in batches for i in b) == list(range(len(lengths)))
+        for b in batches:
+            padded = len(b) * max(lengths[i] for i in b)
+            assert padded <= max_tokens or len(b) == 1, (lengths, b)
+            assert max_rows is None or len(b) <= max_rows
+    assert [2] in plan_length_batches([10, 12, 40], 32)  # over-budget text still goes through, alone
+    assert plan_length_batches([], 16) == []
+
+def test_token_budget_keeps_input_order():
+    from src.address_matching.parsing import ner_address_parser as ner
+
+    pipe = ner.load_ner(tiny_model_dir(), device=-1, backend="direct")
+    texts = tests_texts + [tests_texts[3] * 3, "Etlik"]
+    fixed = ner.predict_texts(pipe, texts, 4, None)
+    for budget in (8, 48, 4096):
+        bucketed = ner.predict_texts(pipe, texts, 4, None, max_batch_tokens=budget)
+        assert [p["text"] for p in bucketed] == texts
+        assert [_entities(p) for p in bucketed] == [_entities(p) for p in fixed], budget
+    windowed = ner.predict_texts(pipe, texts, 4, 16, stride=4)
+    windowed_bucketed = ner.predict_texts(pipe, texts, 4, 16, max_batch_tokens=48, stride=4)
+    assert [_entities(p) for p in windowed_bucketed] == [_entities(p) for p in windowed]
+
+    # the chunk is tokenized once: the lengths and every batch share the encodings
+    expected = ner.predict_texts(pipe, texts, 4, None, max_batch_tokens=48)
+    calls = []
+    tokenizer = pipe.tokenizer
+
+    class CountingTokenizer:
+        def __call__(self, *args, **kwargs):
+            calls.append(len(args[0]))
+            return tokenizer(*args, **kwargs)
+
+        def __getattr__(self, name):
+            return getattr(tokenizer, name)
+
+    pipe.tokenizer = CountingTokenizer()
+    try:
+        assert ner.predict_texts(pipe, texts, 4, None, max_batch_tokens=48) == expected
+    finally:
+        pipe.tokenizer = tokenizer
+    assert calls == [len(texts)]
+
+def test_stitch_windows():
+    import numpy as np
+    from src.address_matching.parsing.ner_address_parser import DirectNerRunner
+
+    # two windows overlapping on the tokens at offsets 4 and 8; the higher score wins each
+    labels = [np.array([1, 2, 3]), np.array([5, 6, 7])]
+    scores = [np.array([0.9, 0.2, 0.8]), np.array([0.5, 0.1, 0.7])]
+    offsets = [np.array([[0, 3], [4, 7], [8, 11]]), np.array([[4, 7], [8, 11], [12, 15]])]
+    lab, sc, off = DirectNerRunner._stitch_windows(labels, scores, offsets)
+    assert lab.tolist() == [1, 5, 3, 7] and sc.tolist() == [0.9, 0.5, 0.8, 0.7]
+    assert off[:, 0].tolist() == [0, 4, 8, 12]
+
+def test_stride_entity_crosses_windows():
+    import torch
+    from transformers import AutoModelForTokenClassification, AutoTokenizer
+    from src.address_matching.parsing import ner_address_parser as ner
+
+    # every token labelled I-SOKAK: one entity that must run across all window boundaries
+    model = AutoModelForTokenClassification.from_pretrained(tiny_model_dir())
+    with torch.no_grad():
+        model.classifier.weight.zero_()
+        model.classifier.bias.fill_(0.0)
+        model.classifier.bias[model.config.label2id["I-SOKAK"]] = 10.0
+    runner = ner.DirectNerRunner(model, AutoTokenizer.from_pretrained(tiny_model_dir()), device=-1)
+    text = " ".join(tests_texts)
+    n_windows = len(runner.tokenizer(text, max_length=16, truncation=True, stride=4,
+                                     return_overflowing_tokens=True)["input_ids"])
+    assert n_windows > 2
+    [pred] = ner.predict_texts(runner, [text], 1, 16, stride=4)
+    assert _entities(pred) == [("SOKAK", text, 0, len(text))]
+    [truncated] = ner.predict_texts(runner, [text], 1, 16)
+    assert _entities(truncated)[0][3] < len(text)  # without stride the tail is cut off
+
+def test_pipeline_backend_max_length_and_stride():
+    from src.address_matching.parsing import ner_address_parser as ner
+
+    direct = ner.load_ner(tiny_model_dir(), device=-1, backend="direct")
+    pipe = ner.load_ner(tiny_model_dir(), device=-1, backend="pipeline")
+    text = " ".join(tests_texts)
+    for max_length in (8, 16):
+        got = ner.predict_texts(pipe, tests_texts + [text], 2, max_length)
+        want = ner.predict_texts(direct, tests_texts + [text], 2, max_length)
+        assert [_entities(p) for p in got] == [_entities(p) for p in want], max_length
+    assert max(e[3] for e in _entities(got[-1])) < len(text) // 2  # truncated, not the full text
+    assert pipe.tokenizer.model_max_length == 512
+    try:
+        ner.predict_texts(pipe, [text], 1, 16, stride=4)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("stride accepted by the pipeline backend")
+    res = subprocess.run([sys.executable, "-m", "src.address_matching.parsing.ner_address_parser",
+                          "--model-dir", tiny_model_dir(), "--csv", "in.csv", "--out", "out.csv",
+                          "--stride", "4"], cwd=ROOT, capture_output=True, text=True)
+    assert res.returncode != 0 and "--stride needs --backend direct" in res.stderr
+
+def test_empty_input():
+    from src.address_matching.parsing import ner_address_parser as ner
+
+    pipe = ner.load_ner(tiny_model_dir(), device=-1, backend="direct")
+    assert ner.predict_texts(pipe, [], 8, None, max_batch_tokens=64) == []
+    assert ner.token_lengths(pipe.tokenizer, [], None) == []
+
+if __name__ == "__main__":
+    test_cli_twice_with_cache()
+    test_int8_cache_round_trip()
+    test_resume_matches_single_run()
+    test_parquet_round_trip()
+    test_worker_pool_matches_single_process()
+    test_mmap_safetensors_matches_load_file()
+    test_shared_weights_predict_like_a_normal_load()
+    test_direct_runner_matches_pipeline()
+    test_plan_length_batches()
+    test_token_budget_keeps_input_order()
+    test_stitch_windows()
+    test_stride_entity_crosses_windows()
+    test_pipeline_backend_max_length_and_stride()
+    test_empty_input()
+    print("OK")
@@ -0,0 +1,73 @@
+# test/test_numbers.py
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from src.address_matching.normalization.numbers import (
+    MISSING_KEY, canonical_number, format_number, number_key, number_keys, number_part,
+)
+
+# Each tuple: (entity text, tag, expected canonical form)
+tests_canonical = [
+    ("no:9b", "BINA_NO", "9b"),
+    ("9/B", "BINA_NO", "9b"),
+    ("No 9 B", "BINA_NO", "9b"),
+    ("NO42", "BINA_NO", "42"),
+    ("no : : 117", "BINA_NO", "117"),
+    ("No:12/3", "BINA_NO", "12"),        # building / flat: the flat belongs to DAIRE_NO
+    ("C-28", "BINA_NO", "28c"),
+    ("Dış Kapı No : 8B", "BINA_NO", "8b"),
+    ("No :", "BINA_NO", None),
+    ("d:5", "DAIRE_NO", "5"),
+    ("daire 5", "DAIRE_NO", "5"),
+    ("DAİRE : 3", "DAIRE_NO", "3"),
+    ("daire a14", "DAIRE_NO", "14a"),
+    ("B1 / 8", "DAIRE_NO", "8"),
+    ("/ A", "DAIRE_NO", "0a"),
+    ("daire bir", "DAIRE_NO", "1"),
+    ("kat : 4", "KAT", "4"),
+    ("k2", "KAT", "2"),
+    ("Zemin kat", "KAT", "0"),
+    ("bodrum kat", "KAT", "-1"),
+    ("Kat :", "KAT", None),
+    ("1004. Sokak", "SOKAK", "1004"),
+    ("6518 / 6 sk.", "SOKAK", "6518/6"),
+    ("16 nci sokak", "SOKAK", "16"),
+    ("Açelya Sokak", "SOKAK", None),
+]
+
+def test_canonical_number():
+    for text, tag, expected in tests_canonical:
+        assert format_number(canonical_number(text, tag)) == expected, (text, tag)
+
+def test_packed_keys():
+    keys = number_keys(["no:9b", "9/B", "No 9 B", "no 9", None], "BINA_NO")
+    assert keys[0] == keys[1] == keys[2] != keys[3]
+    assert keys[4] == MISSING_KEY
+    assert (number_part(keys[:4]) == 9).all()
+    assert number_key("6518/6 sk", "SOKAK") != number_key("6518/7 sk", "SOKAK")
+    assert number_key("kat -1", "KAT") != MISSING_KEY and number_part(number_key("kat -1", "KAT")) == -1
+
+def test_basement_is_not_missing():
+    basement = number_key("bodrum kat", "KAT")
+    assert basement != MISSING_KEY and number_part(basement) == -1
+    assert number_part(basement) != number_part(MISSING_KEY)
+    keys = number_keys(["bodrum kat", None, "kat 0"], "KAT")
+    assert keys.dtype == "int64" and keys[1] == MISSING_KEY
+    assert len(set(number_part(keys).tolist())) == 3
+
+def test_unknown_tag():
+    try:
+        canonical_number("no 9", "POSTA_KODU")
+    except ValueError:
+        return
+    raise AssertionError("expected ValueError")
+
+if __name__ == "__main__":
+    test_canonical_number()
+    test_packed_keys()
+    test_basement_is_not_missing()
+    test_unknown_tag()
+    print("OK")
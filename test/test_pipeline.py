@@ -0,0 +1,87 @@
+# test/test_pipeline.py
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from src.address_matching.pipeline import AddressPipeline, PipelineConfig, parallel_map, read_batches
+from src.address_matching.pipeline import run_files, run_files_async
+from src.address_matching.pipeline.async_runtime import produce, results, stage
+
+# Each tuple: (input, expected group); rows of one group should share a cluster
+tests_rows = [
+    ("Caferağa Mah. Moda Cad. No:12 Kadıköy İstanbul", "a"),
+    ("caferaga mh moda cd no 12 kadikoy istanbul", "a"),
+    ("Kazımdirik Mah. 372 Sk. No:5 Bornova İzmir", "b"),
+    ("kazimdirik mahallesi 372 sokak no 5 bornova izmir", "b"),
+    ("Etlik Mah. Keçiören Ankara", "c"),
+]
+
+def test_parallel_map_order():
+    items = list(range(50))
+    for workers in (1, 4):
+        assert list(parallel_map(lambda x: x * x, items, workers=workers, max_pending=1)) == [x * x for x in items]
+
+def _input_csv(tmp_path=None) -> Path:
+    import tempfile
+    path = Path(tmp_path or tempfile.mkdtemp()) / "in.csv"
+    path.write_text("\n".join(t for t, _ in tests_rows) + "\n", encoding="utf-8")
+    return path
+
+def test_static_pipeline(tmp_path=None):
+    path = _input_csv(tmp_path)
+    pipeline = AddressPipeline(PipelineConfig(batch_size=2, parse_workers=2))
+    labels = pipeline.run(read_batches(str(path), batch_size=2))
+    assert labels.shape == (len(tests_rows),) and pipeline.stats["rows"] == len(tests_rows)
+    for (_, g1), l1 in zip(tests_rows, labels):
+        for (_, g2), l2 in zip(tests_rows, labels):
+            assert (l1 == l2) == (g1 == g2), labels
+    assert pipeline.stats["merged_pairs"] >= 2
+
+def test_async_runtime_matches_sync(tmp_path=None):
+    path = _input_csv(tmp_path)
+    config = PipelineConfig(batch_size=2, parse_workers=2, max_pending=1)
+    out = {}
+    for runtime in ("sync", "async"):
+        target, parsed = path.with_name(f"out_{runtime}.csv"), path.with_name(f"parsed_{runtime}.csv")
+        if runtime == "sync":
+            labels = run_files(AddressPipeline(config), str(path), str(target), str(parsed))
+        else:
+            labels = asyncio.run(run_files_async(AddressPipeline(config), str(path), str(target), str(parsed)))
+        out[runtime] = (labels.tolist(), target.read_text(encoding="utf-8"), parsed.read_text(encoding="utf-8"))
+    assert out["sync"] == out["async"]
+    assert out["async"][1].count("\n") == len(tests_rows) + 1
+
+def test_async_stage_errors_reach_consumer():
+    def fail_on_three(x):
+        if x == 3:
+            raise ValueError("bad batch")
+        return x
+
+    async def run():
+        q_in, q_out = asyncio.Queue(2), asyncio.Queue(2)
+        with ThreadPoolExecutor(2) as pool:
+            tasks = [asyncio.create_task(produce(range(10), q_in)),
+                     asyncio.create_task(stage(fail_on_three, pool, q_in, q_out))]
+            seen = []
+            try:
+                async for x in results(q_out):
+                    seen.append(x)
+            except ValueError:
+                for t in tasks:
+                    t.cancel()
+                return seen
+        raise AssertionError("error was swallowed")
+
+    assert asyncio.run(run()) == [0, 1, 2]
+
+if __name__ == "__main__":
+    test_parallel_map_order()
+    test_static_pipeline()
+    test_async_runtime_matches_sync()
+    test_async_stage_errors_reach_consumer()
+    print("OK")
@@ -0,0 +1,32 @@
+# test/test_prediction_cache.py
+from pathlib import Path
+import sys
+import tempfile
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from src.address_matching.parsing.prediction_cache import PredictionCache, split_cached, merge_cached
+
+def _pred(text):
+    return {"pred_tags": "O " * len(text.split()), "entities_json": "[]", "entities_flat": text.upper()}
+
+def test_roundtrip_and_hit_rate():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "preds.sqlite")
+        cache = PredictionCache(path, "model-a")
+        texts = ["Etlik mh", "Caferağa Mah", "Etlik mh"]
+        hits, misses = split_cached(cache, texts)
+        assert hits == {} and misses == ["Etlik mh", "Caferağa Mah"]   # duplicates run once
+        preds = merge_cached(cache, texts, hits, misses, [_pred(t) for t in misses])
+        assert [p["entities_flat"] for p in preds] == ["ETLIK MH", "CAFERAĞA MAH", "ETLIK MH"]
+        cache.close()
+
+        cache = PredictionCache(path, "model-a")                       # persisted across runs
+        hits, misses = split_cached(cache, texts + ["Bornova"])
+        assert misses == ["Bornova"] and cache.hit_rate == 0.75
+        assert split_cached(PredictionCache(path, "model-b"), texts)[1] == ["Etlik mh", "Caferağa Mah"]  # other model
+
+if __name__ == "__main__":
+    test_roundtrip_and_hit_rate()
+    print("OK")
@@ -0,0 +1,45 @@
+# test/test_profiling.py
+from pathlib import Path
+import argparse
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.address_matching.profiling import Profiler, add_profile_arguments, profile_from_args
+
+def _busy_worker(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(i * i for i in range(1000))
+
+def test_profiler_files():
+    prefix = Path(tempfile.mkdtemp()) / "out.csv.profile"
+    with Profiler(str(prefix), interval=0.002):
+        t = threading.Thread(target=_busy_worker, args=(0.15,), name="busy")
+        t.start()
+        _busy_worker(0.1)
+        t.join()
+    for suffix in (".prof", ".collapsed", ".txt"):
+        assert Path(f"{prefix}{suffix}").stat().st_size > 0, suffix
+    lines = Path(f"{prefix}.collapsed").read_text(encoding="utf-8").splitlines()
+    stacks = {}
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        stacks[stack] = int(count)
+    assert any(s.startswith("thread:busy;") and "_busy_worker" in s for s in stacks)
+    assert any(s.startswith("thread:MainThread;") and "_busy_worker" in s for s in stacks)
+    assert "cProfile" in Path(f"{prefix}.txt").read_text(encoding="utf-8")
+
+def test_cli_flag_off_by_default():
+    ap = argparse.ArgumentParser()
+    add_profile_arguments(ap)
+    assert profile_from_args(ap.parse_args([]), "out.csv") is None
+
+if __name__ == "__main__":
+    test_profiler_files()
+    test_cli_flag_off_by_default()
+    print("OK")
@@ -0,0 +1,65 @@
+# test/test_similarity.py
+from pathlib import Path
+import sys
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from src.address_matching.normalization import AddressNormalizer
+from src.address_matching.scoring.similarity import (
+    encode, jaro_winkler, levenshtein_codes, levenshtein_similarity, token_set_ratio,
+)
+
+# Each tuple: (left, right, levenshtein distance, jaro-winkler)
+tests_pairs = [
+    ("MARTHA", "MARHTA", 2, 0.9611111),
+    ("DIXON", "DICKSONX", 4, 0.8133333),
+    ("Kazımdirik", "KAZIMDİRİK", 0, 1.0),          # Turkish folding: ı/I/İ/i all compare equal
+    ("Şişli", "sisli", 0, 1.0),
+    ("Gaziosmanpaşa", "Gaziosmanpasa Mah", 4, 0.9529412),
+    ("", "", 0, 1.0),
+    ("", "abc", 3, 0.0),
+    ("abc", "xyz", 3, 0.0),
+]
+
+# Each tuple: (left, right, expected token-set ratio)
+tests_token_set = [
+    ("Atatürk Cad Kazımdirik", "kazimdirik ATATURK cad", 1.0),
+    ("16 eylül mah", "16 eylul mah 2001 sk", 1.0),   # subset
+    ("a b", "b c", 2 / 3),
+    ("", "", 0.0),
+]
+
+def test_fold():
+    assert AddressNormalizer.fold("Şişli ÇARŞI Ağaçlı Gül") == "sisli carsi agacli gul"
+
+def test_levenshtein_and_jaro_winkler():
+    left = [t[0] for t in tests_pairs]
+    right = [t[1] for t in tests_pairs]
+    a, b = encode(left), encode(right)
+    assert levenshtein_codes(*a, *b).tolist() == [t[2] for t in tests_pairs]
+    assert np.allclose(jaro_winkler(left, right), [t[3] for t in tests_pairs], atol=1e-6)
+
+def test_early_exit_thresholds():
+    left = [t[0] for t in tests_pairs]
+    right = [t[1] for t in tests_pairs]
+    capped = levenshtein_codes(*encode(left), *encode(right), max_dist=1)
+    assert capped.tolist() == [min(t[2], 2) for t in tests_pairs]
+    full = levenshtein_similarity(left, right)
+    cut = levenshtein_similarity(left, right, min_similarity=0.8)
+    assert np.allclose(cut, np.where(full >= 0.8, full, 0.0))
+    jw = jaro_winkler(left, right, min_similarity=0.95)
+    assert np.allclose(jw, np.where(jaro_winkler(left, right) >= 0.95, jaro_winkler(left, right), 0.0))
+
+def test_token_set_ratio():
+    got = token_set_ratio([t[0] for t in tests_token_set], [t[1] for t in tests_token_set])
+    assert np.allclose(got, [t[2] for t in tests_token_set], atol=1e-6)
+
+if __name__ == "__main__":
+    test_fold()
+    test_levenshtein_and_jaro_winkler()
+    test_early_exit_thresholds()
+    test_token_set_ratio()
+    print("OK")
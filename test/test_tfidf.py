@@ -0,0 +1,69 @@
+# test/test_tfidf.py
+from pathlib import Path
+import sys
+import tempfile
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from src.address_matching.matching.tfidf import TfidfIndex
+
+reference = [
+    "16 Eylül Mahallesi 2001. Sokak No:9 Çeşme İzmir",
+    "Kazımdirik Mahallesi 372. Sokak No:12 Bornova İzmir",
+    "Atatürk Caddesi No:45 Konak İzmir",
+    "Cumhuriyet Bulvarı No:7 Alsancak Konak İzmir",
+]
+
+# Each tuple: (query, expected best reference row)
+tests_queries = [
+    ("16 eylul mah 2001 sk no 9 cesme", 0),
+    ("KAZIMDİRİK MAH. 372 SK. NO 12 BORNOVA", 1),
+    ("ataturk cad 45 konak", 2),
+    ("cumhuriyet blv 7 alsancak", 3),
+]
+
+def test_top1():
+    index = TfidfIndex.build(reference)
+    q, ref, score = index.query([t for t, _ in tests_queries], k=2)
+    first = np.searchsorted(q, np.arange(len(tests_queries)))
+    assert ref[first].tolist() == [r for _, r in tests_queries]
+    assert (score <= 1.0 + 1e-6).all()
+
+def test_exact_duplicate_scores_one():
+    index = TfidfIndex.build(reference)
+    q, ref, score = index.query(reference, k=1, max_query_terms=None)
+    assert ref.tolist() == [0, 1, 2, 3]
+    assert np.allclose(score, 1.0, atol=1e-5)
+
+def test_save_load_and_small_chunks():
+    index = TfidfIndex.build(reference)
+    queries = [t for t, _ in tests_queries]
+    expected = index.query(queries, k=3)
+    with tempfile.TemporaryDirectory() as d:
+        index.save(d)
+        loaded = TfidfIndex.load(d)
+        got = loaded.query(queries, k=3, max_postings=1)  # one query per chunk
+    for e, g in zip(expected, got):
+        assert np.array_equal(e, g)
+
+def test_max_df_needs_enough_rows():
+    index = TfidfIndex.build(reference)  # default max_df: too few rows to prune
+    assert index.max_df == 1.0 and index.indices.size > 0
+    q, ref, _ = index.query([t for t, _ in tests_queries], k=1)
+    assert q.tolist() == [0, 1, 2, 3]
+
+    pruned = TfidfIndex.build(reference, max_df=0.5, max_df_min_rows=len(reference))
+    assert pruned.max_df == 0.5 and 0 < pruned.indices.size < index.indices.size
+    lengths = np.diff(pruned.indptr)
+    assert lengths.max() <= 2  # "izmir" n-grams (in all 4) are gone
+    assert np.array_equal(pruned.idf, index.idf)
+
+if __name__ == "__main__":
+    test_top1()
+    test_exact_duplicate_scores_one()
+    test_save_load_and_small_chunks()
+    test_max_df_needs_enough_rows()
+    print("OK")
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+distill_student.py
+------------------
+Knowledge distillation of the BERTurk NER model into a 2-4 layer student.
+
+Teacher: the stage-1 model (models/BERTurk_stage1_out, see BERTurk_BIO_finetune_8.ipynb).
+Student: same config/tokenizer/labels with `--layers` encoder layers, initialised from evenly
+spaced teacher layers (first and last always kept) plus the teacher's embeddings and classifier.
+Loss per batch:
+    alpha * T^2 * KL(student/T || teacher/T)   over every real subword (what the pipeline decodes)
+  + (1 - alpha) * cross-entropy                 on first-subword gold labels (as in the notebook)
+
+Data: synth CoNLL from data/synth/generate_A2E_BIO_synth.py / generate_F2J_BIO_synth.py plus the
+goldset; `--gold-dev-size` gold sentences are held out for the report and never trained on.
+
+The student is exported with save_pretrained (model + tokenizer), so it loads anywhere
+load_pipeline / load_ner does. A latency/F1 report for teacher vs student is printed and saved
+as <out>/distill_report.json.
+
+Example:
+python data/synth/generate_A2E_BIO_synth.py -n 75000
+python data/synth/generate_F2J_BIO_synth.py -n 75000
+python training_notebooks/distill_student.py \
+  --teacher models/BERTurk_stage1_out \
+  --out models/BERTurk_student_L3 \
+  --layers 3 --epochs 3
+"""
+
+from __future__ import annotations
+import argparse
+import copy
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from transformers import (AutoModelForTokenClassification, AutoTokenizer,
+                          DataCollatorForTokenClassification, get_linear_schedule_with_warmup)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.address_matching.parsing import ner_address_parser as ner
+from src.address_matching.parsing.conll import ConllSentence, read_conll
+
+DEFAULT_SYNTH = [
+    PROJECT_ROOT / "data" / "synth_group_A2E.conll",                 # generate_A2E_BIO_synth.py default
+    PROJECT_ROOT / "data" / "synth_data" / "synth_group_F2J.conll",  # generate_F2J_BIO_synth.py default (from the root)
+]
+
+_LAYER_RE = re.compile(r"\.layer\.(\d+)\.")
+
+
+# ---------- data ----------
+
+def train_val_split(samples: List[Any], val_size: int, seed: int = 42) -> Tuple[List[Any], List[Any]]:
+    """Same deterministic split as the notebook's train_val_split."""
+    rnd = random.Random(seed)
+    idx = list(range(len(samples)))
+    rnd.shuffle(idx)
+    val_idx = set(idx[:val_size])
+    train, val = [], []
+    for i, s in enumerate(samples):
+        (val if i in val_idx else train).append(s)
+    return train, val
+
+def encode(tokenizer, sents: List[ConllSentence], label2id: Dict[str, int], max_length: int) -> List[Dict[str, Any]]:
+    """Whole-word tokenization; the first subword of each word carries its label, the rest -100."""
+    features = []
+    for s in sents:
+        enc = tokenizer(s.tokens, is_split_into_words=True, truncation=True, max_length=max_length)
+        labels, prev = [], None
+        for w in enc.word_ids():
+            if w is None or w == prev:
+                labels.append(-100)
+            else:
+                labels.append(label2id.get(s.tags[w], -100))  # tags the teacher never saw are ignored
+            prev = w
+        features.append({"input_ids": enc["input_ids"], "attention_mask": enc["attention_mask"], "labels": labels})
+    return features
+
+
+# ---------- student ----------
+
+def pick_layers(n_teacher: int, n_student: int) -> List[int]:
+    """Evenly spaced teacher layers, e.g. 12 -> 3: [0, 6, 11]."""
+    return sorted({int(round(x)) for x in np.linspace(0, n_teacher - 1, n_student)})
+
+def build_student(teacher, n_layers: int):
+    """Shallow copy of the teacher architecture initialised from a subset of its layers."""
+    keep = pick_layers(teacher.config.num_hidden_layers, n_layers)
+    config = copy.deepcopy(teacher.config)
+    config.num_hidden_layers = len(keep)
+    student = AutoModelForTokenClassification.from_config(config)
+
+    new_index = {old: new for new, old in enumerate(keep)}
+    state = {}
+    for key, value in teacher.state_dict().items():
+        m = _LAYER_RE.search(key)
+        if m is None:
+            state[key] = value.clone()  # embeddings, pooler, classifier
+        elif int(m.group(1)) in new_index:
+            state[key[:m.start()] + f".layer.{new_index[int(m.group(1))]}." + key[m.end():]] = value.clone()
+    student.load_state_dict(state, strict=False)
+    return student, keep
+
+def distill_loss(student_logits, teacher_logits, labels, attention_mask, temperature: float, alpha: float):
+    mask = attention_mask.bool()
+    s = student_logits[mask] / temperature
+    t = teacher_logits[mask] / temperature
+    kd = F.kl_div(F.log_softmax(s, dim=-1), F.softmax(t, dim=-1), reduction="batchmean") * temperature ** 2
+    ce = F.cross_entropy(student_logits.view(-1, student_logits.size(-1)), labels.view(-1), ignore_index=-100)
+    return alpha * kd + (1 - alpha) * ce, kd.item(), ce.item()
+
+
+# ---------- report ----------
+
+def benchmark(model_dir: str, dev: List[ConllSentence], bench_texts: List[str], args) -> Dict[str, Any]:
+    """Entity F1 on the held-out gold plus wall time over `bench_texts` for one exported model."""
+    pipe = ner.load_ner(model_dir, device=args.device, backend=args.backend)
+    f1 = ner.evaluate_sentences(pipe, dev, args.max_length, args.batch_size)["ALL"]["f1"] if dev else None
+    ner.predict_texts(pipe, bench_texts[:args.batch_size], args.batch_size, args.max_length)  # warm-up
+    t0 = time.perf_counter()
+    ner.predict_texts(pipe, bench_texts, args.batch_size, args.max_length)
+    seconds = time.perf_counter() - t0
+    model = pipe.model
+    return {
+        "layers": model.config.num_hidden_layers,
+        "params": sum(p.numel() for p in model.parameters()),
+        "f1": f1,
+        "seconds": seconds,
+        "ms_per_row": 1000 * seconds / max(len(bench_texts), 1),
+    }
+
+
+# ---------- main ----------
+
+def main():
+    ap = argparse.ArgumentParser(description="Distil the BERTurk NER teacher into a small student model.")
+    ap.add_argument("--teacher", default=str(PROJECT_ROOT / "models" / "BERTurk_stage1_out"))
+    ap.add_argument("--out", default=str(PROJECT_ROOT / "models" / "BERTurk_student"))
+    ap.add_argument("--layers", type=int, default=3, help="Student encoder layers (2-4 recommended)")
+    ap.add_argument("--synth", nargs="+", default=[str(p) for p in DEFAULT_SYNTH], help="Synth CoNLL files")
+    ap.add_argument("--max-synth", type=int, default=150_000, help="Cap on synth sentences (random subset)")
+    ap.add_argument("--gold", default=str(ner.DEFAULT_GOLDSET))
+    ap.add_argument("--gold-dev-size", type=int, default=100, help="Gold sentences held out for the report")
+    ap.add_argument("--epochs", type=int, default=3)
+    ap.add_argument("--batch-size", type=int, default=32)
+    ap.add_argument("--lr", type=float, default=1e-4)
+    ap.add_argument("--weight-decay", type=float, default=0.01)
+    ap.add_argument("--warmup-ratio", type=float, default=0.1)
+    ap.add_argument("--temperature", type=float, default=2.0)
+    ap.add_argument("--alpha", type=float, default=0.5, help="Weight of the distillation term (1 = teacher only)")
+    ap.add_argument("--max-length", type=int, default=128)
+    ap.add_argument("--device", type=int, default=None, help="-1 CPU, 0 GPU0, ... (default: GPU if available)")
+    ap.add_argument("--backend", choices=list(ner.BACKENDS), default="direct", help="Inference backend for the report")
+    ap.add_argument("--bench-rows", type=int, default=2000, help="Texts timed per model in the report")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--log-every", type=int, default=100)
+    args = ap.parse_args()
+
+    if args.layers < 1:
+        ap.error("--layers must be >= 1")
+    missing = [p for p in args.synth if not Path(p).exists()]
+    if missing:
+        ap.error(f"Synth file(s) not found: {missing}. Generate them with data/synth/generate_*_BIO_synth.py.")
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    torch.manual_seed(args.seed)
+    if args.device is None:
+        args.device = 0 if torch.cuda.is_available() else -1
+    device = torch.device("cpu") if args.device < 0 else torch.device(f"cuda:{args.device}")
+
+    synth: List[ConllSentence] = []
+    for path in args.synth:
+        synth.extend(read_conll(path))
+    if len(synth) > args.max_synth:
+        synth = random.Random(args.seed).sample(synth, args.max_synth)
+    gold = read_conll(args.gold) if Path(args.gold).exists() else []
+    gold_train, gold_dev = train_val_split(gold, args.gold_dev_size, args.seed)
+    train_sents = synth + gold_train
+    sys.stderr.write(f"[info] Train: {len(synth)} synth + {len(gold_train)} gold; held-out gold: {len(gold_dev)}\n")
+
+    tokenizer = AutoTokenizer.from_pretrained(args.teacher)
+    teacher = AutoModelForTokenClassification.from_pretrained(args.teacher).to(device).eval()
+    student, kept = build_student(teacher, args.layers)
+    student.to(device).train()
+    sys.stderr.write(f"[info] Student: {len(kept)} layers initialised from teacher layers {kept}\n")
+
+    label2id = {str(k): int(v) for k, v in teacher.config.label2id.items()}
+    features = encode(tokenizer, train_sents, label2id, args.max_length)
+    collate = DataCollatorForTokenClassification(tokenizer=tokenizer)
+
+    steps_per_epoch = (len(features) + args.batch_size - 1) // args.batch_size
+    total_steps = steps_per_epoch * args.epochs
+    no_decay = ("bias", "LayerNorm.weight")
+    groups = [
+        {"params": [p for n, p in student.named_parameters() if not n.endswith(no_decay)], "weight_decay": args.weight_decay},
+        {"params": [p for n, p in student.named_parameters() if n.endswith(no_decay)], "weight_decay": 0.0},
+    ]
+    optimizer = torch.optim.AdamW(groups, lr=args.lr)
+    scheduler = get_linear_schedule_with_warmup(optimizer, int(args.warmup_ratio * total_steps), total_steps)
+
+    step = 0
+    t_train = time.perf_counter()
+    for epoch in range(args.epochs):
+        order = list(range(len(features)))
+        random.Random(args.seed + epoch).shuffle(order)
+        for b in range(0, len(order), args.batch_size):
+            batch = collate([features[i] for i in order[b:b + args.batch_size]])
+            batch = {k: v.to(device) for k, v in batch.items()}
+            labels = batch.pop("labels")
+            with torch.no_grad():
+                teacher_logits = teacher(**batch).logits
+            student_logits = student(**batch).logits
+            loss, kd, ce = distill_loss(student_logits, teacher_logits, labels, batch["attention_mask"],
+                                        args.temperature, args.alpha)
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(student.parameters(), 1.0)
+            optimizer.step()
+            scheduler.step()
+            optimizer.zero_grad(set_to_none=True)
+            step += 1
+            if step % args.log_every == 0 or step == total_steps:
+                sys.stderr.write(f"[info] epoch {epoch + 1}/{args.epochs} step {step}/{total_steps} "
+                                 f"loss {loss.item():.4f} (kd {kd:.4f}, ce {ce:.4f})\n")
+    train_seconds = time.perf_counter() - t_train
+
+    Path(args.out).mkdir(parents=True, exist_ok=True)
+    student.eval().save_pretrained(args.out)
+    tokenizer.save_pretrained(args.out)
+    sys.stderr.write(f"[info] Student saved to: {args.out}\n")
+
+    del teacher, student
+    pool = [" ".join(s.tokens) for s in gold_dev + synth[:args.bench_rows]]
+    bench_texts = [pool[i % len(pool)] for i in range(args.bench_rows)] if pool else []
+    t_rep = benchmark(args.teacher, gold_dev, bench_texts, args)
+    s_rep = benchmark(args.out, gold_dev, bench_texts, args)
+    report = {
+        "teacher": t_rep,
+        "student": s_rep,
+        "kept_teacher_layers": kept,
+        "train_sentences": len(features),
+        "train_seconds": train_seconds,
+        "f1_delta": (s_rep["f1"] - t_rep["f1"]) if gold_dev else None,
+        "speedup": t_rep["seconds"] / s_rep["seconds"] if s_rep["seconds"] else None,
+        "bench_rows": len(bench_texts),
+        "backend": args.backend,
+    }
+    with open(Path(args.out) / "distill_report.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    sys.stderr.write("[report] " + json.dumps(report) + "\n")
+
+
+if __name__ == "__main__":
+    main()